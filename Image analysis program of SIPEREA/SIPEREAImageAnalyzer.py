@@ -9,7 +9,7 @@ import subprocess
 # TensorFlow 로그 레벨(선택)
 os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
 
-def ensure_packages(packages):
+def find_missing_packages(packages):
     """
     packages: dict of pip_name -> import_name (module or top-level package)
     """
@@ -21,7 +21,10 @@ def ensure_packages(packages):
         spec = importlib.util.find_spec(import_name)
         if spec is None:
             missing.append(pip_name)
+    return missing
 
+def ensure_packages(packages):
+    missing = find_missing_packages(packages)
     if not missing:
         return
 
@@ -42,44 +45,54 @@ _required_packages = {
     # tkinter는 시스템 패키지이므로 pip로 설치하지 않습니다
 }
 
-ensure_packages(_required_packages)
+class LazyModule:
+    """Module proxy that imports the module on first attribute access.
+
+    TensorFlow, pandas, matplotlib and scikit-learn take seconds to import, so they
+    are loaded only by the code paths that use them.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError as e:
+                raise ImportError(f"{e}. Install the dependencies with: "
+                                  f"python {os.path.basename(__file__)} check-deps --install") from e
+        return getattr(self._module, attribute)
 
-# 이제 서드파티 임포트 안전하게 수행
 import glob
 import csv
 import datetime
-from datetime import datetime
+from datetime import datetime, timedelta
 import shutil
 import math
+import hashlib
+import json
 import ctypes
+import platform
+import multiprocessing
 import threading
 import queue
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from threading import Thread
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import cv2
 from PIL import Image, ImageTk
 
+# Imported on first use (see LazyModule)
+pd = LazyModule('pandas')
+plt = LazyModule('matplotlib.pyplot')
+
 # === Machine Learning / Deep Learning Imports ===
-import tensorflow as tf
-from tensorflow.keras.models import load_model, Model  # type: ignore
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, UpSampling2D, Input, Concatenate, Dropout  # type: ignore
-from tensorflow.keras.optimizers import Adam  # type: ignore
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau, Callback  # type: ignore
-from tensorflow.keras.losses import BinaryCrossentropy  # type: ignore
-from tensorflow.keras.preprocessing.image import ImageDataGenerator  # type: ignore
-
-from sklearn.metrics import (
-    confusion_matrix,
-    accuracy_score,
-    f1_score,
-    precision_score,
-    recall_score,
-)
-from sklearn.model_selection import train_test_split
+# Keras layers, callbacks and scikit-learn are imported inside the functions that use them
+tf = LazyModule('tensorflow')
 
 # === GUI Imports ===
 import tkinter as tk
@@ -88,6 +101,20 @@ from tkinter import filedialog, ttk
 # 전역 변수
 isStop = False
 
+# Image files of the GUI list, the catalog, the live-mode watcher and the headless analysis
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+
+# Model files of the inference backends selectable in the GUI
+MODEL_BACKEND_PATHS = {
+    "Keras": 'trained_Model.keras',
+    "TFLite": 'trained_Model.tflite',
+    "ONNX": 'trained_Model.onnx',
+}
+
+# pyplot keeps global figure state, so figures are built one thread at a time
+plot_lock = threading.Lock()
+report_lock = threading.Lock()
+
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
 except:
@@ -108,8 +135,9 @@ class SIPEREAImageAnalyzer(tk.Tk):
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def on_closing(self):
-        # Close all matplotlib figures
-        plt.close('all')
+        # Close all matplotlib figures (if any were drawn)
+        if 'matplotlib.pyplot' in sys.modules:
+            plt.close('all')
         
         # Cleanup threads if they are running
         if hasattr(self.image_analysis_tab, 'analysis_thread') and self.image_analysis_tab.analysis_thread:
@@ -144,7 +172,12 @@ class ImageAnalysisTab(ttk.Frame):
         self.analysis_thread = None
 
         self.roi_data = None
-        self.first_image_time = None
+        self.roi_layout = None
+        self.catalog = None
+
+        # Folder analysis settings and the warm model, kept between runs
+        self.analysis = FolderAnalysis(progress=self.show_analysis_progress,
+                                       status=lambda message: self.status_bar.config(text=message))
 
         self.create_widgets()
         self.configure_layout()
@@ -183,6 +216,22 @@ class ImageAnalysisTab(ttk.Frame):
         self.viz_checkbox = ttk.Checkbutton(self.input_frame, text="Save combined", variable=self.viz_var)
         self.enhanced_checkbox = ttk.Checkbutton(self.input_frame, text="Save enhanced", variable=self.enhanced_var)
 
+        # Keep watching the folder for new images after the analysis
+        self.live_var = tk.BooleanVar(value=False)
+        self.live_checkbox = ttk.Checkbutton(self.input_frame, text="Live", variable=self.live_var)
+
+        # Number of analysis processes (1 = analyze in this process)
+        self.processes_label = ttk.Label(self.input_frame, text="Processes:")
+        self.processes_var = tk.StringVar(value="1")
+        self.processes_spinbox = ttk.Spinbox(self.input_frame, from_=1, to=os.cpu_count() or 1, width=4,
+                                             textvariable=self.processes_var)
+
+        # Inference backend (TFLite/ONNX models are created with the 'export' command)
+        self.backend_label = ttk.Label(self.input_frame, text="Backend:")
+        self.backend_var = tk.StringVar(value="Keras")
+        self.backend_combobox = ttk.Combobox(self.input_frame, values=list(MODEL_BACKEND_PATHS), width=7,
+                                             state='readonly', textvariable=self.backend_var)
+
         # Image viewer frame
         self.viewer_frame = ttk.Frame(self)
         
@@ -250,6 +299,11 @@ class ImageAnalysisTab(ttk.Frame):
         self.export_checkbox.pack(side=tk.LEFT, padx=(5, 5))
         self.viz_checkbox.pack(side=tk.LEFT, padx=(5, 5))
         self.enhanced_checkbox.pack(side=tk.LEFT, padx=(5, 5))
+        self.live_checkbox.pack(side=tk.LEFT, padx=(5, 5))
+        self.processes_label.pack(side=tk.LEFT, padx=(5, 5))
+        self.processes_spinbox.pack(side=tk.LEFT)
+        self.backend_label.pack(side=tk.LEFT, padx=(5, 5))
+        self.backend_combobox.pack(side=tk.LEFT)
         
         # Image viewer frame layout
         self.viewer_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
@@ -291,15 +345,16 @@ class ImageAnalysisTab(ttk.Frame):
     def scan_image_folder(self, folder_path):
         # Scan the specified folder for image files
         self.image_files = []
-        image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
         
         if os.path.isdir(folder_path):
-            for file in os.listdir(folder_path):
-                if file.lower().endswith(image_extensions):
-                    self.image_files.append(os.path.join(folder_path, file))
-            
-            # Sort image files by name
-            self.image_files.sort()
+            # The catalog only parses files that are new or changed since the last scan
+            if self.catalog is not None:
+                self.catalog.close()
+            self.catalog = ImageCatalog(folder_path)
+            self.catalog.refresh()
+
+            # Image files in capture-time order
+            self.image_files = self.catalog.image_paths()
             
             # Display the number of images found
             self.image_count_entry.config(state='normal')
@@ -399,74 +454,35 @@ class ImageAnalysisTab(ttk.Frame):
         self.check_analysis_progress()
 
     def run_analysis(self, input_folder, output_folder, viz_folder):
-        analysis_start_time = time.time()  # 분석 시작 시간 기록
-        
         try:
-            if not input_folder or not os.path.isdir(input_folder):
-                raise ValueError("Invalid input folder path")
-
-            self.read_roi_data(input_folder)
-            self.first_image_time = None
-
-            result_path = os.path.join(input_folder, 'resultArea.csv')
-            is_first_result = True
-
-            img_height, img_width = 512, 512
-            binarizer = DuckweedBinarizer(img_height=img_height, img_width=img_width)
-            binarizer.build_model()
-
-            trained_model_path = 'trained_Model.keras'
-            if not os.path.exists(trained_model_path):
-                raise ValueError(f"Error: '{trained_model_path}' file not found")
-
-            print(f"'{trained_model_path}' : loading and analyzing")
-            binarizer.load_model(trained_model_path)
-
-            # Process each image file
-            for idx, img_path in enumerate(sorted(self.image_files), 1):
-                if isStop:
-                    print("Paused by user. Processing stopped")
-                    return
-
-                current_file = os.path.basename(img_path)
-                self.status_bar.config(text=f"Image {idx}/{len(self.image_files)}: {current_file}")
-
-                binary_result = ProcessImage(
-                    img_path,
-                    output_folder,
-                    viz_folder,
-                    save_viz=self.viz_var.get(),
-                    save_enhanced=self.enhanced_var.get(),
-                    binarizer=binarizer
-                )
-
-                if binary_result is not None:
-                    results = self.process_images_with_roi(binary_result, img_path)
-                    if results:
-                        df = pd.DataFrame([results])
-                        write_mode = 'w' if is_first_result else 'a'
-                        header = is_first_result
-                        df.to_csv(result_path, mode=write_mode, index=False, header=header)
-                        is_first_result = False
-
-                plt.close('all')
-
-            # Calculate and display total analysis time
-            analysis_end_time = time.time()
-            total_seconds = analysis_end_time - analysis_start_time
-            hours = int(total_seconds // 3600)
-            minutes = int((total_seconds % 3600) // 60)
-            seconds = int(total_seconds % 60)
-            
-            print(f"\n{'='*60}")
-            print(f"Total analysis time: {hours}h {minutes}m {seconds}s")
-            print(f"Analyzed {len(self.image_files)} images")
-            print(f"{'='*60}\n")
+            try:
+                processes = max(1, int(self.processes_var.get()))
+            except ValueError:
+                raise ValueError("Processes must be a valid integer")
+
+            analysis = self.analysis
+            analysis.model_path = MODEL_BACKEND_PATHS[self.backend_var.get()]
+            analysis.processes = processes
+            analysis.output_folder = output_folder
+            analysis.viz_folder = viz_folder
+            analysis.save_viz = self.viz_var.get()
+            analysis.save_enhanced = self.enhanced_var.get()
+            analysis.live = self.live_var.get()
+
+            completed = analysis.run(input_folder, self.image_files)
+            self.roi_data = analysis.roi_data
+            self.roi_layout = analysis.roi_layout
+            if not completed:
+                return
 
             self.message_queue.put(("completed", None))
         except Exception as e:
             self.message_queue.put(("error", str(e)))
-            plt.close('all')
+            if 'matplotlib.pyplot' in sys.modules:
+                plt.close('all')
+
+    def show_analysis_progress(self, done, total, image_path):
+        self.status_bar.config(text=f"Image {done}/{total}: {os.path.basename(image_path)}")
 
     def check_analysis_progress(self):
         try:
@@ -639,142 +655,34 @@ class ImageAnalysisTab(ttk.Frame):
             self.resize_job = self.after(100, self.update_display)
 
     def read_roi_data(self, folder_path):
-        roi_path = os.path.join(folder_path, 'ROI.csv')
-        if os.path.exists(roi_path):
-            self.roi_data = pd.read_csv(roi_path)
-            print(f"ROI loading completed: ROI count = {len(self.roi_data)}")
-            return True
-        else:
-            print("ROI.csv not found. Single ROI assigned")
-            return False
+        self.roi_data = read_roi_file(folder_path)
+        return self.roi_data is not None
 
     def count_white_pixels(self, binary_image, roi_info):
-        isDeubgging = False
-        x1, y1, x2, y2 = int(roi_info['X1']), int(roi_info['Y1']), int(roi_info['X2']), int(roi_info['Y2'])
-    
-        # Compute the extended ROI region
-        img_height, img_width = binary_image.shape
-        extended_x2 = min(x2 + 1, img_width)
-        extended_y2 = min(y2 + 1, img_height)
-    
-        roi_region = binary_image[y1:extended_y2, x1:extended_x2]
-    
-        if isDeubgging:
-            roi_filename = f"roi_x{x1}y{y1}_{extended_x2}y{extended_y2}.png"
-            cv2.imwrite(roi_filename, roi_region)
-    
-        if roi_info['Shape'].lower() == 'circle':
-            # Compute the center and radius for the circular ROI
-            height, width = roi_region.shape
-            center_x = width // 2
-            center_y = height // 2
-            radius = min(width, height) // 2 + 1
-        
-            # Generate a grid of coordinates
-            y, x = np.ogrid[:height, :width]
-        
-            # Compute the distance from the center
-            dist_from_center = (x - center_x)**2 + (y - center_y)**2
-        
-            # Generate a mask for the circular ROI
-            mask = dist_from_center <= radius**2
-        
-            # Generate the mask image
-            mask_image = mask.astype(np.uint8) * 255            
-                
-            if isDeubgging:
-                mask_filename = f"mask_x{x1}y{y1}_{extended_x2}y{extended_y2}.png"
-                cv2.imwrite(mask_filename, mask_image)
-
-            # Count white pixels in the circular ROI
-            white_pixels = (roi_region == 255) & mask
-            roi_region_masked = white_pixels.astype(np.uint8) * 255
-            if isDeubgging:
-                result_filename = f"result_x{x1}y{y1}_{extended_x2}y{extended_y2}.png"
-                cv2.imwrite(result_filename, roi_region_masked)
-
-            white_count = np.sum(white_pixels)
-            print(f"ROI at ({x1}, {y1}, {extended_x2}, {extended_y2}): {white_count} white pixels")
-    
-            return white_count
-        else:
-            # Compute the rectangular ROI region
-            white_count = np.sum(roi_region == 255)
-            print(f"ROI at ({x1}, {y1}, {extended_x2}, {extended_y2}): {white_count} white pixels")
-            return white_count
+        return count_white_pixels(binary_image, roi_info)
 
     def create_column_name(self, roi_row):
-        parts = []
-        if not pd.isna(roi_row['Condition1']):
-            parts.append(str(roi_row['Condition1']))
-        if not pd.isna(roi_row['Condition2']):
-            parts.append(str(roi_row['Condition2']))
-        if not pd.isna(roi_row['Plate#']):
-            parts.append(f"P{roi_row['Plate#']}")
-        return "||".join(parts)
+        return create_column_name(roi_row)
 
     def process_images_with_roi(self, binary_image, image_file):
-        results = {}
-        
         filename = os.path.basename(image_file)
-        
-        try:
-            parts = filename.split(' ')
-            if len(parts) < 2:
-                print(f"Warning: Invalid filename format for {filename}. Expected format: 'YYYY-MM-DD (HH-mm-ss-mmm)'")
-                return None
-
-            # Parse the date part
-            date_str = parts[0]
-            if not date_str.count('-') == 2:
-                print(f"Warning: Invalid date format in {filename}. Expected 'YYYY-MM-DD'")
-                return None
-            year, month, day = map(int, date_str.split('-'))
+        current_time = parse_capture_time(filename)
+        if current_time is None:
+            return None
 
-            # Parse the time part
-            time_part = parts[1].split('-(')[0].strip('()')
-            if not time_part.count('-') == 3:
-                print(f"Warning: Invalid time format in {filename}. Expected '(HH-mm-ss-mmm)'")
-                return None
-            hour, minute, second, millisec = map(int, time_part.split('-'))
-            
-            # Create datetime object
-            current_time = datetime(year, month, day, hour, minute, second, millisec * 1000)
-            
-            # Get the first image time if not set
-            if self.first_image_time is None:
-                self.first_image_time = current_time
-            
-            # Compute the time difference in days
-            time_diff = (current_time - self.first_image_time).total_seconds() / (24 * 3600)
-            
-            # Save the results
-            results['File name'] = filename
-            results['Time(day)'] = f"{time_diff:.3f}"
-            
-            # Process each ROI
-            if self.roi_data is None:
-                height, width = binary_image.shape
-                dummy_roi = {
-                    'Shape': 'rectangle',
-                    'X1': 0, 'Y1': 0,
-                    'X2': width, 'Y2': height,
-                    'Condition1': 'Total'
-                }
-                white_pixels = self.count_white_pixels(binary_image, dummy_roi)
-                results['Total'] = white_pixels
-            else:
-                for _, roi in self.roi_data.iterrows():
-                    column_name = self.create_column_name(roi)
-                    white_pixels = self.count_white_pixels(binary_image, roi)
-                    results[column_name] = white_pixels
-            
-            return results
-            
+        try:
+            if self.roi_layout is None or self.roi_layout.roi_data is not self.roi_data:
+                self.roi_layout = RoiLayout(self.roi_data)
+            roi_areas = count_roi_areas(binary_image, self.roi_layout)
         except (ValueError, IndexError) as e:
             print(f"Warning: Could not process {filename}. Error: {str(e)}")
             return None
 
+        return self.create_result_row(filename, current_time, roi_areas)
+
+    def create_result_row(self, filename, current_time, roi_areas):
+        return self.analysis.create_result_row(filename, current_time, roi_areas)
+
     def save_results(self, all_results, input_path):
 
         df = pd.DataFrame(all_results)
@@ -844,6 +752,14 @@ class TrainingTab(ttk.Frame):
             text="Save enhanced",
             variable=self.save_enhanced_var
         )
+
+        # Train the cross-validation folds in worker processes (see DuckweedBinarizer.train)
+        self.parallel_folds_var = tk.BooleanVar(value=False)
+        self.parallel_folds_cb = ttk.Checkbutton(
+            self.viz_options_frame,
+            text="Parallel folds",
+            variable=self.parallel_folds_var
+        )
         
         # Button frame
         self.button_frame = ttk.Frame(self)
@@ -875,6 +791,7 @@ class TrainingTab(ttk.Frame):
         self.viz_options_frame.pack(side=tk.LEFT, padx=(10, 5))
         self.save_combined_cb.pack(side=tk.LEFT, padx=(5, 5))
         self.save_enhanced_cb.pack(side=tk.LEFT, padx=(5, 5))
+        self.parallel_folds_cb.pack(side=tk.LEFT, padx=(5, 5))
         
         # Button frame layout
         self.button_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -997,7 +914,8 @@ class TrainingTab(ttk.Frame):
                 es_patience=es_patience,
                 lr_patience=lr_patience,
                 use_kfold=True,
-                k_folds=5
+                k_folds=5,
+                fold_processes=None if self.parallel_folds_var.get() else 1
             )
 
             # Calculate and display total training time
@@ -1042,83 +960,12 @@ class TrainingTab(ttk.Frame):
 
                 # Run predictions on validation data for ROC-AUC analysis
                 print("Performing ROC-AUC analysis...")
-                X, y = binarizer.prepare_training_data(image_paths, mask_paths)
-                y_pred = binarizer.model.predict(X, verbose=0).flatten()
-                y_true = y.flatten()
-
-                # Compute ROC-AUC
-                from sklearn.metrics import roc_curve, auc
-                fpr, tpr, thresholds = roc_curve(y_true, y_pred)
-                roc_auc = auc(fpr, tpr)
-                print(f"ROC-AUC: {roc_auc:.4f}")
-
-                # Save ROC-AUC data (sampled)
-                sampled_indices = np.linspace(0, len(fpr) - 1, num=1000, dtype=int)
-                roc_data_sampled = pd.DataFrame({
-                    'False positive rate': fpr[sampled_indices],
-                    'True positive rate': tpr[sampled_indices],
-                    'Thresholds': thresholds[sampled_indices]
-                })
-                roc_data_path = os.path.join(output_folder, "roc_auc_data_sampled.csv")
-                roc_data_sampled.to_csv(roc_data_path, index=False)
-                print(f"Sampled ROC-AUC data saved to {roc_data_path}")
-
-                # Save ROC-AUC plot
-                plt.figure()
-                plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (area = {roc_auc:.4f})')
-                plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-                plt.xlabel('False positive rate')
-                plt.ylabel('True positive rate')
-                plt.title('Receiver Operating Characteristic (ROC)')
-                plt.legend(loc="lower right")
-                roc_plot_path = os.path.join(output_folder, "roc_auc_plot.png")
-                plt.savefig(roc_plot_path)
-                plt.close()
-                print(f"ROC-AUC plot saved to {roc_plot_path}")
-
-                # Compute segmentation metrics
-                y_pred_bin = (y_pred > 0.5).astype(np.uint8)
-                y_true_bin = y_true.astype(np.uint8)
-
-                pixel_accuracy = accuracy_score(y_true_bin, y_pred_bin)
-                intersection = np.logical_and(y_true_bin, y_pred_bin).sum()
-                union = np.logical_or(y_true_bin, y_pred_bin).sum()
-                iou = intersection / union if union > 0 else 0.0
-                dice = (2 * intersection) / (y_true_bin.sum() + y_pred_bin.sum()) if (y_true_bin.sum() + y_pred_bin.sum()) > 0 else 0.0
-                precision = precision_score(y_true_bin, y_pred_bin, zero_division=0)
-                recall = recall_score(y_true_bin, y_pred_bin, zero_division=0)
-
-                print(f"Pixel Accuracy: {pixel_accuracy:.4f}")
-                print(f"IoU (Jaccard): {iou:.4f}")
-                print(f"Dice Coefficient: {dice:.4f}")
-                print(f"Precision: {precision:.4f}")
-                print(f"Recall: {recall:.4f}")
-
-                metrics_df = pd.DataFrame([{
-                    "Pixel Accuracy": pixel_accuracy,
-                    "IoU": iou,
-                    "Dice": dice,
-                    "Precision": precision,
-                    "Recall": recall,
-                    "ROC-AUC": roc_auc
-                }])
-                metrics_path = os.path.join(output_folder, "segmentation_metrics.csv")
-                metrics_df.to_csv(metrics_path, index=False)
-                print(f"Segmentation metrics saved to {metrics_path}")
-
-                # Compute confusion matrix
-                cm = confusion_matrix(y_true_bin.flatten(), y_pred_bin.flatten())
-                print("Confusion Matrix:")
-                print(cm)
-
-                cm_df = pd.DataFrame(
-                    cm,
-                    index=["True Negative", "True Positive"],
-                    columns=["Predicted Negative", "Predicted Positive"]
-                )
-                cm_path = os.path.join(output_folder, "confusion_matrix.csv")
-                cm_df.to_csv(cm_path)
-                print(f"Confusion matrix saved to {cm_path}")
+                # Streamed batch by batch into fixed-size histograms
+                metrics = SegmentationMetrics()
+                for images, masks in binarizer.training_dataset(image_paths, mask_paths, batch_size=4):
+                    metrics.update(masks.numpy(), binarizer.model.predict_on_batch(images))
+
+                write_segmentation_reports(metrics, output_folder)
                 
                 print("\n[INFO] Training analysis completed!")
 
@@ -1200,14 +1047,547 @@ class TrainingTab(ttk.Frame):
 
         return ThreadSafeLogRedirector(self.log_text)
 
+class TilePlan:
+    """Tile grid, feather window and inverse weight map for one image geometry.
+
+    Every frame of a time-lapse has the same resolution, so plans are cached per
+    (height, width, tile_size, overlap) and shared by all predictions.
+    """
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    max_cached_plans = 8
+
+    def __init__(self, height, width, tile_size=512, overlap=64):
+        self.height = height
+        self.width = width
+        self.tile_size = tile_size
+        self.overlap = overlap
+
+        effective_tile_size = tile_size - 2 * overlap
+        if effective_tile_size <= 0:
+            raise ValueError(f"Overlap ({overlap}) is too large for tile size ({tile_size})")
+
+        self.n_tiles_x = max(1, math.ceil((width - tile_size) / effective_tile_size) + 1)
+        self.n_tiles_y = max(1, math.ceil((height - tile_size) / effective_tile_size) + 1)
+
+        # Tile origins and clipped tile sizes in row-major order
+        self.origins = []
+        for i in range(self.n_tiles_y):
+            for j in range(self.n_tiles_x):
+                y_start = min(i * effective_tile_size, max(0, height - tile_size))
+                x_start = min(j * effective_tile_size, max(0, width - tile_size))
+                h = min(tile_size, height - y_start)
+                w = min(tile_size, width - x_start)
+                self.origins.append((y_start, x_start, h, w))
+
+        # Feather window: the edge ramp is separable, so build it once in 1D
+        ramp = np.ones(tile_size, dtype=np.float32)
+        for k in range(overlap):
+            ramp[k] = ramp[k] * (k + 1) / (overlap + 1)
+            ramp[tile_size - 1 - k] = ramp[tile_size - 1 - k] * (k + 1) / (overlap + 1)
+        self.window = np.outer(ramp, ramp)
+
+        weight_map = np.zeros((height, width), dtype=np.float32)
+        for y_start, x_start, h, w in self.origins:
+            weight_map[y_start:y_start + h, x_start:x_start + w] += self.window[:h, :w]
+        self.inverse_weight_map = 1.0 / np.maximum(weight_map, 1e-10)
+
+    @classmethod
+    def get(cls, height, width, tile_size=512, overlap=64):
+        key = (height, width, tile_size, overlap)
+        with cls._cache_lock:
+            plan = cls._cache.get(key)
+            if plan is not None:
+                cls._cache.move_to_end(key)
+                return plan
+
+        plan = cls(height, width, tile_size, overlap)
+
+        with cls._cache_lock:
+            cls._cache[key] = plan
+            while len(cls._cache) > cls.max_cached_plans:
+                cls._cache.popitem(last=False)
+        return plan
+
+    def extract_tiles(self, image, start=0, stop=None):
+        # Zero padding covers tiles that are cut off by the image border
+        origins = self.origins[start:stop]
+        tiles = np.zeros((len(origins), self.tile_size, self.tile_size, image.shape[2]), dtype=image.dtype)
+        for n, (y_start, x_start, h, w) in enumerate(origins):
+            tiles[n, :h, :w] = image[y_start:y_start + h, x_start:x_start + w]
+        return tiles
+
+    def accumulate(self, prediction_map, index, tile_prediction):
+        y_start, x_start, h, w = self.origins[index]
+        prediction_map[y_start:y_start + h, x_start:x_start + w] += tile_prediction[:h, :w] * self.window[:h, :w]
+
+
+class ImageContext:
+    """One image of an analysis, decoded once and handed to every stage that needs its pixels.
+
+    Prediction, visualization, mask saving and ROI counting all read from here,
+    so the file is never decoded a second time.
+    """
+    def __init__(self, image_path, rgb):
+        self.image_path = image_path
+        self.filename = os.path.basename(image_path)
+        self.base_name = os.path.splitext(self.filename)[0]
+        self.rgb = rgb
+        self.height, self.width = rgb.shape[:2]
+        # Binary mask, set once the image has been predicted
+        self.mask = None
+
+    @classmethod
+    def load(cls, image_path):
+        img = cv2.imread(image_path)
+        if img is None:
+            raise ValueError(f"Cannot load image: {image_path}")
+        return cls(image_path, cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+    @property
+    def capture_time(self):
+        return parse_capture_time(self.filename, verbose=False)
+
+
+class PredictionRequest:
+    """Decoded image plus the model inputs (one resized image or all of its tiles) needed to predict it."""
+    def __init__(self, context, inputs, plan=None):
+        self.context = context
+        self.inputs = inputs
+        self.plan = plan
+
+    @property
+    def image_path(self):
+        return self.context.image_path
+
+    @property
+    def original_img(self):
+        return self.context.rgb
+
+
+class _BatchJob:
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.outputs = []
+        self.next_row = 0
+        self.started = False
+        self.submitted = time.monotonic()
+        self.future = Future()
+
+
+class InferenceBatchScheduler:
+    """Packs model inputs from several images into shared batches.
+
+    Each submit() call hands over the input rows of one image (a resized image or
+    its tiles) and returns a Future with the stacked model outputs in row order.
+    A background thread fills batches of up to max_batch_size rows across images
+    and runs a batch as soon as it is full or its oldest row has waited max_latency
+    seconds.
+    """
+    def __init__(self, binarizer, max_batch_size=16, max_latency=0.05):
+        self.binarizer = binarizer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_latency = max_latency
+        self.batches_run = 0
+        self.rows_run = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._aborted = False
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, inputs):
+        if self._closed:
+            raise RuntimeError("Inference scheduler is closed")
+        job = _BatchJob(inputs)
+        if len(inputs) == 0:
+            job.future.set_result(inputs[:0])
+            return job.future
+        self._queue.put(job)
+        return job.future
+
+    def close(self, wait=True):
+        """Stop accepting work. Pending jobs are finished when wait is True and cancelled otherwise."""
+        if not wait:
+            self.abort()
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def abort(self):
+        """Cancel every job that is not finished; a batch that is already running still completes."""
+        self._aborted = True
+        self._cancel_queued()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(wait=exc_type is None)
+
+    def _cancel_queued(self):
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job.future.cancel()
+            else:
+                self._queue.put(None)
+                return
+
+    def _cancel_jobs(self, jobs):
+        for job in jobs:
+            if not job.started:
+                job.future.cancel()
+            elif job.next_row < len(job.inputs):
+                job.future.set_exception(CancelledError())
+        jobs.clear()
+
+    def _run(self):
+        jobs = deque()
+        closing = False
+
+        while jobs or not closing:
+            if self._aborted:
+                self._cancel_jobs(jobs)
+
+            if not jobs:
+                job = self._queue.get()
+                if job is None:
+                    closing = True
+                    continue
+                if self._aborted:
+                    job.future.cancel()
+                    continue
+                jobs.append(job)
+
+            # Wait for more rows until the batch is full or the oldest row hits its deadline
+            deadline = jobs[0].submitted + self.max_latency
+            while not closing and sum(len(j.inputs) - j.next_row for j in jobs) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if job is None:
+                    closing = True
+                else:
+                    jobs.append(job)
+
+            if not self._aborted:
+                self._run_batch(jobs)
+
+    def _run_batch(self, jobs):
+        # Take rows from the oldest jobs first; rows of a different shape start a new batch
+        parts = []
+        row_shape = None
+        rows = 0
+        for job in jobs:
+            if rows >= self.max_batch_size:
+                break
+            if job.next_row == len(job.inputs):
+                continue
+            if not job.started:
+                job.started = True
+                if not job.future.set_running_or_notify_cancel():
+                    job.next_row = len(job.inputs)
+                    continue
+            if row_shape is None:
+                row_shape = job.inputs.shape[1:]
+            elif job.inputs.shape[1:] != row_shape:
+                break
+            count = min(len(job.inputs) - job.next_row, self.max_batch_size - rows)
+            parts.append((job, job.next_row, count))
+            rows += count
+
+        if parts:
+            batch = np.concatenate([job.inputs[start:start + count] for job, start, count in parts])
+            try:
+                outputs = self.binarizer.run_model(batch)
+            except Exception as e:
+                for job, _, _ in parts:
+                    job.future.set_exception(e)
+                    job.next_row = len(job.inputs)
+            else:
+                self.batches_run += 1
+                self.rows_run += rows
+                offset = 0
+                for job, start, count in parts:
+                    job.outputs.append(outputs[offset:offset + count])
+                    job.next_row += count
+                    offset += count
+                    if job.next_row == len(job.inputs):
+                        job.future.set_result(np.concatenate(job.outputs))
+
+        # Drop finished and cancelled jobs from the front of the queue
+        while jobs and jobs[0].next_row == len(jobs[0].inputs):
+            jobs.popleft()
+
+
+class TFLiteRunner:
+    """Runs an exported .tflite model with the TFLite interpreter."""
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+        # One interpreter has one set of tensors, so calls are serialised
+        self.lock = threading.Lock()
+
+    def predict(self, batch):
+        input_index = self.input_details['index']
+        with self.lock:
+            if self.batch_size != len(batch):
+                self.interpreter.resize_tensor_input(input_index, [len(batch), *batch.shape[1:]])
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(batch)
+
+            # Fully integer models take quantized inputs and return quantized outputs
+            input_dtype = self.input_details['dtype']
+            if input_dtype != np.float32:
+                scale, zero_point = self.input_details['quantization']
+                batch = np.round(batch / scale + zero_point).astype(input_dtype)
+            self.interpreter.set_tensor(input_index, batch.astype(input_dtype, copy=False))
+            self.interpreter.invoke()
+            outputs = self.interpreter.get_tensor(self.output_details['index'])
+
+        if outputs.dtype != np.float32:
+            scale, zero_point = self.output_details['quantization']
+            return (outputs.astype(np.float32) - zero_point) * scale
+        return outputs.copy()
+
+
+class OnnxRunner:
+    """Runs an exported .onnx model with ONNX Runtime on the CPU."""
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ValueError("ONNX Runtime is required for .onnx models (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch.astype(np.float32, copy=False)})[0]
+
+
+class OutputWriter:
+    """Bounded pool of threads that writes the analysis outputs (masks, visualizations, report lines).
+
+    Writes overlap with the inference of the next images. submit blocks only when
+    queue_size writes are already waiting, and a failed write is reported and
+    counted instead of raising into the analysis.
+    """
+    def __init__(self, workers=2, queue_size=32, png_compression=3):
+        self.png_compression = int(png_compression)
+        self.tasks = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.errors = 0
+        self.written = 0
+        self.lock = threading.Lock()
+        self.threads = [Thread(target=self._run, daemon=True) for _ in range(max(1, int(workers)))]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, path, write_func, *args):
+        self.tasks.put((path, write_func, args))
+
+    def write_image(self, path, image, params=None):
+        if params is None and path.lower().endswith('.png'):
+            params = [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        self.submit(path, self._write_image, image, params or [])
+
+    def append_line(self, path, line):
+        self.submit(path, self._append_line, line)
+
+    def flush(self):
+        """Wait until every submitted write has finished."""
+        self.tasks.join()
+
+    def close(self):
+        self.flush()
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.errors:
+            print(f"Warning: {self.errors} output files could not be written")
+
+    @staticmethod
+    def _write_image(path, image, params):
+        if not cv2.imwrite(path, image, params):
+            raise ValueError("cv2.imwrite failed")
+
+    @staticmethod
+    def _append_line(path, line):
+        with report_lock, open(path, "a") as report_file:
+            report_file.write(line + "\n")
+
+    def _run(self):
+        while True:
+            item = self.tasks.get()
+            try:
+                if item is None:
+                    break
+                path, write_func, args = item
+                try:
+                    write_func(path, *args)
+                    with self.lock:
+                        self.written += 1
+                except Exception as e:
+                    with self.lock:
+                        self.errors += 1
+                    print(f"Error writing {path}: {e}")
+            finally:
+                self.tasks.task_done()
+
+
+class VisualizationRenderer:
+    """Writes the side-by-side visualization panels with numpy/OpenCV instead of matplotlib figures.
+
+    backend      'opencv' or 'matplotlib' (the previous figure-based output, kept as a fallback)
+    image_format 'png' or 'jpg'
+    quality      JPEG quality (0-100)
+    scale        downscale factor applied to every panel, e.g. 0.5 for half size
+    max_height   upper limit of the panel height in pixels (None for no limit)
+    """
+    title_height = 32
+    colorbar_width = 70
+
+    def __init__(self, backend='opencv', image_format='png', quality=90, scale=1.0, max_height=600):
+        if backend not in ('opencv', 'matplotlib'):
+            raise ValueError(f"Unknown visualization backend: {backend}")
+        if image_format not in ('png', 'jpg'):
+            raise ValueError(f"Unknown visualization format: {image_format}")
+        self.backend = backend
+        self.image_format = image_format
+        self.quality = int(quality)
+        self.scale = float(scale)
+        self.max_height = max_height
+
+    def output_path(self, save_path, prefix, base_name):
+        # The matplotlib fallback always writes PNG, as before
+        extension = self.image_format if self.backend == 'opencv' else 'png'
+        filename = f'{prefix}_{base_name}.{extension}'
+        return os.path.join(save_path, filename) if save_path else filename
+
+    def render_combined(self, original_img, prediction, output_path, writer=None):
+        height = self._panel_height(original_img)
+        self._write(output_path, writer, [
+            self._panel(original_img, 'Original Image', height),
+            self._panel(self._gray(prediction), 'Prediction Mask', height),
+        ])
+
+    def render_enhanced(self, original_img, prediction_raw, binary_prediction, output_path, writer=None):
+        height = self._panel_height(original_img)
+        low, high = float(prediction_raw.min()), float(prediction_raw.max())
+        jet = cv2.cvtColor(cv2.applyColorMap(self._to_uint8(prediction_raw, low, high), cv2.COLORMAP_JET), cv2.COLOR_BGR2RGB)
+        self._write(output_path, writer, [
+            self._panel(original_img, 'Original image', height),
+            self._panel(jet, 'Raw Prediction (Probability)', height),
+            self._colorbar(height, low, high),
+            self._panel(self._gray(binary_prediction), 'Final Binary Mask', height),
+        ])
+
+    def _panel_height(self, img):
+        height = img.shape[0] * self.scale
+        if self.max_height:
+            height = min(height, self.max_height)
+        return max(1, int(round(height)))
+
+    @staticmethod
+    def _to_uint8(values, low, high):
+        # Stretch to the data range, as imshow does without vmin/vmax
+        if high <= low:
+            return np.zeros(values.shape[:2], dtype=np.uint8)
+        return np.clip((values - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+
+    def _gray(self, values):
+        gray = self._to_uint8(values, float(values.min()), float(values.max()))
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+
+    def _panel(self, img, title, height):
+        width = max(1, int(round(img.shape[1] * height / img.shape[0])))
+        if img.shape[:2] != (height, width):
+            interpolation = cv2.INTER_AREA if height < img.shape[0] else cv2.INTER_LINEAR
+            img = cv2.resize(img, (width, height), interpolation=interpolation)
+        if img.dtype != np.uint8:
+            img = np.clip(img, 0, 255).astype(np.uint8)
+
+        panel = np.full((height + self.title_height, width, 3), 255, dtype=np.uint8)
+        panel[self.title_height:] = img
+        cv2.putText(panel, title, (5, self.title_height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv2.LINE_AA)
+        return panel
+
+    def _colorbar(self, height, low, high):
+        bar = np.full((height + self.title_height, self.colorbar_width, 3), 255, dtype=np.uint8)
+        gradient = np.linspace(255, 0, height).astype(np.uint8)[:, None].repeat(20, axis=1)
+        bar[self.title_height:, 5:25] = cv2.cvtColor(cv2.applyColorMap(gradient, cv2.COLORMAP_JET), cv2.COLOR_BGR2RGB)
+        for fraction in (0.0, 0.5, 1.0):
+            y = self.title_height + int(round((1.0 - fraction) * (height - 1)))
+            label = f"{low + fraction * (high - low):.2f}"
+            cv2.putText(bar, label, (28, min(max(y + 5, self.title_height + 12), height + self.title_height - 2)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
+        return bar
+
+    def _write(self, output_path, writer, panels):
+        gap = np.full((panels[0].shape[0], 10, 3), 255, dtype=np.uint8)
+        parts = []
+        for panel in panels:
+            parts += [panel, gap]
+        canvas = cv2.cvtColor(np.hstack(parts[:-1]), cv2.COLOR_RGB2BGR)
+        # PNG compression follows the writer's setting
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality] if self.image_format == 'jpg' else None
+        if writer is not None:
+            writer.write_image(output_path, canvas, params)
+        elif not cv2.imwrite(output_path, canvas, params or []):
+            raise ValueError(f"Could not write visualization: {output_path}")
+
+
 class DuckweedBinarizer:
     def __init__(self, img_height=256, img_width=256, resize_for_model=True):
         self.img_height = img_height
         self.img_width = img_width
         self.resize_for_model = resize_for_model
         self.model = None
+        # Exported TFLite/ONNX model used for inference instead of the Keras graph
+        self.runner = None
+        self.backend = None
+        # Compiled forward pass of self.model (see compile_predictor)
+        self.jit_compile = False
+        self.predict_fn = None
+        self.predict_fn_model = None
+        # Renderer of predict() calls that pass none; runs pass their own, as the ModelRegistry shares this object
+        self.renderer = VisualizationRenderer()
+        # Time of the last forward pass, so that the ModelRegistry does not count a model in use as idle
+        self.last_used = time.time()
 
     def build_model(self):
+        from tensorflow.keras.models import Model  # type: ignore
+        from tensorflow.keras.layers import Conv2D, MaxPooling2D, UpSampling2D, Input, Concatenate, Dropout  # type: ignore
+        from tensorflow.keras.optimizers import Adam  # type: ignore
+        from tensorflow.keras.losses import BinaryCrossentropy  # type: ignore
+
         tf.keras.backend.clear_session()
         
         inputs = Input(shape=(self.img_height, self.img_width, 3))
@@ -1263,7 +1643,7 @@ class DuckweedBinarizer:
         self.model = model
         return model
 
-    def preprocess_image(self, image_path):
+    def preprocess_image(self, image_path, normalize=True):
         img = cv2.imread(image_path)
         if img is None:
             raise ValueError(f"Could not load image from {image_path}")
@@ -1271,35 +1651,172 @@ class DuckweedBinarizer:
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         original_height, original_width = img.shape[:2]
 
-        if self.resize_for_model:
-            img_resized = cv2.resize(img, (self.img_width, self.img_height), interpolation=cv2.INTER_AREA)
-        else:
-            img_resized = img
+        img_resized = self.resize_input(img)
 
-        img_normalized = img_resized / 255.0
+        if not normalize:
+            return img_resized, (original_height, original_width)
+
+        # float32 directly: the model computes in float32, and a float64 copy is 8x the uint8 image
+        img_normalized = img_resized.astype(np.float32) / 255.0
         return img_normalized, (original_height, original_width)
 
-    def prepare_training_data(self, image_paths, mask_paths):
-        X, y = [], []
-        for img_path, mask_path in zip(image_paths, mask_paths):
-            img, _ = self.preprocess_image(img_path)
-            X.append(img)
+    def resize_input(self, img):
+        if self.resize_for_model:
+            return cv2.resize(img, (self.img_width, self.img_height), interpolation=cv2.INTER_AREA)
+        return img
+
+    def load_training_pair(self, image_path, mask_path):
+        """uint8 image (H, W, 3) and 0/1 mask (H, W, 1), resized like the prediction input."""
+        img, _ = self.preprocess_image(image_path, normalize=False)
 
-            mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
-            if mask is None:
-                raise ValueError(f"Could not load mask from {mask_path}")
+        mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+        if mask is None:
+            raise ValueError(f"Could not load mask from {mask_path}")
+
+        if self.resize_for_model:
+            mask = cv2.resize(mask, (self.img_width, self.img_height), interpolation=cv2.INTER_NEAREST)
 
-            if self.resize_for_model:
-                mask = cv2.resize(mask, (self.img_width, self.img_height), interpolation=cv2.INTER_NEAREST)
+        mask = (mask > 127).astype(np.uint8)
+        return img, np.expand_dims(mask, axis=-1)
 
-            mask = (mask > 127).astype(np.float32)
-            mask = np.expand_dims(mask, axis=-1)
-            y.append(mask)
+    def prepare_training_data(self, image_paths, mask_paths):
+        """All pairs as float32 arrays in memory; training streams them with training_dataset instead."""
+        X, y = [], []
+        for img_path, mask_path in zip(image_paths, mask_paths):
+            img, mask = self.load_training_pair(img_path, mask_path)
+            X.append(img.astype(np.float32) / 255.0)
+            y.append(mask.astype(np.float32))
 
         return np.array(X), np.array(y)
 
+    # Random paired transform of the training images and masks, in ImageDataGenerator terms
+    # (rotation and shear in degrees, shifts as fractions of the size)
+    augmentation = dict(
+        rotation_range=15,
+        width_shift_range=0.1,
+        height_shift_range=0.1,
+        shear_range=0.05,
+        zoom_range=[0.9, 1.1],
+        horizontal_flip=True,
+        fill_mode='nearest'
+    )
+
+    def training_dataset(self, image_paths, mask_paths, batch_size=8, shuffle=False, augment=False,
+                         cache_dir=None, shuffle_buffer=64, seed=42):
+        """tf.data pipeline of (image, mask) float32 batches streamed from the files.
+
+        Pairs are decoded and resized in parallel by load_training_pair and stay uint8
+        until batching. With cache_dir, the decoded pairs are cached on disk during the
+        first epoch and read from there afterwards. Shuffling uses the file list (or a
+        bounded buffer after the cache) and batches are prefetched while the model
+        trains, so memory use does not grow with the number of images.
+        augment=True applies augment_batch to every batch. seed fixes the shuffling and
+        the augmentation; the batches come in the same order on every run.
+        """
+        image_paths = [str(path) for path in image_paths]
+        mask_paths = [str(path) for path in mask_paths]
+        height, width = self.img_height, self.img_width
+
+        dataset = tf.data.Dataset.from_tensor_slices((image_paths, mask_paths))
+        if shuffle and cache_dir is None:
+            dataset = dataset.shuffle(len(image_paths), seed=seed, reshuffle_each_iteration=True)
+
+        def load_pair(image_path, mask_path):
+            image, mask = tf.numpy_function(
+                lambda image_path, mask_path: self.load_training_pair(image_path.decode(), mask_path.decode()),
+                [image_path, mask_path], [tf.uint8, tf.uint8])
+            image.set_shape((height, width, 3))
+            mask.set_shape((height, width, 1))
+            return image, mask
+
+        dataset = dataset.map(load_pair, num_parallel_calls=tf.data.AUTOTUNE)
+
+        if cache_dir is not None:
+            # One cache per image set and size; changed files get a new cache
+            key = hashlib.sha1()
+            for path in image_paths + mask_paths:
+                key.update(f"{path}|{os.path.getmtime(path)}\n".encode('utf-8'))
+            key.update(f"{height}x{width}".encode('utf-8'))
+            cache_path = os.path.join(cache_dir, f"pairs_{key.hexdigest()[:16]}")
+            os.makedirs(cache_dir, exist_ok=True)
+            # An interrupted first epoch leaves a lock file behind
+            for lock_file in glob.glob(cache_path + '*.lockfile'):
+                os.remove(lock_file)
+            dataset = dataset.cache(cache_path)
+            if shuffle:
+                dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+        def to_float(images, masks):
+            return tf.cast(images, tf.float32) / 255.0, tf.cast(masks, tf.float32)
+
+        dataset = dataset.batch(batch_size).map(to_float, num_parallel_calls=tf.data.AUTOTUNE)
+        if augment:
+            # One seed per batch from a stream of the given seed, different in every epoch, so runs are reproducible
+            batch_seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True)
+            dataset = tf.data.Dataset.zip((dataset, batch_seeds)).map(
+                lambda batch, batch_seed: self.augment_batch(*batch, batch_seed), num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def random_affine(self, count, height, width, rng):
+        """count random 2x3 matrices mapping output to input pixel coordinates, drawn like ImageDataGenerator."""
+        settings = self.augmentation
+
+        rotation = np.deg2rad(settings.get('rotation_range', 0))
+        angle = rng.uniform(-rotation, rotation, count)
+        shear = np.deg2rad(settings.get('shear_range', 0))
+        shear_angle = rng.uniform(-shear, shear, count)
+        shift_x = rng.uniform(-1, 1, count) * settings.get('width_shift_range', 0) * width
+        shift_y = rng.uniform(-1, 1, count) * settings.get('height_shift_range', 0) * height
+        zoom_low, zoom_high = settings.get('zoom_range', (1.0, 1.0))
+        zoom_x = rng.uniform(zoom_low, zoom_high, count)
+        zoom_y = rng.uniform(zoom_low, zoom_high, count)
+        flip = np.where(rng.random(count) < 0.5, -1.0, 1.0) if settings.get('horizontal_flip', False) else np.ones(count)
+
+        def stack(rows):
+            # 3x3 nested list of scalars or (count,) arrays -> (count, 3, 3)
+            return np.stack([np.stack(np.broadcast_arrays(*row, np.zeros(count))[:-1], axis=-1) for row in rows], axis=1)
+
+        # Around the image centre: rotate, shift, shear, then zoom (and mirror)
+        center_x, center_y = (width - 1) / 2, (height - 1) / 2
+        to_center = stack([[1, 0, -center_x], [0, 1, -center_y], [0, 0, 1]])
+        from_center = stack([[1, 0, center_x], [0, 1, center_y], [0, 0, 1]])
+        rotate = stack([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+        shift = stack([[1, 0, shift_x], [0, 1, shift_y], [0, 0, 1]])
+        shear_matrix = stack([[1, -np.sin(shear_angle), 0], [0, np.cos(shear_angle), 0], [0, 0, 1]])
+        zoom = stack([[zoom_x * flip, 0, 0], [0, zoom_y, 0], [0, 0, 1]])
+        return (from_center @ rotate @ shift @ shear_matrix @ zoom @ to_center)[:, :2]
+
+    def augment_batch(self, images, masks, seed):
+        """Random rotation, shift, shear, zoom and flip of a batch, identical for each image and its mask.
+
+        The parameters of the whole batch are drawn at once by random_affine from a
+        generator seeded with seed (an int64 scalar tensor). Each image
+        is warped together with its mask (one 4-channel cv2.warpAffine, which releases
+        the GIL), and tf.data runs several batches in parallel.
+        """
+        border = {'nearest': cv2.BORDER_REPLICATE, 'constant': cv2.BORDER_CONSTANT,
+                  'reflect': cv2.BORDER_REFLECT, 'wrap': cv2.BORDER_WRAP}[self.augmentation.get('fill_mode', 'nearest')]
+
+        def warp(images, masks, seed):
+            count, height, width, channels = images.shape
+            warped_images = np.empty_like(images)
+            warped_masks = np.empty_like(masks)
+            rng = np.random.default_rng(int(seed) % 2 ** 64)
+            for index, matrix in enumerate(self.random_affine(count, height, width, rng)):
+                pair = cv2.warpAffine(np.concatenate([images[index], masks[index]], axis=-1), matrix, (width, height),
+                                      flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=border)
+                warped_images[index] = pair[..., :channels]
+                warped_masks[index] = pair[..., channels:]
+            return warped_images, warped_masks
+
+        warped_images, warped_masks = tf.numpy_function(warp, [images, masks, seed], [tf.float32, tf.float32])
+        warped_images.set_shape(images.shape)
+        warped_masks.set_shape(masks.shape)
+        return warped_images, warped_masks
+
     def train(self, image_paths, mask_paths, validation_split=0.2, epochs=100, batch_size=8, 
-              should_stop=lambda: False, es_patience=30, lr_patience=10, use_kfold=False, k_folds=5):
+              should_stop=lambda: False, es_patience=30, lr_patience=10, use_kfold=False, k_folds=5,
+              cache_dir=None, fold_processes=1, seed=42):
         """
         Train the model with optional k-fold cross validation
         
@@ -1309,54 +1826,57 @@ class DuckweedBinarizer:
             Whether to use k-fold cross validation (default: False)
         k_folds : int
             Number of folds for cross-validation (default: 5)
+        cache_dir : str
+            Folder for the on-disk cache of decoded training pairs (default: None, no cache)
+        fold_processes : int
+            Number of folds trained at the same time in worker processes, each with an equal
+            share of the CPU cores (default: 1, folds one after another; None: as many as
+            the cores and the free memory allow)
+        seed : int
+            Seed of the shuffling and augmentation; fold N uses seed + N (default: 42)
         """
         if self.model is None:
             self.build_model()
 
+        image_paths = np.array(image_paths)
+        mask_paths = np.array(mask_paths)
+
+        def datasets(train_idx, val_idx, fold=None):
+            fold_seed = seed if fold is None else seed + fold
+            return self.fold_datasets(image_paths, mask_paths, train_idx, val_idx, batch_size, cache_dir, fold_seed)
+
         with tf.device('/CPU:0'):
-            X, y = self.prepare_training_data(image_paths, mask_paths)
 
             # K-fold cross validation
             if use_kfold:
                 from sklearn.model_selection import KFold
                 
                 kf = KFold(n_splits=k_folds, shuffle=True, random_state=42)
-                fold_histories = []
-                fold_metrics = []
-                
-                for fold, (train_idx, val_idx) in enumerate(kf.split(X)):
-                    print(f"\n--------- Training Fold {fold+1}/{k_folds} ---------")
-                    
-                    # Reset model for each fold
-                    tf.keras.backend.clear_session()
-                    self.build_model()
-                    
-                    # Split data for this fold
-                    X_train, X_val = X[train_idx], X[val_idx]
-                    y_train, y_val = y[train_idx], y[val_idx]
-                    print(f"Fold {fold+1} split: Training = {len(X_train)}, Validation = {len(X_val)}")
-                    
-                    # Train this fold
-                    history = self._train_single_fold(
-                        X_train, y_train, X_val, y_val,
-                        epochs, batch_size, should_stop, 
-                        es_patience, lr_patience, fold
+                splits = list(kf.split(image_paths))
+
+                if fold_processes is None:
+                    memory = available_memory()
+                    fold_processes = min(k_folds, os.cpu_count() or 1,
+                                         max(1, memory // self.fold_memory) if memory else k_folds)
+                if fold_processes > 1:
+                    fold_histories, fold_metrics = self._train_folds_parallel(
+                        image_paths, mask_paths, splits, fold_processes, epochs, batch_size,
+                        should_stop, es_patience, lr_patience, cache_dir, seed
                     )
-                    
-                    if history is None:  # Training stopped by user
-                        break
-                    
-                    # Evaluate model on validation data
-                    val_loss, val_accuracy = self.model.evaluate(X_val, y_val, verbose=1)
-                    fold_metrics.append({
-                        'fold': fold+1,
-                        'val_loss': val_loss,
-                        'val_accuracy': val_accuracy
-                    })
-                    
-                    fold_histories.append(history)
-                    self.model.save(f'model_fold_{fold+1}.keras')
-                    print(f"Model for fold {fold+1} saved")
+                else:
+                    fold_histories = []
+                    fold_metrics = []
+
+                    for fold, (train_idx, val_idx) in enumerate(splits):
+                        print(f"\n--------- Training Fold {fold+1}/{k_folds} ---------")
+                        result = self._train_fold(fold, train_idx, val_idx, datasets,
+                                                  epochs, should_stop, es_patience, lr_patience)
+                        if result is None:  # Training stopped by user
+                            break
+
+                        metrics, history = result
+                        fold_metrics.append(metrics)
+                        fold_histories.append(history)
                 
                 # Summarize results
                 if fold_metrics:
@@ -1368,55 +1888,155 @@ class DuckweedBinarizer:
                     
             # Standard train-validation split
             else:
-                X_train, X_val, y_train, y_val = train_test_split(
-                    X, y, test_size=validation_split, random_state=42
+                from sklearn.model_selection import train_test_split
+
+                train_idx, val_idx = train_test_split(
+                    np.arange(len(image_paths)), test_size=validation_split, random_state=42
                 )
-                print(f"Split: Training = {X_train.shape[0]}, Validation = {X_val.shape[0]}")
+                train_dataset, val_dataset = datasets(train_idx, val_idx)
+                print(f"Split: Training = {len(train_idx)}, Validation = {len(val_idx)}")
                 
                 history = self._train_single_fold(
-                    X_train, y_train, X_val, y_val,
-                    epochs, batch_size, should_stop,
+                    train_dataset, val_dataset,
+                    epochs, should_stop,
                     es_patience, lr_patience, fold=None
                 )
                 
                 if history is not None:
                     self._plot_training_history(history)
                     self.model.save('current_Best_Model.keras')
-                    self.model = load_model('current_Best_Model.keras')
+                    self.model = tf.keras.models.load_model('current_Best_Model.keras')
                 
                 return history
 
-    def _train_single_fold(self, X_train, y_train, X_val, y_val, epochs, batch_size, 
-                          should_stop, es_patience, lr_patience, fold=None):
-        """Train a single fold or standard training"""
-        from tensorflow.keras.preprocessing.image import ImageDataGenerator
-        
-        seed = 42
-        data_gen_args = dict(
-            rotation_range=15,
-            width_shift_range=0.1,
-            height_shift_range=0.1,
-            shear_range=0.05,
-            zoom_range=[0.9, 1.1],
-            horizontal_flip=True,
-            fill_mode='nearest'
+    # Rough peak memory of one fold trained in a worker process (512x512, batch size 2)
+    fold_memory = 2560 * 1024 * 1024
+
+    def fold_datasets(self, image_paths, mask_paths, train_idx, val_idx, batch_size, cache_dir=None, seed=42):
+        """Training (shuffled, augmented) and validation datasets of one split."""
+        # Streamed from the files: only a few batches are in memory at a time
+        train_dataset = self.training_dataset(image_paths[train_idx], mask_paths[train_idx], batch_size,
+                                              shuffle=True, augment=True, cache_dir=cache_dir, seed=seed)
+        val_dataset = self.training_dataset(image_paths[val_idx], mask_paths[val_idx], batch_size,
+                                            cache_dir=cache_dir)
+        return train_dataset, val_dataset
+
+    def _train_fold(self, fold, train_idx, val_idx, datasets, epochs, should_stop, es_patience, lr_patience):
+        """Train, evaluate and save one cross-validation fold: (metrics, history), or None when stopped."""
+        # Reset model for each fold
+        tf.keras.backend.clear_session()
+        self.build_model()
+
+        # Split data for this fold
+        train_dataset, val_dataset = datasets(train_idx, val_idx, fold)
+        print(f"Fold {fold+1} split: Training = {len(train_idx)}, Validation = {len(val_idx)}")
+
+        # Train this fold
+        history = self._train_single_fold(
+            train_dataset, val_dataset,
+            epochs, should_stop,
+            es_patience, lr_patience, fold
         )
+        if history is None:
+            return None
 
-        image_datagen = ImageDataGenerator(**data_gen_args)
-        mask_datagen = ImageDataGenerator(**data_gen_args)
-        
-        image_generator = image_datagen.flow(X_train, batch_size=batch_size, seed=seed)
-        mask_generator = mask_datagen.flow(y_train, batch_size=batch_size, seed=seed)
-        
-        def train_generator():
+        # Evaluate model on validation data
+        val_loss, val_accuracy = self.model.evaluate(val_dataset, verbose=1)
+        metrics = {
+            'fold': fold+1,
+            'val_loss': val_loss,
+            'val_accuracy': val_accuracy
+        }
+
+        self.model.save(f'model_fold_{fold+1}.keras')
+        print(f"Model for fold {fold+1} saved")
+        return metrics, history
+
+    def _train_folds_parallel(self, image_paths, mask_paths, splits, processes, epochs, batch_size,
+                              should_stop, es_patience, lr_patience, cache_dir, seed=42):
+        """Train the folds in worker processes; (fold_histories, fold_metrics) of the finished folds in fold order.
+
+        Every worker builds its own model with cpu_count // processes threads and writes
+        model_fold_N.keras itself. self.model is the model of the last finished fold
+        afterwards, as after sequential training.
+        """
+        cpu_count = os.cpu_count() or 1
+        processes = max(1, min(int(processes or len(splits)), len(splits)))
+        threads_per_fold = max(1, cpu_count // processes)
+        print(f"\n--------- Training {len(splits)} folds with {processes} processes "
+              f"({threads_per_fold} threads each) ---------")
+
+        settings = {
+            'img_height': self.img_height,
+            'img_width': self.img_width,
+            'resize_for_model': self.resize_for_model,
+            'augmentation': self.augmentation,
+            'epochs': epochs,
+            'batch_size': batch_size,
+            'es_patience': es_patience,
+            'lr_patience': lr_patience,
+            'cache_dir': cache_dir,
+            'seed': seed,
+        }
+
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        # The workers' output lines, printed here so that they reach the training log
+        log_queue = context.Queue()
+        results = {}
+
+        def forward_log():
             while True:
-                if should_stop(): 
-                    raise StopIteration("Training stopped by user")
-                X_batch = next(image_generator)
-                y_batch = next(mask_generator)
-                yield X_batch, y_batch
-        
-        train_steps = (len(X_train) + batch_size - 1) // batch_size
+                try:
+                    print(log_queue.get_nowait(), end='')
+                except queue.Empty:
+                    return
+
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_fold_worker,
+                                 initargs=(threads_per_fold, stop_event, log_queue)) as executor:
+            futures = {executor.submit(_train_fold_worker, settings, image_paths, mask_paths,
+                                       fold, train_idx, val_idx): fold
+                       for fold, (train_idx, val_idx) in enumerate(splits)}
+            pending = set(futures)
+            try:
+                while pending:
+                    if should_stop() and not stop_event.is_set():
+                        # Running folds stop after their current batch; waiting ones do not start
+                        stop_event.set()
+                        for future in pending:
+                            future.cancel()
+
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    forward_log()
+                    for future in done:
+                        if future.cancelled():
+                            continue
+                        result = future.result()
+                        if result is not None:
+                            results[futures[future]] = result
+            except BaseException:
+                stop_event.set()
+                for future in pending:
+                    future.cancel()
+                raise
+        forward_log()
+
+        fold_histories = []
+        fold_metrics = []
+        for fold in sorted(results):
+            metrics, history, epoch_times = results[fold]
+            fold_metrics.append(metrics)
+            fold_histories.append(FoldHistory(history, epoch_times))
+
+        if results:
+            from tensorflow.keras.models import load_model  # type: ignore
+            self.model = load_model(f'model_fold_{max(results)+1}.keras')
+        return fold_histories, fold_metrics
+
+    def _train_single_fold(self, train_dataset, val_dataset, epochs, 
+                          should_stop, es_patience, lr_patience, fold=None):
+        """Train a single fold or standard training on the datasets of training_dataset"""
+        from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau, Callback  # type: ignore
         
         model_name = f'model_fold_{fold+1}.keras' if fold is not None else 'current_Best_Model.keras'
         
@@ -1450,23 +2070,21 @@ class DuckweedBinarizer:
             StopTrainingCallback(should_stop)
         ]
         
-        try:
-            history = self.model.fit(
-                train_generator(),
-                steps_per_epoch=train_steps,
-                validation_data=(X_val, y_val),
-                epochs=epochs,
-                callbacks=callbacks,
-                verbose=1
-            )
-            
-            # Store epoch timing info in history
-            history.epoch_times = epoch_timer.epoch_times
-            return history
-        except StopIteration:
+        history = self.model.fit(
+            train_dataset,
+            validation_data=val_dataset,
+            epochs=epochs,
+            callbacks=callbacks,
+            verbose=1
+        )
+        if should_stop():
             print("\nTraining paused by user")
             return None
 
+        # Store epoch timing info in history
+        history.epoch_times = epoch_timer.epoch_times
+        return history
+
     def _summarize_kfold_results(self, fold_metrics, fold_histories):
         """Summarize k-fold results and save per-fold and combined CSVs with timing info."""
         # Save fold-level summary metrics
@@ -1566,165 +2184,210 @@ class DuckweedBinarizer:
         plt.close()
 
 
-    def predict(self, image_path, tile_size=512, overlap=64, save_path=None, save_viz=True, save_enhanced=True):
-
-        # Load the original image
-        original_img = cv2.imread(image_path)
-        if original_img is None:
-            raise ValueError(f"Cannot load image: {image_path}")
-
-        original_img = cv2.cvtColor(original_img, cv2.COLOR_BGR2RGB)
-        original_height, original_width = original_img.shape[:2]
+    def prepare_prediction(self, image, tile_size=512, overlap=64):
+        """Build the uint8 model inputs (resized image or tiles) for an image path or ImageContext."""
+        # Decode the image unless the caller already has it
+        context = image if isinstance(image, ImageContext) else ImageContext.load(image)
+        original_img = context.rgb
+        original_height, original_width = context.height, context.width
 
         # Check if the image is small enough to process directly
         if original_height <= tile_size and original_width <= tile_size:
-            # Predict directly without tiling
             print(f"Image size ({original_width}x{original_height}) is smaller than tile size ({tile_size}x{tile_size}). Predicting without tiling")
-            with tf.device('/CPU:0'):
-                img, _ = self.preprocess_image(image_path)
-                img_batch = np.expand_dims(img, axis=0)
-                prediction = self.model.predict(img_batch)[0]
-        
-                # Resize the prediction to original dimensions if necessary
-                if self.resize_for_model and (prediction.shape[0] != original_height or prediction.shape[1] != original_width):
-                    prediction_resized = cv2.resize(
-                        prediction, (original_width, original_height),
-                        interpolation=cv2.INTER_LINEAR
-                    )
-                else:
-                    prediction_resized = prediction
-        
-                # process the prediction
-                binary_prediction = (prediction_resized > 0.5).astype(np.uint8) * 255
+            img = self.resize_input(original_img)
+            return PredictionRequest(context, np.expand_dims(img, axis=0))
+
+        # Tile-based prediction
+        print(f"Image size ({original_width}x{original_height}) is larger than tile size ({tile_size}x{tile_size}). Using tiled prediction")
+        plan = TilePlan.get(original_height, original_width, tile_size, overlap)
+        print(f"Tile Count: {plan.n_tiles_x}x{plan.n_tiles_y} = {len(plan.origins)}")
+        return PredictionRequest(context, plan.extract_tiles(original_img), plan)
+
+    def run_model(self, batch):
+        """Run one forward pass on a uint8 batch and return the probability maps."""
+        self.last_used = time.time()
+        if self.runner is not None:
+            return self.runner.predict(batch.astype(np.float32) / 255.0)
+
+        # The model may have been rebuilt or retrained since the last compile
+        if self.predict_fn is None or self.predict_fn_model is not self.model:
+            self.compile_predictor(self.jit_compile, report=False)
+
+        # Inputs stay uint8 until the compiled function normalizes them
+        inputs = np.asarray(batch, dtype=np.uint8)
+        batch_size = len(inputs)
+        if self.jit_compile:
+            # XLA compiles one program per shape, so pad the batch up to a power of two
+            padded_size = 1 << (batch_size - 1).bit_length()
+            if padded_size != batch_size:
+                inputs = np.concatenate([inputs, np.zeros((padded_size - batch_size,) + inputs.shape[1:], np.uint8)])
+
+        with tf.device('/CPU:0'):
+            return self.predict_fn(inputs).numpy()[:batch_size]
+
+    def compile_predictor(self, jit_compile=False, report=True):
+        """Wrap the model in a tf.function with a fixed input signature and warm it up.
+
+        model.predict builds a data adapter and a new execution loop on every call;
+        the compiled function is traced once and then called directly. It takes uint8
+        images and does the /255 normalization in the graph.
+        With report=True the warmed-up call is timed against model.predict.
+        """
+        model = self.model
+        input_shape = tuple(model.input_shape[1:])
+
+        @tf.function(input_signature=[tf.TensorSpec((None,) + input_shape, tf.uint8)], jit_compile=jit_compile)
+        def predict_fn(batch):
+            return model(tf.cast(batch, tf.float32) / 255.0, training=False)
+
+        self.jit_compile = jit_compile
+        self.predict_fn = predict_fn
+        self.predict_fn_model = model
+
+        # Trace (and XLA-compile) now, so the first image does not pay for it
+        sample = np.zeros((1,) + input_shape, dtype=np.uint8)
+        with tf.device('/CPU:0'):
+            start_time = time.time()
+            predict_fn(sample)
+            print(f"Predictor compiled{' with XLA' if jit_compile else ''} and warmed up in {time.time() - start_time:.2f}s")
+
+            if report:
+                model.predict(sample / 255.0, verbose=0)
+                start_time = time.time()
+                model.predict(sample / 255.0, verbose=0)
+                predict_time = time.time() - start_time
+
+                start_time = time.time()
+                predict_fn(sample).numpy()
+                compiled_time = time.time() - start_time
+                print(f"Per-call inference: model.predict {predict_time * 1000:.1f} ms, "
+                      f"compiled {compiled_time * 1000:.1f} ms ({predict_time / max(compiled_time, 1e-9):.2f}x speedup)")
+
+    def complete_prediction(self, request, outputs, save_path=None, save_viz=True, save_enhanced=True,
+                            renderer=None, writer=None):
+        """Stitch the model outputs of a prepared request into the binary mask and save visualizations.
+
+        renderer defaults to self.renderer; without a writer (OutputWriter) the visualizations are written synchronously.
+        """
+        original_img = request.original_img
+        original_height, original_width = original_img.shape[:2]
+
+        if request.plan is None:
+            prediction = outputs[0]
+
+            # Resize the prediction to original dimensions if necessary
+            if self.resize_for_model and (prediction.shape[0] != original_height or prediction.shape[1] != original_width):
+                prediction_map = cv2.resize(
+                    prediction, (original_width, original_height),
+                    interpolation=cv2.INTER_LINEAR
+                )
+            else:
+                prediction_map = prediction[:, :, 0]
 
-                # Visualize the prediction
-                self._visualize_prediction(image_path, prediction_resized, save_path, save_viz)
-            
             #  Check if the original image is smaller than the tile size
-            resized_img = cv2.resize(original_img, (self.img_width, self.img_height)) / 255.0 if self.resize_for_model else original_img / 255.0
-            self._visualize_enhanced_prediction(image_path, resized_img, prediction_resized, binary_prediction, save_path, save_enhanced)
-            
+            display_img = cv2.resize(original_img, (self.img_width, self.img_height)) if self.resize_for_model else original_img
         else:
-            # Tile-based prediction
-            print(f"Image size ({original_width}x{original_height}) is larger than tile size ({tile_size}x{tile_size}). Using tiled prediction")
-    
+            plan = request.plan
             prediction_map = np.zeros((original_height, original_width), dtype=np.float32)
-            weight_map = np.zeros((original_height, original_width), dtype=np.float32)
-            effective_tile_size = tile_size - 2 * overlap
-    
-            n_tiles_x = max(1, math.ceil((original_width - tile_size) / effective_tile_size) + 1)
-            n_tiles_y = max(1, math.ceil((original_height - tile_size) / effective_tile_size) + 1)
-    
-            print(f"Tile Count: {n_tiles_x}x{n_tiles_y} = {n_tiles_x * n_tiles_y}")
-    
-            with tf.device('/CPU:0'):
-                # Predict each tile
-                for i in range(n_tiles_y):
-                    for j in range(n_tiles_x):
-                        y_start = min(i * effective_tile_size, max(0, original_height - tile_size))
-                        x_start = min(j * effective_tile_size, max(0, original_width - tile_size))
-                
-                        tile = original_img[y_start:y_start + tile_size, x_start:x_start + tile_size]
-                
-                        tile_normalized = tile / 255.0
-                
-                        h, w = tile.shape[:2]
-                        if h < tile_size or w < tile_size:
-                            padded_tile = np.zeros((tile_size, tile_size, 3), dtype=np.float32)
-                            padded_tile[:h, :w, :] = tile_normalized
-                            tile_normalized = padded_tile
-                
-                        tile_batch = np.expand_dims(tile_normalized, axis=0)
-                        tile_prediction = self.model.predict(tile_batch, verbose=0)[0]  # 첫 번째 차원 제거
-                
-                        weight = np.ones((tile_size, tile_size), dtype=np.float32)
-                
-                        if overlap > 0:
-                            for k in range(overlap):
-                                # Reduce the weight for top and bottom edges
-                                weight[k, :] = weight[k, :] * (k + 1) / (overlap + 1)
-                                weight[tile_size - 1 - k, :] = weight[tile_size - 1 - k] * (k + 1) / (overlap + 1)
-                        
-                                # Reduce the weight for left and right edges 
-                                weight[:, k] = weight[:, k] * (k + 1) / (overlap + 1)
-                                weight[:, tile_size - 1 - k] = weight[:, tile_size - 1 - k] * (k + 1) / (overlap + 1)
-                
-                        weighted_tile_prediction = tile_prediction[:, :, 0] * weight
-                
-                        prediction_map[y_start:y_start + tile_size, x_start:x_start + tile_size] += weighted_tile_prediction
-                        weight_map[y_start:y_start + tile_size, x_start:x_start + tile_size] += weight
-        
-                weight_map = np.maximum(weight_map, 1e-10)
-                prediction_map = prediction_map / weight_map
-        
-                # Process the prediction map
-                binary_prediction = (prediction_map > 0.5).astype(np.uint8) * 255
-        
-                print(f"Prediction range: {prediction_map.min()} ~ {prediction_map.max()}")
+            for n, tile_prediction in enumerate(outputs):
+                plan.accumulate(prediction_map, n, tile_prediction[:, :, 0])
+            prediction_map *= plan.inverse_weight_map
 
-                # Visualize the prediction
-                self._visualize_prediction(image_path, prediction_map, save_path, save_viz)
+            print(f"Prediction range: {prediction_map.min()} ~ {prediction_map.max()}")
+            display_img = original_img
 
-            self._visualize_enhanced_prediction(image_path, original_img / 255.0, prediction_map, binary_prediction, save_path, save_enhanced)
+        # Process the prediction map
+        binary_prediction = (prediction_map > 0.5).astype(np.uint8) * 255
+        request.context.mask = binary_prediction
+
+        # Visualize the prediction
+        renderer = renderer if renderer is not None else self.renderer
+        self._visualize_prediction(request.context, prediction_map, save_path, save_viz, renderer, writer)
+        self._visualize_enhanced_prediction(request.image_path, display_img, prediction_map, binary_prediction, save_path,
+                                            save_enhanced, renderer, writer)
 
         return binary_prediction
 
-    def _visualize_prediction(self, image_path, prediction, save_path=None, save_viz=True):
+    def predict(self, image, tile_size=512, overlap=64, save_path=None, save_viz=True, save_enhanced=True,
+                tile_batch_size=16, renderer=None, writer=None):
+        request = self.prepare_prediction(image, tile_size, overlap)
+
+        # Predict the inputs in chunks of tile_batch_size (one forward pass per chunk)
+        tile_batch_size = max(1, int(tile_batch_size))
+        outputs = [
+            self.run_model(request.inputs[chunk_start:chunk_start + tile_batch_size])
+            for chunk_start in range(0, len(request.inputs), tile_batch_size)
+        ]
+
+        return self.complete_prediction(request, np.concatenate(outputs), save_path, save_viz, save_enhanced,
+                                        renderer, writer)
+
+    def _visualize_prediction(self, context, prediction, save_path=None, save_viz=True, renderer=None, writer=None):
         if not save_viz:
             return
             
-        original_img = cv2.imread(image_path)
-        original_img = cv2.cvtColor(original_img, cv2.COLOR_BGR2RGB)
-        
-        plt.figure(figsize=(12, 5))
-        
-        plt.subplot(1, 2, 1)
-        plt.imshow(original_img)
-        plt.title('Original Image')
-        plt.axis('off')
-        
-        plt.subplot(1, 2, 2)
-        plt.imshow(prediction, cmap='gray')
-        plt.title('Prediction Mask')
-        plt.axis('off')
-        
-        filename = os.path.basename(image_path)
-        base_name = os.path.splitext(filename)[0];
+        original_img = context.rgb
+        base_name = context.base_name
+        renderer = renderer if renderer is not None else self.renderer
+        output_path = renderer.output_path(save_path, 'visualization', base_name)
+
+        if renderer.backend == 'opencv':
+            renderer.render_combined(original_img, prediction, output_path, writer)
+            return
         
-        plt.tight_layout()
-        output_path = os.path.join(save_path, f'visualization_{base_name}.png') if save_path else f'visualization_{base_name}.png'
-        plt.savefig(output_path)
-        plt.close()
+        with plot_lock:
+            plt.figure(figsize=(12, 5))
+
+            plt.subplot(1, 2, 1)
+            plt.imshow(original_img)
+            plt.title('Original Image')
+            plt.axis('off')
+
+            plt.subplot(1, 2, 2)
+            plt.imshow(prediction, cmap='gray')
+            plt.title('Prediction Mask')
+            plt.axis('off')
+
+            plt.tight_layout()
+            plt.savefig(output_path)
+            plt.close()
     
-    def _visualize_enhanced_prediction(self, image_path, original_img, prediction_raw, binary_prediction, save_path=None, save_enhanced=True):
+    def _visualize_enhanced_prediction(self, image_path, original_img, prediction_raw, binary_prediction, save_path=None,
+                                       save_enhanced=True, renderer=None, writer=None):
         if not save_enhanced:
             return
-            
-        plt.figure(figsize=(15, 5))
-        
+
         filename = os.path.basename(image_path)
-        base_name = os.path.splitext(filename)[0];
-        
-        plt.subplot(1, 3, 1)
-        plt.imshow(original_img)
-        plt.title('Original image')
-        plt.axis('off')
-        
-        plt.subplot(1, 3, 2)
-        plt.imshow(prediction_raw, cmap='jet')
-        plt.title('Raw Prediction (Probability)')
-        plt.colorbar(fraction=0.046, pad=0.04)
-        plt.axis('off')
-        
-        plt.subplot(1, 3, 3)
-        plt.imshow(binary_prediction, cmap='gray')
-        plt.title('Final Binary Mask')
-        plt.axis('off')
-        
-        plt.tight_layout()
-        output_path = os.path.join(save_path, f'enhanced_viz_{base_name}.png') if save_path else f'enhanced_viz_{base_name}.png'
-        plt.savefig(output_path)
-        plt.close()
+        base_name = os.path.splitext(filename)[0]
+        renderer = renderer if renderer is not None else self.renderer
+        output_path = renderer.output_path(save_path, 'enhanced_viz', base_name)
+
+        if renderer.backend == 'opencv':
+            renderer.render_enhanced(original_img, prediction_raw, binary_prediction, output_path, writer)
+            return
+            
+        with plot_lock:
+            plt.figure(figsize=(15, 5))
+
+            plt.subplot(1, 3, 1)
+            plt.imshow(original_img)
+            plt.title('Original image')
+            plt.axis('off')
+
+            plt.subplot(1, 3, 2)
+            plt.imshow(prediction_raw, cmap='jet')
+            plt.title('Raw Prediction (Probability)')
+            plt.colorbar(fraction=0.046, pad=0.04)
+            plt.axis('off')
+
+            plt.subplot(1, 3, 3)
+            plt.imshow(binary_prediction, cmap='gray')
+            plt.title('Final Binary Mask')
+            plt.axis('off')
+
+            plt.tight_layout()
+            plt.savefig(output_path)
+            plt.close()
             
     def save_model(self, model_path):
         if self.model is not None:
@@ -1733,13 +2396,66 @@ class DuckweedBinarizer:
         else:
             print("No model to save. Please train the model first!")
 
-    def load_model(self, model_path):
-        if os.path.exists(model_path):
-            with tf.device('/CPU:0'):
-                self.model = load_model(model_path)
-                print(f"Model loaded from {model_path}")
-        else:
+    def load_model(self, model_path, num_threads=None, jit_compile=False):
+        if not os.path.exists(model_path):
             print(f"Model file not found at {model_path}")
+            return
+
+        # The inference backend follows the model file type
+        extension = os.path.splitext(model_path)[1].lower()
+        if extension == '.tflite':
+            self.runner = TFLiteRunner(model_path, num_threads)
+            self.model = None
+            self.backend = 'tflite'
+        elif extension == '.onnx':
+            self.runner = OnnxRunner(model_path, num_threads)
+            self.model = None
+            self.backend = 'onnx'
+        else:
+            with tf.device('/CPU:0'):
+                self.model = tf.keras.models.load_model(model_path)
+            self.runner = None
+            self.backend = 'keras'
+        print(f"Model loaded from {model_path} ({self.backend} backend)")
+
+        if self.backend == 'keras':
+            self.compile_predictor(jit_compile)
+
+    def is_loaded(self):
+        return self.model is not None or self.runner is not None
+
+    def input_size(self):
+        """Side of the square model input, or None when the model takes any size."""
+        if self.model is not None:
+            return self.model.input_shape[1]
+        if isinstance(self.runner, TFLiteRunner):
+            return int(self.runner.input_details['shape'][1])
+        if isinstance(self.runner, OnnxRunner):
+            size = self.runner.session.get_inputs()[0].shape[1]
+            return size if isinstance(size, int) else None
+        return None
+
+    def set_tile_size(self, tile_size):
+        """Predict tile_size x tile_size inputs.
+
+        The U-Net is fully convolutional, so a Keras model is rebuilt for the new input
+        size with the same weights. Exported models keep the size they were exported with.
+        """
+        current_size = self.input_size()
+        if current_size is not None and current_size != tile_size:
+            if self.model is None:
+                raise ValueError(f"The {self.backend} model takes {current_size}x{current_size} inputs, "
+                                 f"not {tile_size}x{tile_size} tiles")
+            if tile_size % 8:
+                raise ValueError(f"Tile size must be a multiple of 8, got {tile_size}")
+            config = self.model.get_config()
+            config['layers'][0]['config']['batch_shape'] = (None, tile_size, tile_size, 3)
+            with tf.device('/CPU:0'):
+                model = tf.keras.Model.from_config(config)
+                model.set_weights(self.model.get_weights())
+            self.model = model
+            self.compile_predictor(self.jit_compile, report=False)
+        self.img_height = self.img_width = tile_size
 
     def evaluate_model(self, image_paths, mask_paths):
         if self.model is None:
@@ -1748,11 +2464,909 @@ class DuckweedBinarizer:
         
             
         with tf.device('/CPU:0'):
-            X, y = self.prepare_training_data(image_paths, mask_paths)
-            loss, accuracy = self.model.evaluate(X, y)
+            loss, accuracy = self.model.evaluate(self.training_dataset(image_paths, mask_paths, batch_size=4))
             print(f"Loss: {loss:.4f}")
             print(f"Test accuracy: {accuracy:.4f}")
 
+def available_memory():
+    """Available physical memory in bytes, or None when it cannot be determined."""
+    if sys.platform == 'win32':
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+class ModelRegistry:
+    """Process-wide cache of loaded, warmed-up binarizers.
+
+    Entries are keyed by model path, file mtime and load options, so a retrained or
+    re-exported model file is loaded again. Models that have not predicted for
+    idle_timeout seconds are dropped, as are the least recently used ones while
+    available memory is below min_free_memory. Dropping only removes the registry's
+    reference: a binarizer that a caller still holds keeps working, and its memory is
+    freed once the caller lets go of it.
+    """
+    def __init__(self, idle_timeout=900, min_free_memory=1024 ** 3, max_models=2, img_size=512):
+        self.idle_timeout = idle_timeout
+        self.min_free_memory = min_free_memory
+        self.max_models = max_models
+        self.img_size = img_size
+        # key -> binarizer, least recently used first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # key -> Future of a load in progress; the lock is not held while a model loads
+        self.loading = {}
+        self.loads = 0
+        self.hits = 0
+        self.reaper = None
+        # Binarizers that stay loaded until unpinned (e.g. by a running InferenceService)
+        self.pinned = set()
+
+    def get(self, model_path, num_threads=None, jit_compile=False, tile_size=None):
+        """Loaded binarizer for model_path; raises ValueError if the file does not exist.
+
+        With tile_size, the model predicts tiles of that size (see DuckweedBinarizer.set_tile_size).
+        """
+        if not os.path.exists(model_path):
+            raise ValueError(f"Error: '{model_path}' file not found")
+        path = os.path.abspath(model_path)
+        key = (path, os.path.getmtime(path), num_threads, jit_compile, tile_size)
+
+        with self.lock:
+            self.evict_idle()
+            binarizer = self.entries.get(key)
+            if binarizer is not None:
+                binarizer.last_used = time.time()
+                self.entries.move_to_end(key)
+                self.hits += 1
+                print(f"'{model_path}' : reusing the loaded model")
+                return binarizer
+
+            future = self.loading.get(key)
+            loader = future is None
+            if loader:
+                future = Future()
+                self.loading[key] = future
+                # Older versions of the same file are not needed anymore; other load options of it still are
+                for stale_key in [k for k in self.entries if k[0] == path and k[1] != key[1]]:
+                    self.evict(stale_key, "model file changed")
+                self.make_room()
+
+        if not loader:
+            # Another caller is loading the same model; its load error is raised here as well
+            print(f"'{model_path}' : waiting for the model being loaded")
+            return future.result()
+
+        try:
+            binarizer = self.load(path, num_threads, jit_compile, tile_size)
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.loading[key]
+            binarizer.last_used = time.time()
+            self.entries[key] = binarizer
+            self.loads += 1
+            self.start_reaper()
+        future.set_result(binarizer)
+        return binarizer
+
+    def load(self, path, num_threads, jit_compile, tile_size):
+        """New warmed-up binarizer for the model file (called without the registry lock)."""
+        binarizer = DuckweedBinarizer(img_height=self.img_size, img_width=self.img_size)
+        print(f"'{os.path.basename(path)}' : loading")
+        binarizer.load_model(path, num_threads=num_threads, jit_compile=jit_compile)
+        if binarizer.runner is not None:
+            # The Keras predictor is warmed up by compile_predictor; warm the exported runtimes here
+            binarizer.run_model(np.zeros((1, self.img_size, self.img_size, 3), np.uint8))
+        if tile_size is not None:
+            binarizer.set_tile_size(tile_size)
+        return binarizer
+
+    def evict(self, key, reason):
+        # The binarizer itself is left alone: callers may still be predicting with it
+        del self.entries[key]
+        print(f"Model registry: released '{os.path.basename(key[0])}' ({reason})")
+
+    def pin(self, binarizer):
+        """Keep binarizer loaded, also when idle or short of memory, until unpin()."""
+        with self.lock:
+            self.pinned.add(id(binarizer))
+
+    def unpin(self, binarizer):
+        with self.lock:
+            self.pinned.discard(id(binarizer))
+
+    def evictable(self):
+        return [key for key, binarizer in self.entries.items() if id(binarizer) not in self.pinned]
+
+    def evict_idle(self):
+        now = time.time()
+        for key in [k for k in self.evictable() if now - self.entries[k].last_used > self.idle_timeout]:
+            self.evict(key, "idle")
+
+    def make_room(self):
+        """Drop least recently used models before a new one is loaded (loads in progress count as loaded)."""
+        while len(self.entries) + len(self.loading) > self.max_models and self.evictable():
+            self.evict(self.evictable()[0], "registry full")
+        while self.evictable():
+            free_memory = available_memory()
+            if free_memory is None or free_memory >= self.min_free_memory:
+                break
+            self.evict(self.evictable()[0], "low memory")
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self.evict(key, "cleared")
+
+    def start_reaper(self):
+        """Daemon thread that releases idle models also when no further analysis starts."""
+        if self.reaper is not None:
+            return
+
+        def reap():
+            while True:
+                time.sleep(max(1.0, self.idle_timeout / 4))
+                with self.lock:
+                    self.evict_idle()
+
+        self.reaper = Thread(target=reap, daemon=True)
+        self.reaper.start()
+
+# Shared by the GUI, the analyze command and ProcessImage calls of this process
+model_registry = ModelRegistry()
+
+class InferenceProfiles:
+    """Tuned inference settings per machine and model, written by the autotune command.
+
+    Stored as inferenceProfiles.json in ~/.siperea. A profile holds tile_size, overlap,
+    batch_size and threads with the measured images/s and IoU. It is found by the
+    machine (host name, processor, CPU count) and the SHA-1 of the model file, so a
+    retrained or re-exported model is not run with the settings of another one.
+    """
+    filename = 'inferenceProfiles.json'
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else os.path.join(os.path.expanduser('~'), '.siperea', self.filename)
+
+    @staticmethod
+    def machine_key():
+        return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}"
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read {self.path}. Error: {e}")
+            return {}
+
+    def lookup(self, model_path, model_hash=None):
+        """Profile of this machine for the model file, or None."""
+        if model_hash is None:
+            if not os.path.exists(model_path):
+                return None
+            model_hash = file_sha1(model_path)
+        return self.load().get(self.machine_key(), {}).get(model_hash)
+
+    def save(self, model_path, profile, model_hash=None):
+        data = self.load()
+        model_hash = model_hash if model_hash is not None else file_sha1(model_path)
+        data.setdefault(self.machine_key(), {})[model_hash] = dict(profile, model=os.path.basename(model_path))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, self.path)
+        print(f"Inference profile saved to {self.path}")
+
+def read_roi_file(folder_path, roi_path=None):
+    if roi_path is None:
+        roi_path = os.path.join(folder_path, 'ROI.csv')
+    elif not os.path.exists(roi_path):
+        raise ValueError(f"ROI file not found: {roi_path}")
+    if os.path.exists(roi_path):
+        roi_data = pd.read_csv(roi_path)
+        print(f"ROI loading completed: ROI count = {len(roi_data)}")
+        return roi_data
+    else:
+        print("ROI.csv not found. Single ROI assigned")
+        return None
+
+def count_white_pixels(binary_image, roi_info):
+    isDeubgging = False
+    x1, y1, x2, y2 = int(roi_info['X1']), int(roi_info['Y1']), int(roi_info['X2']), int(roi_info['Y2'])
+
+    # Compute the extended ROI region
+    img_height, img_width = binary_image.shape
+    extended_x2 = min(x2 + 1, img_width)
+    extended_y2 = min(y2 + 1, img_height)
+
+    roi_region = binary_image[y1:extended_y2, x1:extended_x2]
+
+    if isDeubgging:
+        roi_filename = f"roi_x{x1}y{y1}_{extended_x2}y{extended_y2}.png"
+        cv2.imwrite(roi_filename, roi_region)
+
+    if roi_info['Shape'].lower() == 'circle':
+        # Compute the center and radius for the circular ROI
+        height, width = roi_region.shape
+        center_x = width // 2
+        center_y = height // 2
+        radius = min(width, height) // 2 + 1
+
+        # Generate a grid of coordinates
+        y, x = np.ogrid[:height, :width]
+
+        # Compute the distance from the center
+        dist_from_center = (x - center_x)**2 + (y - center_y)**2
+
+        # Generate a mask for the circular ROI
+        mask = dist_from_center <= radius**2
+
+        # Generate the mask image
+        mask_image = mask.astype(np.uint8) * 255
+
+        if isDeubgging:
+            mask_filename = f"mask_x{x1}y{y1}_{extended_x2}y{extended_y2}.png"
+            cv2.imwrite(mask_filename, mask_image)
+
+        # Count white pixels in the circular ROI
+        white_pixels = (roi_region == 255) & mask
+        roi_region_masked = white_pixels.astype(np.uint8) * 255
+        if isDeubgging:
+            result_filename = f"result_x{x1}y{y1}_{extended_x2}y{extended_y2}.png"
+            cv2.imwrite(result_filename, roi_region_masked)
+
+        white_count = np.sum(white_pixels)
+        print(f"ROI at ({x1}, {y1}, {extended_x2}, {extended_y2}): {white_count} white pixels")
+
+        return white_count
+    else:
+        # Compute the rectangular ROI region
+        white_count = np.sum(roi_region == 255)
+        print(f"ROI at ({x1}, {y1}, {extended_x2}, {extended_y2}): {white_count} white pixels")
+        return white_count
+
+def create_column_name(roi_row):
+    parts = []
+    if not pd.isna(roi_row['Condition1']):
+        parts.append(str(roi_row['Condition1']))
+    if not pd.isna(roi_row['Condition2']):
+        parts.append(str(roi_row['Condition2']))
+    if not pd.isna(roi_row['Plate#']):
+        parts.append(f"P{roi_row['Plate#']}")
+    return "||".join(parts)
+
+def parse_capture_time(filename, verbose=True):
+    """Parse the capture time from 'YYYY-MM-DD (HH-mm-ss-mmm)-(...)' file names; None if it does not match."""
+    try:
+        parts = filename.split(' ')
+        if len(parts) < 2:
+            if verbose:
+                print(f"Warning: Invalid filename format for {filename}. Expected format: 'YYYY-MM-DD (HH-mm-ss-mmm)'")
+            return None
+
+        # Parse the date part
+        date_str = parts[0]
+        if not date_str.count('-') == 2:
+            if verbose:
+                print(f"Warning: Invalid date format in {filename}. Expected 'YYYY-MM-DD'")
+            return None
+        year, month, day = map(int, date_str.split('-'))
+
+        # Parse the time part
+        time_part = parts[1].split('-(')[0].strip('()')
+        if not time_part.count('-') == 3:
+            if verbose:
+                print(f"Warning: Invalid time format in {filename}. Expected '(HH-mm-ss-mmm)'")
+            return None
+        hour, minute, second, millisec = map(int, time_part.split('-'))
+
+        # Create datetime object
+        return datetime(year, month, day, hour, minute, second, millisec * 1000)
+
+    except (ValueError, IndexError) as e:
+        if verbose:
+            print(f"Warning: Could not process {filename}. Error: {str(e)}")
+        return None
+
+class RoiLayout:
+    """ROI.csv compiled once per run for area counting.
+
+    Column names are built up front, and per image size every ROI gets its clipped
+    slices and, for circles, its mask. A frame is then thresholded once and each ROI
+    count is a count_nonzero over a view, without per-ROI rows, masks or prints.
+    Counts match count_white_pixels, also for overlapping ROIs.
+    """
+    def __init__(self, roi_data=None):
+        self.roi_data = roi_data
+        if roi_data is None:
+            self.rois = []
+            self.columns = ['Total']
+        else:
+            rows = [roi for _, roi in roi_data.iterrows()]
+            self.rois = [(str(roi['Shape']).lower(), int(roi['X1']), int(roi['Y1']), int(roi['X2']), int(roi['Y2']))
+                         for roi in rows]
+            self.columns = [create_column_name(roi) for roi in rows]
+        # (height, width) -> [(row slice, column slice, circle mask or None) per ROI]
+        self.compiled = {}
+
+    @classmethod
+    def of(cls, roi_data):
+        """roi_data as a RoiLayout, compiling a DataFrame (or None) if needed."""
+        return roi_data if isinstance(roi_data, cls) else cls(roi_data)
+
+    @staticmethod
+    def roi_region(shape, x1, y1, x2, y2, height, width):
+        """Slices and circle mask (None for rectangles) of one ROI, clipped like count_white_pixels."""
+        rows = slice(y1, min(y2 + 1, height))
+        columns = slice(x1, min(x2 + 1, width))
+        if shape != 'circle':
+            return rows, columns, None
+        region_height = len(range(height)[rows])
+        region_width = len(range(width)[columns])
+        radius = min(region_width, region_height) // 2 + 1
+        y, x = np.ogrid[:region_height, :region_width]
+        mask = (x - region_width // 2) ** 2 + (y - region_height // 2) ** 2 <= radius ** 2
+        return rows, columns, mask
+
+    def count(self, binary_image):
+        """White pixel count per ROI column of one binary mask."""
+        foreground = binary_image == 255
+        if not self.rois:
+            return {'Total': int(np.count_nonzero(foreground))}
+
+        shape = foreground.shape
+        if shape not in self.compiled:
+            self.compiled[shape] = [self.roi_region(*roi, *shape) for roi in self.rois]
+
+        counts = [np.count_nonzero(foreground[rows, columns] & mask) if mask is not None
+                  else np.count_nonzero(foreground[rows, columns])
+                  for rows, columns, mask in self.compiled[shape]]
+
+        # Like the per-ROI loop, a repeated column name keeps the last ROI
+        return {column: int(count) for column, count in zip(self.columns, counts)}
+
+def count_roi_areas(binary_image, roi_data):
+    """White pixel count per ROI column; a single 'Total' ROI covers the whole image when roi_data is None.
+
+    roi_data is the ROI.csv DataFrame or, for repeated calls, its compiled RoiLayout.
+    """
+    return RoiLayout.of(roi_data).count(binary_image)
+
+def file_sha1(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AnalysisManifest:
+    """Per-folder record of the analyzed images, so that a re-run only infers new or changed images.
+
+    Stored as analysisManifest.json next to resultArea.csv. Each image entry keeps its
+    file signature (size and mtime, or a content hash with hash_content=True), its
+    capture time and ROI areas. A different model file or ROI.csv invalidates every entry.
+    The manifest is saved every save_interval images, so a stopped or crashed run resumes
+    where it left off.
+    """
+    filename = 'analysisManifest.json'
+    version = 1
+
+    def __init__(self, folder, model_path, roi_path=None, hash_content=False, save_interval=10, model_hash=None):
+        self.path = os.path.join(folder, self.filename)
+        self.hash_content = hash_content
+        self.save_interval = max(1, int(save_interval))
+        # model_hash is given when the model is on an inference server
+        self.model_hash = model_hash if model_hash is not None else file_sha1(model_path)
+        if roi_path is None:
+            roi_path = os.path.join(folder, 'ROI.csv')
+        self.roi_hash = file_sha1(roi_path) if os.path.exists(roi_path) else None
+        self.images = {}
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read {self.path}, analyzing all images. Error: {e}")
+            return
+
+        if data.get('version') != self.version or data.get('hash_content') != self.hash_content:
+            print("Manifest format changed: analyzing all images")
+        elif data.get('model_hash') != self.model_hash:
+            print("Model file changed since the last analysis: analyzing all images")
+        elif data.get('roi_hash') != self.roi_hash:
+            print("ROI.csv changed since the last analysis: analyzing all images")
+        else:
+            self.images = data.get('images', {})
+
+    def signature(self, image_path):
+        stat = os.stat(image_path)
+        signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if self.hash_content:
+            signature['sha1'] = file_sha1(image_path)
+        return signature
+
+    def pending(self, image_paths, prune=True):
+        """Images without an up-to-date entry.
+
+        Entries of changed images and, with prune=True (image_paths is the whole
+        folder), of images that no longer exist are dropped, so rows() only
+        returns results that are still valid.
+        """
+        names = {os.path.basename(image_path) for image_path in image_paths}
+        with self.lock:
+            pending = [image_path for image_path in image_paths
+                       if self.images.get(os.path.basename(image_path), {}).get('signature') != self.signature(image_path)]
+            stale = {os.path.basename(image_path) for image_path in pending}
+            for filename in list(self.images):
+                if (prune and filename not in names) or filename in stale:
+                    del self.images[filename]
+            return pending
+
+    def record(self, image_path, capture_time, roi_areas):
+        entry = {
+            'signature': self.signature(image_path),
+            'capture_time': capture_time.isoformat() if capture_time is not None else None,
+            'roi_areas': {name: int(area) for name, area in roi_areas.items()} if roi_areas is not None else None,
+        }
+        with self.lock:
+            self.images[os.path.basename(image_path)] = entry
+            self.unsaved += 1
+            save_now = self.unsaved >= self.save_interval
+        if save_now:
+            self.save()
+
+    def rows(self):
+        """(filename, capture_time, roi_areas) of every image with areas, in capture-time order."""
+        with self.lock:
+            rows = [(filename, datetime.fromisoformat(entry['capture_time']), entry['roi_areas'])
+                    for filename, entry in self.images.items()
+                    if entry['capture_time'] is not None and entry['roi_areas'] is not None]
+        return sorted(rows, key=lambda row: (row[1], row[0]))
+
+    def save(self):
+        with self.lock:
+            data = {
+                'version': self.version,
+                'hash_content': self.hash_content,
+                'model_hash': self.model_hash,
+                'roi_hash': self.roi_hash,
+                'images': self.images,
+            }
+            # Write to a temporary file first so that a crash never leaves a truncated manifest
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+            os.replace(temp_path, self.path)
+            self.unsaved = 0
+
+class ResultsSink:
+    """Buffered writer of the per-image ROI areas of an analysis.
+
+    Rows are collected in per-column lists and written in batches, once flush_rows
+    rows are waiting or flush_interval seconds have passed since the last write, and
+    on close(). result_format 'csv' keeps the resultArea.csv layout, 'parquet' writes
+    resultArea.parquet with a 'Capture time' timestamp column, a float 'Time(day)'
+    and int64 areas, and 'both' writes both files. The Parquet file is written to a
+    temporary file and replaces resultArea.parquet on close(), so the previous
+    complete file stays readable during a run. resume() keeps a resultArea.csv that is
+    still up to date, so a re-run only appends the rows of its new images.
+    """
+    formats = ('csv', 'parquet', 'both')
+
+    def __init__(self, folder, result_format='csv', first_time=None, flush_rows=100, flush_interval=5.0):
+        if result_format not in self.formats:
+            raise ValueError(f"Unknown result format: {result_format}")
+        self.csv_path = os.path.join(folder, 'resultArea.csv') if result_format in ('csv', 'both') else None
+        self.parquet_path = os.path.join(folder, 'resultArea.parquet') if result_format in ('parquet', 'both') else None
+        self.first_time = first_time
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval = flush_interval
+        self.columns = None
+        self.csv_header_written = False
+        self.parquet_writer = None
+        self.last_flush = time.monotonic()
+        self.clear_buffer()
+
+        if self.parquet_path is not None:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("pyarrow is required for Parquet results (pip install pyarrow)")
+
+    def clear_buffer(self):
+        self.filenames = []
+        self.capture_times = []
+        self.areas = []
+
+    def append(self, filename, capture_time, roi_areas):
+        self.buffer_row(filename, capture_time, roi_areas)
+        if len(self.filenames) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def buffer_row(self, filename, capture_time, roi_areas):
+        if self.columns is None:
+            self.columns = list(roi_areas)
+        if self.first_time is None:
+            self.first_time = capture_time
+        self.filenames.append(filename)
+        self.capture_times.append(capture_time)
+        self.areas.append([int(roi_areas.get(column, 0)) for column in self.columns])
+
+    def resume(self, rows):
+        """Start from the rows of earlier runs [(filename, capture_time, roi_areas), ...] in capture-time order.
+
+        An existing resultArea.csv that holds exactly these rows is kept and appended to;
+        otherwise the rows are written again. The Parquet file cannot be appended to, so
+        its rows are always written again.
+        """
+        if self.csv_path is None or not self.csv_holds(rows):
+            self.rewrite(rows)
+            return
+
+        self.columns = list(rows[0][2]) if rows else None
+        self.csv_header_written = bool(rows)
+        if self.first_time is None and rows:
+            self.first_time = rows[0][1]
+        if self.parquet_path is not None:
+            for start in range(0, len(rows), self.flush_rows):
+                for filename, capture_time, roi_areas in rows[start:start + self.flush_rows]:
+                    self.buffer_row(filename, capture_time, roi_areas)
+                self.flush(csv_file=False)
+
+    def csv_holds(self, rows):
+        """Whether resultArea.csv is complete and has exactly the lines that rows would be written as."""
+        if not os.path.exists(self.csv_path):
+            return not rows
+        if not rows:
+            return False
+        with open(self.csv_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                # The last line was cut off
+                return False
+
+        first_time = self.first_time if self.first_time is not None else rows[0][1]
+        columns = list(rows[0][2])
+        with open(self.csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            if next(reader, None) != ['File name', 'Time(day)'] + columns:
+                return False
+            count = 0
+            for line, (filename, capture_time, roi_areas) in zip(reader, rows):
+                day = (capture_time - first_time).total_seconds() / (24 * 3600)
+                if line != [filename, f"{day:.3f}"] + [str(int(roi_areas.get(column, 0))) for column in columns]:
+                    return False
+                count += 1
+            return count == len(rows) and next(reader, None) is None
+
+    def rewrite(self, rows):
+        """Replace the result files with rows [(filename, capture_time, roi_areas), ...]."""
+        self.close_parquet(publish=False)
+        self.clear_buffer()
+        self.columns = None
+        self.csv_header_written = False
+        if self.csv_path is not None and os.path.exists(self.csv_path):
+            os.remove(self.csv_path)
+        for filename, capture_time, roi_areas in rows:
+            self.append(filename, capture_time, roi_areas)
+        self.flush()
+
+    def flush(self, csv_file=True):
+        self.last_flush = time.monotonic()
+        if not self.filenames:
+            return
+        days = np.array([(capture_time - self.first_time).total_seconds() / (24 * 3600)
+                         for capture_time in self.capture_times], dtype=np.float64)
+        areas = np.array(self.areas, dtype=np.int64).reshape(len(self.filenames), len(self.columns))
+        if self.csv_path is not None and csv_file:
+            self.write_csv(days, areas)
+        if self.parquet_path is not None:
+            self.write_parquet(days, areas)
+        self.clear_buffer()
+
+    def write_csv(self, days, areas):
+        with open(self.csv_path, 'a' if self.csv_header_written else 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            if not self.csv_header_written:
+                writer.writerow(['File name', 'Time(day)'] + self.columns)
+                self.csv_header_written = True
+            writer.writerows([filename, f"{day:.3f}", *row]
+                             for filename, day, row in zip(self.filenames, days, areas.tolist()))
+
+    def write_parquet(self, days, areas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays = [pa.array(self.filenames, pa.string()),
+                  pa.array(self.capture_times, pa.timestamp('ms')),
+                  pa.array(days, pa.float64())]
+        arrays += [pa.array(areas[:, index], pa.int64()) for index in range(len(self.columns))]
+        table = pa.Table.from_arrays(arrays, names=['File name', 'Capture time', 'Time(day)'] + self.columns)
+        if self.parquet_writer is None:
+            self.parquet_writer = pq.ParquetWriter(self.parquet_path + '.tmp', table.schema, compression='zstd')
+        self.parquet_writer.write_table(table)
+
+    def close_parquet(self, publish=True):
+        if self.parquet_writer is None:
+            return
+        self.parquet_writer.close()
+        self.parquet_writer = None
+        if publish:
+            os.replace(self.parquet_path + '.tmp', self.parquet_path)
+        else:
+            os.remove(self.parquet_path + '.tmp')
+
+    def close(self):
+        self.flush()
+        if self.parquet_writer is None and self.parquet_path is not None and self.columns is None:
+            # No rows at all: an old file would show results that are no longer valid
+            if os.path.exists(self.parquet_path):
+                os.remove(self.parquet_path)
+        self.close_parquet()
+
+class FolderWatcher:
+    """Polls a folder for image files that have been written completely.
+
+    A file is reported once its size and mtime have not changed for settle_time
+    seconds and, for JPEGs, it ends with the end-of-image marker. Files already
+    reported are reported again only when they change.
+    """
+    def __init__(self, folder, settle_time=1.0, extensions=IMAGE_EXTENSIONS):
+        self.folder = folder
+        self.settle_time = settle_time
+        self.extensions = extensions
+        self.reported = {}
+        self.candidates = {}
+
+    def mark_reported(self, image_paths):
+        for image_path in image_paths:
+            stat = os.stat(image_path)
+            self.reported[os.path.basename(image_path)] = (stat.st_size, stat.st_mtime_ns)
+
+    def poll(self):
+        now = time.time()
+        ready = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(self.extensions):
+                    continue
+                stat = entry.stat()
+                key = (stat.st_size, stat.st_mtime_ns)
+                if self.reported.get(entry.name) == key:
+                    continue
+
+                # Wait until the file has stopped growing
+                candidate = self.candidates.get(entry.name)
+                if candidate is None or candidate[0] != key:
+                    self.candidates[entry.name] = (key, now)
+                    continue
+                if now - candidate[1] < self.settle_time or not self.is_complete(entry.path):
+                    continue
+
+                del self.candidates[entry.name]
+                self.reported[entry.name] = key
+                ready.append(entry.path)
+        return sorted(ready)
+
+    @staticmethod
+    def is_complete(image_path):
+        if not image_path.lower().endswith(('.jpg', '.jpeg')):
+            return True
+        try:
+            with open(image_path, 'rb') as f:
+                f.seek(-2, os.SEEK_END)
+                return f.read(2) == b'\xff\xd9'
+        except OSError:
+            return False
+
+class ImageCatalog:
+    """SQLite index of the images of one folder.
+
+    The catalog is stored in ~/.siperea/catalogs (one file per folder path, see
+    catalog_dir), so nothing is written into the image folder. refresh() walks the
+    folder with os.scandir and parses only new files. The walk is skipped while the
+    folder modification time is unchanged, but only when that time is clearly older
+    than the last walk (FAT keeps it to 2 s) and the last walk is less than
+    rescan_interval seconds ago (network shares do not always update it).
+    Each row keeps the file name, capture and completion time from the acquisition
+    file name, the camera (the acquisition program writes one subfolder per camera),
+    size, mtime and the analysis status ('new', 'analyzed' or 'failed'). Listing
+    the images in capture-time order or within a time window is an index lookup.
+    """
+    # Folder mtimes this close to the last walk may hide files added in the same tick
+    mtime_resolution = 2.0
+
+    def __init__(self, folder, extensions=IMAGE_EXTENSIONS, catalog_dir=None,
+                 rescan_interval=300.0):
+        import sqlite3
+
+        self.folder = folder
+        self.extensions = extensions
+        self.camera = os.path.basename(os.path.normpath(folder))
+        self.rescan_interval = rescan_interval
+        self.lock = threading.Lock()
+        if catalog_dir is None:
+            catalog_dir = os.path.join(os.path.expanduser('~'), '.siperea', 'catalogs')
+        folder_key = hashlib.sha1(os.path.normcase(os.path.abspath(folder)).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(catalog_dir, f"{self.camera}_{folder_key}.sqlite")
+        try:
+            os.makedirs(catalog_dir, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        except (OSError, sqlite3.Error) as e:
+            # No writable app-data folder: keep the catalog in memory for this session
+            print(f"Warning: Could not open the image catalog {self.path}, using a temporary one. Error: {e}")
+            self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "filename TEXT PRIMARY KEY, capture_time TEXT, completed_time TEXT, camera TEXT, "
+                "size INTEGER, mtime_ns INTEGER, status TEXT NOT NULL DEFAULT 'new')")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS images_by_time ON images (capture_time, filename)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS images_by_status ON images (status)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS folder_state (key TEXT PRIMARY KEY, value INTEGER)")
+
+    @staticmethod
+    def format_time(value):
+        # Fixed-width text, so that text order is time order
+        return value.isoformat(sep=' ', timespec='microseconds') if value is not None else None
+
+    @staticmethod
+    def parse_completed_time(filename, capture_time):
+        """Completion time from the '(HH-mm-ss-mmm)' after the capture time; None if missing."""
+        try:
+            completed_part = filename.split(')-(')[1].split(')')[0]
+            hour, minute, second, millisec = map(int, completed_part.split('-'))
+            completed_time = capture_time.replace(hour=hour, minute=minute, second=second, microsecond=millisec * 1000)
+        except (IndexError, ValueError, AttributeError):
+            return None
+        # A download that finished after midnight
+        if completed_time < capture_time:
+            completed_time += timedelta(days=1)
+        return completed_time
+
+    def entry_row(self, name, stat):
+        capture_time = parse_capture_time(name, verbose=False)
+        return (name, self.format_time(capture_time), self.format_time(self.parse_completed_time(name, capture_time)),
+                self.camera, stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self, image_paths=None, check_changes=False):
+        """Add new images and drop deleted ones; returns (added or changed, removed).
+
+        check_changes=True also compares size and mtime of the known files (the
+        analysis manifest does that for the images it analyzes). With image_paths
+        only those files are updated (e.g. new frames of live mode).
+        """
+        with self.lock:
+            folder_mtime = None
+            if image_paths is None:
+                folder_mtime = os.stat(self.folder).st_mtime_ns
+                scan_time = time.time_ns()
+                if not check_changes and self.folder_unchanged(folder_mtime, scan_time):
+                    return 0, 0
+
+            known = {name: (size, mtime_ns) for name, size, mtime_ns
+                     in self.connection.execute("SELECT filename, size, mtime_ns FROM images")}
+            updates = []
+            present = set()
+            if image_paths is None:
+                with os.scandir(self.folder) as entries:
+                    for entry in entries:
+                        if not entry.name.lower().endswith(self.extensions) or not entry.is_file():
+                            continue
+                        present.add(entry.name)
+                        if entry.name in known and not check_changes:
+                            continue
+                        stat = entry.stat()
+                        if known.get(entry.name) != (stat.st_size, stat.st_mtime_ns):
+                            updates.append(self.entry_row(entry.name, stat))
+                removed = [(name,) for name in known if name not in present]
+            else:
+                for image_path in image_paths:
+                    name = os.path.basename(image_path)
+                    stat = os.stat(image_path)
+                    if known.get(name) != (stat.st_size, stat.st_mtime_ns):
+                        updates.append(self.entry_row(name, stat))
+                removed = []
+
+            with self.connection:
+                # A changed file has to be analyzed again
+                self.connection.executemany(
+                    "INSERT INTO images (filename, capture_time, completed_time, camera, size, mtime_ns, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'new') ON CONFLICT(filename) DO UPDATE SET "
+                    "capture_time=excluded.capture_time, completed_time=excluded.completed_time, "
+                    "camera=excluded.camera, size=excluded.size, mtime_ns=excluded.mtime_ns, status='new'", updates)
+                self.connection.executemany("DELETE FROM images WHERE filename = ?", removed)
+                if folder_mtime is not None:
+                    self.connection.executemany("INSERT OR REPLACE INTO folder_state VALUES (?, ?)",
+                                                [('mtime_ns', folder_mtime), ('scanned_ns', scan_time)])
+        return len(updates), len(removed)
+
+    def folder_unchanged(self, folder_mtime, now_ns):
+        """True when the last walk is still valid: files were added or removed only if the folder mtime changed."""
+        state = dict(self.connection.execute("SELECT key, value FROM folder_state"))
+        if state.get('mtime_ns') != folder_mtime or 'scanned_ns' not in state:
+            return False
+        scanned = state['scanned_ns']
+        return (scanned - folder_mtime > self.mtime_resolution * 1e9
+                and now_ns - scanned < self.rescan_interval * 1e9)
+
+    def image_paths(self, start=None, end=None, status=None):
+        """Image paths in capture-time order (unparsable names last), optionally within [start, end] or by status."""
+        conditions = []
+        parameters = []
+        if start is not None:
+            conditions.append("capture_time >= ?")
+            parameters.append(self.format_time(start))
+        if end is not None:
+            conditions.append("capture_time <= ?")
+            parameters.append(self.format_time(end))
+        if status is not None:
+            conditions.append("status = ?")
+            parameters.append(status)
+        # Two queries, so the timed images are read in index order
+        where = " AND ".join(conditions + ["capture_time IS NOT NULL"])
+        with self.lock:
+            names = [name for name, in self.connection.execute(
+                f"SELECT filename FROM images WHERE {where} ORDER BY capture_time, filename", parameters)]
+            if start is None and end is None:
+                where = " AND ".join(conditions + ["capture_time IS NULL"])
+                names += [name for name, in self.connection.execute(
+                    f"SELECT filename FROM images WHERE {where} ORDER BY filename", parameters)]
+        return [os.path.join(self.folder, name) for name in names]
+
+    def capture_times(self):
+        """{file name: capture time} of every image with a parsable name."""
+        with self.lock:
+            rows = self.connection.execute("SELECT filename, capture_time FROM images WHERE capture_time IS NOT NULL").fetchall()
+        return {name: datetime.fromisoformat(value) for name, value in rows}
+
+    def set_status(self, image_paths, status):
+        with self.lock, self.connection:
+            self.connection.executemany("UPDATE images SET status = ? WHERE filename = ?",
+                                        [(status, os.path.basename(image_path)) for image_path in image_paths])
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
 def collect_dataset(original_dir, binary_dir, extensions=('.jpg', '.png', '.jpeg')):
     image_paths = []
     mask_paths = []
@@ -1793,87 +3407,639 @@ def check_mask_quality(mask_paths):
     
     return has_binary_masks
 
-def ProcessFolder(input_folder, output_folder=None, enhanced_output_folder=None, save_viz=True, save_enhanced=True):
-    batch_size = 2
+class SegmentationMetrics:
+    """Pixel metrics of predicted probability maps, accumulated batch by batch in constant memory.
+
+    update() bins the probabilities of the background and foreground pixels into one
+    histogram each (bins equal-width bins over [0, 1]); the ROC curve and its AUC come
+    from those counts. The confusion matrix at the 0.5 threshold is counted exactly,
+    so accuracy, IoU, Dice, precision and recall do not depend on the binning.
+    """
+    def __init__(self, bins=65536, threshold=0.5):
+        self.bins = bins
+        self.threshold = threshold
+        # counts[label, bin]
+        self.counts = np.zeros((2, bins), dtype=np.int64)
+        # [[TN, FP], [FN, TP]] at the threshold
+        self.confusion = np.zeros((2, 2), dtype=np.int64)
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true).ravel() > 0
+        y_pred = np.asarray(y_pred, dtype=np.float32).ravel()
+        bin_index = np.clip((y_pred * self.bins).astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(bin_index + self.bins * y_true, minlength=2 * self.bins).reshape(2, self.bins)
+        predicted = y_pred > self.threshold
+        self.confusion += np.bincount(2 * y_true + predicted, minlength=4).reshape(2, 2)
+
+    def roc_curve(self):
+        """(fpr, tpr, thresholds) like sklearn.metrics.roc_curve, with the bin edges as thresholds."""
+        # Predicted positive at threshold edge[b] = every pixel in bin b or above
+        occupied = np.flatnonzero(self.counts.sum(axis=0))[::-1]
+        false_positives = np.cumsum(self.counts[0, ::-1])[self.bins - 1 - occupied]
+        true_positives = np.cumsum(self.counts[1, ::-1])[self.bins - 1 - occupied]
+        false_positives = np.concatenate([[0], false_positives])
+        true_positives = np.concatenate([[0], true_positives])
+        thresholds = np.concatenate([[np.inf], occupied / self.bins])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fpr = false_positives / false_positives[-1]
+            tpr = true_positives / true_positives[-1]
+        return fpr, tpr, thresholds
+
+    def roc_auc(self):
+        fpr, tpr, _ = self.roc_curve()
+        # Trapezoidal rule; pixels within one bin count as tied
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def confusion_matrix(self):
+        return self.confusion.copy()
+
+    def summary(self):
+        """Pixel Accuracy, IoU, Dice, Precision and Recall at the threshold."""
+        (tn, fp), (fn, tp) = self.confusion
+        total = tn + fp + fn + tp
+        return {
+            "Pixel Accuracy": (tp + tn) / total if total > 0 else 0.0,
+            "IoU": tp / (tp + fp + fn) if (tp + fp + fn) > 0 else 0.0,
+            "Dice": 2 * tp / (2 * tp + fp + fn) if (2 * tp + fp + fn) > 0 else 0.0,
+            "Precision": tp / (tp + fp) if (tp + fp) > 0 else 0.0,
+            "Recall": tp / (tp + fn) if (tp + fn) > 0 else 0.0,
+        }
+
+def write_segmentation_reports(metrics, output_folder):
+    """Save the ROC curve (sampled CSV and plot), segmentation_metrics.csv and confusion_matrix.csv of a SegmentationMetrics."""
+    # Compute ROC-AUC
+    fpr, tpr, thresholds = metrics.roc_curve()
+    roc_auc = metrics.roc_auc()
+    print(f"ROC-AUC: {roc_auc:.4f}")
+
+    # Save ROC-AUC data (sampled)
+    sampled_indices = np.linspace(0, len(fpr) - 1, num=1000, dtype=int)
+    roc_data_sampled = pd.DataFrame({
+        'False positive rate': fpr[sampled_indices],
+        'True positive rate': tpr[sampled_indices],
+        'Thresholds': thresholds[sampled_indices]
+    })
+    roc_data_path = os.path.join(output_folder, "roc_auc_data_sampled.csv")
+    roc_data_sampled.to_csv(roc_data_path, index=False)
+    print(f"Sampled ROC-AUC data saved to {roc_data_path}")
+
+    # Save ROC-AUC plot
+    plt.figure()
+    plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (area = {roc_auc:.4f})')
+    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+    plt.xlabel('False positive rate')
+    plt.ylabel('True positive rate')
+    plt.title('Receiver Operating Characteristic (ROC)')
+    plt.legend(loc="lower right")
+    roc_plot_path = os.path.join(output_folder, "roc_auc_plot.png")
+    plt.savefig(roc_plot_path)
+    plt.close()
+    print(f"ROC-AUC plot saved to {roc_plot_path}")
+
+    # Compute segmentation metrics
+    scores = metrics.summary()
+    pixel_accuracy = scores["Pixel Accuracy"]
+    iou = scores["IoU"]
+    dice = scores["Dice"]
+    precision = scores["Precision"]
+    recall = scores["Recall"]
+
+    print(f"Pixel Accuracy: {pixel_accuracy:.4f}")
+    print(f"IoU (Jaccard): {iou:.4f}")
+    print(f"Dice Coefficient: {dice:.4f}")
+    print(f"Precision: {precision:.4f}")
+    print(f"Recall: {recall:.4f}")
+
+    metrics_df = pd.DataFrame([{
+        "Pixel Accuracy": pixel_accuracy,
+        "IoU": iou,
+        "Dice": dice,
+        "Precision": precision,
+        "Recall": recall,
+        "ROC-AUC": roc_auc
+    }])
+    metrics_path = os.path.join(output_folder, "segmentation_metrics.csv")
+    metrics_df.to_csv(metrics_path, index=False)
+    print(f"Segmentation metrics saved to {metrics_path}")
+
+    # Compute confusion matrix
+    cm = metrics.confusion_matrix()
+    print("Confusion Matrix:")
+    print(cm)
+
+    cm_df = pd.DataFrame(
+        cm,
+        index=["True Negative", "True Positive"],
+        columns=["Predicted Negative", "Predicted Positive"]
+    )
+    cm_path = os.path.join(output_folder, "confusion_matrix.csv")
+    cm_df.to_csv(cm_path)
+    print(f"Confusion matrix saved to {cm_path}")
+
+class AnalysisPipeline:
+    """Staged analysis of an image list with bounded queues between the stages.
+
+    decode workers  -> prepare_prediction (imread, colour conversion, tiling) and submit to the scheduler
+    inference       -> one InferenceBatchScheduler thread that batches the inputs of several images
+    post workers    -> postprocess(image_path, request, future), e.g. stitching, masks and visualizations
+    caller thread   -> consume(index, image_path, value) strictly in input order (ROI counting, CSV rows)
+
+    At most max_in_flight images are between dispatch and consume, so a slow stage
+    blocks the stages before it instead of buffering the whole folder.
+    """
+    def __init__(self, binarizer, decode_workers=2, postprocess_workers=2, queue_size=8,
+                 batch_size=16, max_latency=0.05, tile_size=512, overlap=64, should_stop=None):
+        self.binarizer = binarizer
+        self.decode_workers = max(1, int(decode_workers))
+        self.postprocess_workers = max(1, int(postprocess_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.should_stop = should_stop if should_stop is not None else (lambda: isStop)
+        self.max_in_flight = self.decode_workers + self.queue_size + self.postprocess_workers
+        self.scheduler = None
+
+    def run(self, image_paths, postprocess, consume):
+        """Returns True when every image was consumed and False when the run was stopped."""
+        tasks = queue.Queue()
+        inference_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        in_flight = threading.Semaphore(self.max_in_flight)
+        stopped = threading.Event()
+        remaining = {'decode': self.decode_workers, 'post': self.postprocess_workers}
+        remaining_lock = threading.Lock()
+
+        self.scheduler = scheduler = InferenceBatchScheduler(
+            self.binarizer, max_batch_size=self.batch_size, max_latency=self.max_latency)
+
+        def is_stopped():
+            if not stopped.is_set() and self.should_stop():
+                stopped.set()
+                scheduler.abort()
+            return stopped.is_set()
+
+        def dispatch():
+            for index, image_path in enumerate(image_paths):
+                # Backpressure: wait until an earlier image has been consumed
+                while not in_flight.acquire(timeout=0.1):
+                    if is_stopped():
+                        break
+                if is_stopped():
+                    break
+                tasks.put((index, image_path))
+            for _ in range(self.decode_workers):
+                tasks.put(None)
+
+        def decode_worker():
+            while True:
+                item = tasks.get()
+                if item is None:
+                    break
+                index, image_path = item
+                request, future = None, None
+                if not is_stopped():
+                    try:
+                        request = self.binarizer.prepare_prediction(image_path, self.tile_size, self.overlap)
+                        future = scheduler.submit(request.inputs)
+                    except Exception as e:
+                        print(f"Error preparing image {image_path}: {e}")
+                        request, future = None, None
+                inference_queue.put((index, image_path, request, future))
+
+            with remaining_lock:
+                remaining['decode'] -= 1
+                if remaining['decode'] == 0:
+                    for _ in range(self.postprocess_workers):
+                        inference_queue.put(None)
+
+        def postprocess_worker():
+            while True:
+                item = inference_queue.get()
+                if item is None:
+                    break
+                index, image_path, request, future = item
+                value = None
+                if not is_stopped():
+                    try:
+                        value = postprocess(image_path, request, future)
+                    except Exception as e:
+                        print(f"Error processing image {image_path}: {e}")
+                result_queue.put((index, image_path, value))
+
+            with remaining_lock:
+                remaining['post'] -= 1
+                if remaining['post'] == 0:
+                    result_queue.put(None)
+
+        threads = [Thread(target=dispatch, daemon=True)]
+        threads += [Thread(target=decode_worker, daemon=True) for _ in range(self.decode_workers)]
+        threads += [Thread(target=postprocess_worker, daemon=True) for _ in range(self.postprocess_workers)]
+        for thread in threads:
+            thread.start()
+
+        # Reorder the finished images and hand them over in input order
+        pending = {}
+        next_index = 0
+        try:
+            while True:
+                try:
+                    item = result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    # Poll the stop flag while the other stages are busy
+                    is_stopped()
+                    continue
+                if item is None:
+                    break
+                index, image_path, value = item
+                pending[index] = (image_path, value)
+
+                while next_index in pending:
+                    image_path, value = pending.pop(next_index)
+                    if not is_stopped():
+                        consume(next_index, image_path, value)
+                    next_index += 1
+                    in_flight.release()
+        except BaseException:
+            stopped.set()
+            scheduler.abort()
+            raise
+        finally:
+            # Keep draining so that blocked workers can exit
+            while any(thread.is_alive() for thread in threads):
+                try:
+                    if result_queue.get(timeout=0.1) is not None:
+                        in_flight.release()
+                except queue.Empty:
+                    pass
+            scheduler.close()
+
+        return not stopped.is_set()
+
+
+def ProcessFolder(input_folder, output_folder=None, enhanced_output_folder=None, save_viz=True, save_enhanced=True,
+                  batch_size=16, max_latency=0.05, decode_workers=2, postprocess_workers=2, queue_size=8,
+                  model_path='trained_Model.keras', jit_compile=False, renderer=None, writer_workers=2,
+                  png_compression=3):
     print(f"Selected batch size: {batch_size}")
 
-    trained_model_path = 'trained_Model.keras'
+    trained_model_path = model_path
 
     if output_folder is not None:
         os.makedirs(output_folder, exist_ok=True)
     if enhanced_output_folder is not None:
         os.makedirs(enhanced_output_folder, exist_ok=True)
 
-    # Initialize the binarizer
-    img_height, img_width = 512, 512
-    binarizer = DuckweedBinarizer(img_height=img_height, img_width=img_width)
-    binarizer.build_model()
-
     if not os.path.exists(trained_model_path):
         print(f"Error: '{trained_model_path}' file not found")
         return None
 
-    print(f"'{trained_model_path}' loading and analyzing")
-    binarizer.load_model(trained_model_path)
+    binarizer = model_registry.get(trained_model_path, jit_compile=jit_compile)
 
-    # Collected image files
-    image_files = sorted(glob.glob(os.path.join(input_folder, "*.*")))
+    # Collected image files (the folder also holds the manifest and catalog of FolderAnalysis)
+    image_files = list_image_files(input_folder)
     if not image_files:
         print("Not image file found")
         return None
 
     results = []
-    for img_path in image_files:
-        if isStop:
-            print("Processing paused by user")
-            break
+    # The registry shares the binarizer, so the renderer and writer of this run are passed along instead
+    writer = OutputWriter(writer_workers, png_compression=png_compression)
 
-        result = ProcessImage(img_path, 
+    def postprocess(img_path, request, future):
+        return ProcessImage(img_path, 
                             output_folder, 
                             enhanced_output_folder,
                             save_viz=save_viz, 
                             save_enhanced=save_enhanced,
-                            binarizer=binarizer)
+                            binarizer=binarizer,
+                            request=request,
+                            future=future,
+                            renderer=renderer,
+                            writer=writer)
+
+    def consume(index, img_path, result):
         if result is not None:
             results.append(result)
 
+    pipeline = AnalysisPipeline(binarizer,
+                                decode_workers=decode_workers,
+                                postprocess_workers=postprocess_workers,
+                                queue_size=queue_size,
+                                batch_size=batch_size,
+                                max_latency=max_latency)
+    try:
+        completed = pipeline.run(image_files, postprocess, consume)
+    finally:
+        writer.close()
+    if not completed:
+        print("Processing paused by user")
+
     print(f"Processing completed. Total {len(results)} images processed")
     return results
 
+def limit_cpu_threads(threads):
+    """Cap the TensorFlow, OpenMP and OpenCV thread pools of this process (call before the first TF op).
+
+    Returns False when TensorFlow was already running: its thread pools, and the OpenMP
+    ones, keep their size then and only OpenCV is capped.
+    """
+    threads = max(1, int(threads))
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+    cv2.setNumThreads(threads)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(max(1, min(2, threads)))
+    except RuntimeError:
+        # TensorFlow refuses once its runtime has been initialized
+        return False
+    return True
+
+class FoldHistory:
+    """History of a fold trained in a worker process, in the shape of a Keras History."""
+    def __init__(self, history, epoch_times):
+        self.history = history
+        self.epoch_times = epoch_times
+
+class FoldLogWriter:
+    """stdout of a fold worker process: whole lines are sent to the parent through log_queue.
+
+    Lines get the fold prefix (e.g. "[Fold 2] ") unless they start with it, so that the
+    interleaved output of the folds stays readable.
+    """
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+        self.buffer = ""
+        self.prefix = ""
+
+    def write(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        for line in lines:
+            if line and not line.startswith(self.prefix):
+                line = self.prefix + line
+            self.log_queue.put(line + '\n')
+        return len(text)
+
+    def flush(self):
+        # Partial lines wait for their end, so that lines of different folds are not mixed
+        pass
+
+# Set by the stop of the _train_folds_parallel parent
+_fold_stop_event = None
+
+def _init_fold_worker(threads, stop_event, log_queue):
+    global _fold_stop_event
+    limit_cpu_threads(threads)
+    _fold_stop_event = stop_event
+    sys.stdout = FoldLogWriter(log_queue)
+
+def _train_fold_worker(settings, image_paths, mask_paths, fold, train_idx, val_idx):
+    """Worker side of DuckweedBinarizer._train_folds_parallel: (metrics, history dict, epoch times) or None."""
+    binarizer = DuckweedBinarizer(img_height=settings['img_height'], img_width=settings['img_width'],
+                                  resize_for_model=settings['resize_for_model'])
+    binarizer.augmentation = settings['augmentation']
+    if isinstance(sys.stdout, FoldLogWriter):
+        sys.stdout.prefix = f"[Fold {fold+1}] "
+
+    def datasets(train_idx, val_idx, fold):
+        return binarizer.fold_datasets(image_paths, mask_paths, train_idx, val_idx,
+                                       settings['batch_size'], settings['cache_dir'], settings['seed'] + fold)
+
+    with tf.device('/CPU:0'):
+        result = binarizer._train_fold(fold, train_idx, val_idx, datasets, settings['epochs'], _fold_stop_event.is_set,
+                                       settings['es_patience'], settings['lr_patience'])
+    if result is None:
+        return None
+    metrics, history = result
+    # Plain values only: the History object holds the model
+    metrics = {key: float(value) if key != 'fold' else value for key, value in metrics.items()}
+    history_values = {key: [float(value) for value in values] for key, values in history.history.items()}
+    return metrics, history_values, history.epoch_times
+
+# Per-process state of the ProcessFolderParallel workers
+_worker_binarizer = None
+_worker_options = None
+_worker_stop_event = None
+
+def _init_analysis_worker(model_path, options, threads, stop_event):
+    global _worker_binarizer, _worker_options, _worker_stop_event
+    limit_cpu_threads(threads)
+
+    _worker_binarizer = model_registry.get(model_path, num_threads=threads, jit_compile=options['jit_compile'],
+                                           tile_size=options['tile_size'])
+    writer = OutputWriter(options['writer_workers'], png_compression=options['png_compression'])
+    _worker_options = dict(options, roi_data=RoiLayout.of(options['roi_data']), writer=writer)
+    _worker_stop_event = stop_event
+
+def _analyze_shard(image_paths):
+    """Worker side of ProcessFolderParallel: [(image_path, roi_areas or None), ...] in shard order."""
+    options = _worker_options
+    results = []
+
+    def postprocess(img_path, request, future):
+        binary_result = ProcessImage(img_path,
+                                     options['output_folder'],
+                                     options['enhanced_output_folder'],
+                                     save_viz=options['save_viz'],
+                                     save_enhanced=options['save_enhanced'],
+                                     binarizer=_worker_binarizer,
+                                     request=request,
+                                     future=future,
+                                     renderer=options['renderer'],
+                                     writer=options['writer'])
+        if binary_result is None:
+            return None
+        try:
+            return count_roi_areas(binary_result, options['roi_data'])
+        except (ValueError, IndexError) as e:
+            print(f"Warning: Could not process {os.path.basename(img_path)}. Error: {str(e)}")
+            return None
+
+    def consume(index, img_path, roi_areas):
+        results.append((img_path, roi_areas))
+
+    # One decode and one post-processing thread keep I/O overlapped inside the worker's thread budget
+    pipeline = AnalysisPipeline(_worker_binarizer,
+                                decode_workers=1,
+                                postprocess_workers=1,
+                                queue_size=2,
+                                batch_size=options['batch_size'],
+                                max_latency=options['max_latency'],
+                                tile_size=options['tile_size'],
+                                overlap=options['overlap'],
+                                should_stop=_worker_stop_event.is_set)
+    pipeline.run(image_paths, postprocess, consume)
+    # The shard counts as done only once its outputs are on disk
+    options['writer'].flush()
+    return results
+
+def _capture_order_key(image_path):
+    filename = os.path.basename(image_path)
+    capture_time = parse_capture_time(filename, verbose=False)
+    if capture_time is None:
+        return (1, datetime.max, filename)
+    return (0, capture_time, filename)
+
+def ProcessFolderParallel(image_files, output_folder=None, enhanced_output_folder=None, save_viz=True, save_enhanced=True,
+                          roi_data=None, processes=None, model_path='trained_Model.keras', consume=None,
+                          batch_size=4, max_latency=0.05, shard_size=None, should_stop=None, jit_compile=False,
+                          renderer=None, writer_workers=2, png_compression=3, tile_size=512, overlap=64):
+    """Analyze images in a pool of worker processes, each with its own copy of the model.
+
+    The image list is sorted by capture time and cut into contiguous shards. Every
+    worker loads the model once, runs its shards and returns the ROI areas per image.
+    batch_size is per worker, so keep it small: each batch holds the U-Net activations
+    of every tile in it.
+    consume(image_path, roi_areas) is called in the parent in capture-time order as
+    soon as all earlier shards are finished. Returns False when the run was stopped.
+    """
+    if should_stop is None:
+        should_stop = lambda: isStop
+    if consume is None:
+        consume = lambda image_path, roi_areas: None
+
+    if not os.path.exists(model_path):
+        raise ValueError(f"Error: '{model_path}' file not found")
+
+    if output_folder is not None:
+        os.makedirs(output_folder, exist_ok=True)
+    if enhanced_output_folder is not None:
+        os.makedirs(enhanced_output_folder, exist_ok=True)
+
+    cpu_count = os.cpu_count() or 1
+    processes = max(1, min(int(processes or cpu_count), len(image_files) or 1))
+    threads_per_worker = max(1, cpu_count // processes)
+
+    ordered_files = sorted(image_files, key=_capture_order_key)
+    if shard_size is None:
+        # Several shards per worker keep the pool balanced when some images are slower
+        shard_size = max(1, math.ceil(len(ordered_files) / (processes * 4)))
+    shards = [ordered_files[i:i + shard_size] for i in range(0, len(ordered_files), shard_size)]
+
+    print(f"Analyzing {len(ordered_files)} images in {len(shards)} shards with {processes} processes "
+          f"({threads_per_worker} threads each)")
+
+    options = {
+        'output_folder': output_folder,
+        'enhanced_output_folder': enhanced_output_folder,
+        'save_viz': save_viz,
+        'save_enhanced': save_enhanced,
+        'roi_data': roi_data,
+        'batch_size': batch_size,
+        'max_latency': max_latency,
+        'jit_compile': jit_compile,
+        'renderer': renderer,
+        'writer_workers': writer_workers,
+        'png_compression': png_compression,
+        'tile_size': tile_size,
+        'overlap': overlap,
+    }
+
+    context = multiprocessing.get_context('spawn')
+    stop_event = context.Event()
+    stopped = False
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_analysis_worker,
+                             initargs=(model_path, options, threads_per_worker, stop_event)) as executor:
+        futures = {executor.submit(_analyze_shard, shard): index for index, shard in enumerate(shards)}
+        pending = set(futures)
+        finished_shards = {}
+        next_shard = 0
+
+        try:
+            while pending:
+                if should_stop():
+                    stopped = True
+                    stop_event.set()
+                    for future in pending:
+                        future.cancel()
+                    break
+
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished_shards[futures[future]] = future.result()
+
+                # Hand over results in capture-time order
+                while next_shard in finished_shards:
+                    for image_path, roi_areas in finished_shards.pop(next_shard):
+                        consume(image_path, roi_areas)
+                    next_shard += 1
+                    print(f"Shard {next_shard}/{len(shards)} merged")
+        except BaseException:
+            stop_event.set()
+            for future in pending:
+                future.cancel()
+            raise
+
+    return not stopped
+
 def ProcessImage(image_path, output_folder=None, enhanced_output_folder=None, 
-                save_viz=True, save_enhanced=True, binarizer=None):
-    import matplotlib
+                save_viz=True, save_enhanced=True, binarizer=None, request=None, future=None,
+                model_path='trained_Model.keras', renderer=None, writer=None):
     import time
-    matplotlib.use('Agg')  # Use non-interactive backend for matplotlib
     if binarizer is None:
-        # Load the model if not provided
-        img_height, img_width = 512, 512
-        binarizer = DuckweedBinarizer(img_height=img_height, img_width=img_width)
-        binarizer.build_model()
-        
-        trained_model_path = 'trained_Model.keras'
+        # Take the model from the registry; it stays loaded for the next call
+        # model_path may also be an exported .tflite or .onnx model
+        trained_model_path = model_path
         if not os.path.exists(trained_model_path):
             print(f"Error: '{trained_model_path}' not found")
             return None
-            
-        print(f"'{trained_model_path}' loading and predicting")
-        binarizer.load_model(trained_model_path)
+
+        binarizer = model_registry.get(trained_model_path)
+
+    # renderer and writer belong to the run; the binarizer may be shared through the ModelRegistry
+    if renderer is None:
+        renderer = binarizer.renderer
+
+    # Only the matplotlib renderer needs pyplot; the OpenCV one never imports it
+    uses_matplotlib = (save_viz or save_enhanced) and renderer.backend == 'matplotlib'
+    if uses_matplotlib:
+        import matplotlib
+        with plot_lock:
+            matplotlib.use('Agg')  # Use non-interactive backend for matplotlib
+
+    # image_path may also be an already decoded ImageContext
+    context = image_path if isinstance(image_path, ImageContext) else None
+    if context is not None:
+        image_path = context.image_path
 
     print(f"Predicting image: {image_path}")
 
     start_time = time.time()  # Start time for processing1
 
     try:
-        result = binarizer.predict(image_path, 
-                                 save_path=enhanced_output_folder,
-                                 save_viz=save_viz, 
-                                 save_enhanced=save_enhanced)
+        if request is not None and future is not None:
+            # Inputs were already queued on an InferenceBatchScheduler
+            context = request.context
+            result = binarizer.complete_prediction(request, future.result(),
+                                                   save_path=enhanced_output_folder,
+                                                   save_viz=save_viz,
+                                                   save_enhanced=save_enhanced,
+                                                   renderer=renderer,
+                                                   writer=writer)
+        else:
+            if context is None:
+                context = ImageContext.load(image_path)
+            result = binarizer.predict(context, 
+                                     save_path=enhanced_output_folder,
+                                     save_viz=save_viz, 
+                                     save_enhanced=save_enhanced,
+                                     renderer=renderer,
+                                     writer=writer)
 
         if result is not None and output_folder is not None:
-            filename = os.path.splitext(os.path.basename(image_path))[0] + '.png'  # 확장자를 .png로 변경
+            filename = context.base_name + '.png'  # 확장자를 .png로 변경
             output_path = os.path.join(output_folder, filename)
-            cv2.imwrite(output_path, result)
-            print(f"Prediction results saved: {output_path}")
+            if writer is not None:
+                writer.write_image(output_path, result)
+                print(f"Prediction results queued for saving: {output_path}")
+            else:
+                cv2.imwrite(output_path, result)
+                print(f"Prediction results saved: {output_path}")
 
         # Compute elapsed time
         elapsed_time = time.time() - start_time
@@ -1881,33 +4047,1125 @@ def ProcessImage(image_path, output_folder=None, enhanced_output_folder=None,
 
         # Report the processing time to a CSV file
         report_path = os.path.join(output_folder if output_folder else ".", "analysisTimeReport.csv")
-        with open(report_path, "a") as report_file:
-            report_file.write(f"{os.path.basename(image_path)},{elapsed_time:.2f}\n")
+        report_line = f"{os.path.basename(image_path)},{elapsed_time:.2f}"
+        if writer is not None:
+            writer.append_line(report_path, report_line)
+        else:
+            OutputWriter._append_line(report_path, report_line)
 
         return result
+    except CancelledError:
+        # The analysis was stopped before this image was inferred
+        return None
     except Exception as e:
         print(f"Error processing image {image_path}: {e}")
         return None
     finally:
-        import matplotlib.pyplot as plt
-        plt.close('all')
+        if uses_matplotlib:
+            with plot_lock:
+                plt.close('all')
 
 
-class StopTrainingCallback(Callback):
-    def __init__(self, should_stop_func):
-        super().__init__()
-        self.should_stop = should_stop_func
-    
-    def on_epoch_begin(self, epoch, logs=None):
-        if self.should_stop():
-            print(f"\nProcessing paused by user (Epoch {epoch + 1})")
-            self.model.stop_training = True
-    
-    def on_batch_begin(self, batch, logs=None):
-        if self.should_stop():
-            print(f"\nProcessing paused by user")
-            self.model.stop_training = True
+class InferenceService:
+    """Predicts encoded images (JPEG/PNG bytes) for any number of concurrent callers.
+
+    All callers share one InferenceBatchScheduler, so the inputs of images from
+    different stations are packed into the same batches; a batch waits at most
+    max_latency seconds for more rows.
+    """
+    def __init__(self, model_path, max_batch_size=16, max_latency=0.05, jit_compile=False):
+        self.model_path = model_path
+        self.binarizer = model_registry.get(model_path, jit_compile=jit_compile)
+        # The server can sit idle for longer than the registry's idle timeout
+        model_registry.pin(self.binarizer)
+        self.model_hash = file_sha1(model_path)
+        self.scheduler = InferenceBatchScheduler(self.binarizer, max_batch_size, max_latency)
+        # Guards images_served and roi_layouts, which the HTTP handler threads share
+        self.lock = threading.Lock()
+        self.images_served = 0
+        # Compiled layouts of the ROI tables sent by the clients
+        self.roi_layouts = {}
+
+    def model_info(self):
+        with self.lock:
+            images_served = self.images_served
+        return {
+            'model': os.path.basename(self.model_path),
+            'backend': self.binarizer.backend,
+            'model_hash': self.model_hash,
+            'images_served': images_served,
+            'batches_run': self.scheduler.batches_run,
+            'rows_run': self.scheduler.rows_run,
+        }
+
+    def predict_mask(self, data, name='image'):
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Cannot decode image: {name}")
+        request = self.binarizer.prepare_prediction(ImageContext(name, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+        outputs = self.scheduler.submit(request.inputs).result()
+        mask = self.binarizer.complete_prediction(request, outputs, save_viz=False, save_enhanced=False)
+        with self.lock:
+            self.images_served += 1
+        return mask
+
+    def roi_layout(self, roi_json):
+        """RoiLayout of a JSON ROI table; a station sends the same table with every image."""
+        with self.lock:
+            layout = self.roi_layouts.get(roi_json)
+            if layout is None:
+                if len(self.roi_layouts) >= 64:
+                    self.roi_layouts.clear()
+                layout = self.roi_layouts[roi_json] = RoiLayout(pd.DataFrame(json.loads(roi_json)))
+            return layout
+
+    def count_areas(self, data, name='image', roi_data=None):
+        return count_roi_areas(self.predict_mask(data, name), roi_data)
+
+    def close(self):
+        self.scheduler.close()
+        model_registry.unpin(self.binarizer)
+
+
+class InferenceServer:
+    """HTTP front end of an InferenceService, so one machine can serve several acquisition PCs.
+
+    POST /predict?name=<file name> with the image file as body returns the binary mask
+    as PNG. With output=counts it returns the per-ROI white pixel counts as JSON; the
+    ROI table travels as JSON records in the X-ROI header. GET /health describes the
+    loaded model. Errors are answered with {"error": message}.
+    """
+    max_body_size = 64 * 1024 * 1024
+
+    def __init__(self, service, host='127.0.0.1', port=8765):
+        from http.server import ThreadingHTTPServer
+
+        self.service = service
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever(poll_interval=0.5)
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+        from urllib.parse import urlsplit, parse_qs
+
+        service = self.service
+        max_body_size = self.max_body_size
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def send_body(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, status, data):
+                self.send_body(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+            def do_GET(self):
+                if urlsplit(self.path).path != '/health':
+                    self.send_json(404, {'error': f"Unknown path: {self.path}"})
+                    return
+                self.send_json(200, service.model_info())
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                if url.path != '/predict':
+                    self.send_json(404, {'error': f"Unknown path: {self.path}"})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                if length <= 0 or length > max_body_size:
+                    self.send_json(413 if length > 0 else 400, {'error': "Request body must be an image file"})
+                    return
+                data = self.rfile.read(length)
+                name = query.get('name', ['image'])[0]
+                try:
+                    if query.get('output', ['mask'])[0] == 'counts':
+                        roi_header = self.headers.get('X-ROI')
+                        roi_data = service.roi_layout(roi_header) if roi_header else None
+                        self.send_json(200, {'areas': service.count_areas(data, name, roi_data)})
+                    else:
+                        ok, png = cv2.imencode('.png', service.predict_mask(data, name), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                        self.send_body(200, png.tobytes(), 'image/png')
+                except (ValueError, KeyError, IndexError) as e:
+                    self.send_json(400, {'error': str(e)})
+                except Exception as e:
+                    print(f"Error processing image {name}: {e}")
+                    self.send_json(500, {'error': str(e)})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class InferenceClient:
+    """Thin client of an InferenceServer; needs neither TensorFlow nor the model file."""
+    def __init__(self, server_url, timeout=120):
+        self.server_url = server_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, data=None, headers=None):
+        import urllib.request
+        import urllib.error
+
+        request = urllib.request.Request(self.server_url + path, data=data, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read(), response.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8'))['error']
+            except (ValueError, KeyError):
+                message = str(e)
+            raise ValueError(f"Inference server error: {message}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise ValueError(f"Inference server not reachable at {self.server_url}: {e}") from e
+
+    def _predict(self, data, name, output, headers=None):
+        from urllib.parse import urlencode
+
+        headers = dict(headers or {}, **{'Content-Type': 'application/octet-stream'})
+        return self._request('/predict?' + urlencode({'name': name, 'output': output}), data, headers)[0]
+
+    def model_info(self):
+        return json.loads(self._request('/health')[0].decode('utf-8'))
+
+    def predict_mask(self, data, name='image'):
+        mask = cv2.imdecode(np.frombuffer(self._predict(data, name, 'mask'), np.uint8), cv2.IMREAD_GRAYSCALE)
+        if mask is None:
+            raise ValueError(f"Invalid mask returned for {name}")
+        return mask
+
+    def count_areas(self, data, name='image', roi_data=None):
+        headers = {}
+        if isinstance(roi_data, RoiLayout):
+            roi_data = roi_data.roi_data
+        if roi_data is not None:
+            headers['X-ROI'] = json.dumps(roi_data.to_dict('records'))
+        return json.loads(self._predict(data, name, 'counts', headers).decode('utf-8'))['areas']
+
+
+class LocalInferenceClient:
+    """In-process stand-in for InferenceClient with the same methods, for tests and single-PC setups."""
+    def __init__(self, service):
+        self.service = service
+
+    def model_info(self):
+        return self.service.model_info()
+
+    def predict_mask(self, data, name='image'):
+        return self.service.predict_mask(data, name)
+
+    def count_areas(self, data, name='image', roi_data=None):
+        return self.service.count_areas(data, name, roi_data)
+
+
+class FolderAnalysis:
+    """ROI area analysis of an image folder into resultArea.csv, shared by the GUI and the command line.
+
+    The settings are attributes, so callers can change them between runs. The loaded
+    model is kept while the model file is unchanged. progress(done, total, image_path)
+    and status(message) report what the analysis is doing, should_stop() ends it early.
+    """
+    def __init__(self, model_path='trained_Model.keras', processes=1, progress=None, status=None, should_stop=None):
+        self.model_path = model_path
+        self.processes = processes
+        self.roi_path = None  # None: ROI.csv in the input folder
+        self.output_folder = None
+        self.viz_folder = None
+        self.save_viz = False
+        self.save_enhanced = False
+        self.live = False
+        # Thin-client mode: InferenceServer URL (or an InferenceClient) used instead of a local model
+        self.server_url = None
+        self.remote_requests = 4
+
+        # Analysis pipeline settings (worker counts per stage and cross-image inference batching)
+        cpu_count = os.cpu_count() or 2
+        self.decode_workers = max(1, min(4, cpu_count // 4))
+        self.postprocess_workers = max(1, min(4, cpu_count // 4))
+        self.pipeline_queue_size = 8
+        self.inference_max_latency = 0.05
+        self.jit_compile = False
+        # Tile geometry, inference batch size and TensorFlow/OpenCV threads. None takes the value
+        # from the tuned profile of this machine and model (see AutotuneInference), else
+        # 512, 64, 16 and the library defaults
+        self.tile_size = None
+        self.overlap = None
+        self.inference_batch_size = None
+        self.inference_threads = None
+        self.use_inference_profile = True
+        self.inference_settings = None
+        self.threads_not_applied_reported = False
+
+        # Visualization output of "Save combined"/"Save enhanced" (see VisualizationRenderer)
+        self.viz_renderer = VisualizationRenderer(backend='opencv', image_format='png', quality=90, scale=1.0, max_height=600)
+        # Background writers for masks, visualizations and the time report
+        self.writer_workers = 2
+        self.png_compression = 3
+        # Detect changed images by content hash instead of size and modification time
+        self.manifest_hash_content = False
+        # Result files ('csv', 'parquet' or 'both', see ResultsSink) and when buffered rows are written
+        self.result_format = 'csv'
+        self.result_flush_rows = 100
+        self.result_flush_interval = 5.0
+        # (start, end) capture-time datetimes limiting the analyzed images; None is open-ended
+        self.time_window = (None, None)
+
+        # Live mode: poll interval and how long a new file must stay unchanged before it is analyzed
+        self.live_poll_interval = 1.0
+        self.live_settle_time = 1.0
+
+        self.progress = progress if progress is not None else (lambda done, total, image_path: None)
+        self.status = status if status is not None else (lambda message: None)
+        self.should_stop = should_stop if should_stop is not None else (lambda: isStop)
+
+        self.roi_data = None
+        self.roi_layout = None
+        self.client = None
+        self.first_image_time = None
+        self.analyzed = 0
+        self.failed = 0
+
+    def run(self, input_folder, image_files=None):
+        """Analyze the folder (all images, or image_files). Returns False when the run was stopped."""
+        analysis_start_time = time.time()  # 분석 시작 시간 기록
+
+        if not input_folder or not os.path.isdir(input_folder):
+            raise ValueError("Invalid input folder path")
+
+        trained_model_path = self.model_path
+        self.client = None
+        model_hash = None
+        if self.server_url is not None:
+            self.client = InferenceClient(self.server_url) if isinstance(self.server_url, str) else self.server_url
+            server_info = self.client.model_info()
+            model_hash = server_info['model_hash']
+            print(f"Using inference server {self.server_url} ({server_info['model']}, {server_info['backend']} backend)")
+        elif not os.path.exists(trained_model_path):
+            raise ValueError(f"Error: '{trained_model_path}' file not found")
+
+        self.roi_data = read_roi_file(input_folder, self.roi_path)
+        self.roi_layout = RoiLayout(self.roi_data)
+        if self.client is None:
+            self.inference_settings = self.resolve_inference_settings()
+        self.analyzed = 0
+        self.failed = 0
+
+        for folder in (self.output_folder, self.viz_folder):
+            if folder is not None:
+                os.makedirs(folder, exist_ok=True)
+
+        # The catalog parses only new or changed files and lists the images in capture-time order
+        catalog = ImageCatalog(input_folder)
+        catalog.refresh()
+        start_time, end_time = self.time_window
+        whole_folder = image_files is None and start_time is None and end_time is None
+        if image_files is not None:
+            all_image_files = sorted(image_files)
+        else:
+            all_image_files = catalog.image_paths(start_time, end_time)
+
+        # Only new or changed images are inferred; the others keep their manifest entry.
+        # With a time window, the entries of the images outside it are kept as well
+        manifest = AnalysisManifest(input_folder, trained_model_path, roi_path=self.roi_path,
+                                    hash_content=self.manifest_hash_content, model_hash=model_hash)
+        image_files = manifest.pending(all_image_files, prune=start_time is None and end_time is None)
+        catalog.set_status(sorted(set(all_image_files) - set(image_files)), 'analyzed')
+        print(f"{len(all_image_files) - len(image_files)} images unchanged since the last analysis, "
+              f"{len(image_files)} to analyze")
+
+        # Time(day) counts from the first image of the folder
+        known_times = catalog.capture_times()
+        capture_times = list(known_times.values())
+        capture_times += [parse_capture_time(os.path.basename(path), verbose=False) for path in all_image_files
+                          if os.path.basename(path) not in known_times]
+        capture_times = [capture_time for capture_time in capture_times if capture_time is not None]
+        self.first_image_time = min(capture_times) if capture_times else None
+        last_recorded_time = None
+
+        results = ResultsSink(input_folder, self.result_format, self.first_image_time,
+                              flush_rows=self.result_flush_rows, flush_interval=self.result_flush_interval)
+
+        def write_all_results(resume=False):
+            nonlocal last_recorded_time
+            rows = manifest.rows()
+            if resume:
+                results.resume(rows)
+            else:
+                results.rewrite(rows)
+            last_recorded_time = rows[-1][1] if rows else None
+
+        out_of_order = False
+
+        def record_areas(img_path, roi_areas):
+            nonlocal last_recorded_time, out_of_order
+            if roi_areas is None:
+                # Failed images are not recorded, so the next run retries them
+                self.failed += 1
+                catalog.set_status([img_path], 'failed')
+                return
+            self.analyzed += 1
+            catalog.set_status([img_path], 'analyzed')
+            current_file = os.path.basename(img_path)
+            current_time = known_times.get(current_file) or parse_capture_time(current_file)
+            manifest.record(img_path, current_time, roi_areas)
+            if current_time is not None:
+                results.append(current_file, current_time, roi_areas)
+                if last_recorded_time is not None and current_time < last_recorded_time:
+                    out_of_order = True
+                last_recorded_time = max(current_time, last_recorded_time or current_time)
+
+        # The result files start with the rows of the unchanged images; new rows are appended
+        write_all_results(resume=True)
+
+        try:
+            completed = self.analyze_pending(image_files, record_areas, self.processes)
+
+            if completed and self.live:
+                # Live mode: analyze new frames as soon as they are completely written
+                watcher = FolderWatcher(input_folder, settle_time=self.live_settle_time)
+                watcher.mark_reported(all_image_files if whole_folder else catalog.image_paths())
+                self.status(f"Watching {input_folder} for new images...")
+                print(f"Live mode: watching {input_folder} (stop to end)")
+                while not self.should_stop():
+                    new_files = manifest.pending(watcher.poll(), prune=False)
+                    if not new_files:
+                        time.sleep(self.live_poll_interval)
+                        continue
+                    image_files += new_files
+                    all_image_files += new_files
+                    catalog.refresh(new_files)
+                    # One process keeps the model warm between frames
+                    self.analyze_pending(new_files, record_areas, 1)
+                    results.flush()
+                    manifest.save()
+                    self.status(f"Watching {input_folder}: last image {os.path.basename(new_files[-1])}")
+                completed = True
+        finally:
+            manifest.save()
+            if out_of_order:
+                # Images older than existing rows were added: restore the capture-time order
+                write_all_results()
+            results.close()
+            catalog.close()
+
+        if not completed:
+            print("Paused by user. Processing stopped. The next run resumes from here")
+            return False
+
+        # Calculate and display total analysis time
+        analysis_end_time = time.time()
+        total_seconds = analysis_end_time - analysis_start_time
+        hours = int(total_seconds // 3600)
+        minutes = int((total_seconds % 3600) // 60)
+        seconds = int(total_seconds % 60)
+
+        print(f"\n{'='*60}")
+        print(f"Total analysis time: {hours}h {minutes}m {seconds}s")
+        print(f"Analyzed {len(image_files)} of {len(all_image_files)} images")
+        print(f"{'='*60}\n")
+        return True
+
+    def create_result_row(self, filename, current_time, roi_areas):
+        results = {}
+
+        # Get the first image time if not set
+        if self.first_image_time is None:
+            self.first_image_time = current_time
+
+        # Compute the time difference in days
+        time_diff = (current_time - self.first_image_time).total_seconds() / (24 * 3600)
+
+        # Save the results
+        results['File name'] = filename
+        results['Time(day)'] = f"{time_diff:.3f}"
+        results.update(roi_areas)
+        return results
+
+    def resolve_inference_settings(self):
+        """tile_size, overlap, batch_size and threads of a local run: the attributes, the tuned profile or the defaults."""
+        settings = {
+            'tile_size': self.tile_size,
+            'overlap': self.overlap,
+            'batch_size': self.inference_batch_size,
+            'threads': self.inference_threads,
+        }
+        profile = InferenceProfiles().lookup(self.model_path) if self.use_inference_profile else None
+        if profile is not None:
+            print(f"Using the inference profile tuned on {profile['tuned']}: tile {profile['tile_size']}, "
+                  f"overlap {profile['overlap']}, batch {profile['batch_size']}, {profile['threads']} threads")
+        defaults = {'tile_size': 512, 'overlap': 64, 'batch_size': 16, 'threads': None}
+        for name, default in defaults.items():
+            if settings[name] is None:
+                settings[name] = profile[name] if profile is not None else default
+        return settings
+
+    def get_binarizer(self, trained_model_path):
+        """Loaded binarizer from the model registry; repeated runs reuse the warm model.
+
+        settings['threads'] is set to None when the thread count cannot be applied.
+        """
+        settings = self.inference_settings
+        if settings is None:
+            settings = self.inference_settings = self.resolve_inference_settings()
+        threads = settings['threads']
+        # TensorFlow takes the thread counts only before its first operation in this process;
+        # the TFLite and ONNX runtimes take them when the model is loaded
+        exported = os.path.splitext(trained_model_path)[1].lower() in ('.tflite', '.onnx')
+        if threads and not limit_cpu_threads(threads) and not exported:
+            settings['threads'] = None
+            if not self.threads_not_applied_reported:
+                self.threads_not_applied_reported = True
+                print(f"Warning: TensorFlow was already running, so the Keras model keeps its default thread "
+                      f"count instead of {threads} threads; restart the program to apply it")
+        return model_registry.get(trained_model_path, num_threads=settings['threads'], jit_compile=self.jit_compile,
+                                  tile_size=settings['tile_size'])
+
+    def analyze_pending(self, image_files, record_areas, processes):
+        """Analyze image_files and call record_areas(image_path, roi_areas or None) in order. Returns False when stopped."""
+        if not image_files:
+            return True
+        if self.client is not None:
+            return self.analyze_remote(image_files, record_areas)
+
+        trained_model_path = self.model_path
+        settings = self.inference_settings or self.resolve_inference_settings()
+        if processes > 1:
+            # Sharded analysis: every worker process loads its own model
+            print(f"'{trained_model_path}' : analyzing with {processes} processes")
+            merged_count = 0
+
+            def consume_areas(img_path, roi_areas):
+                nonlocal merged_count
+                merged_count += 1
+                self.progress(merged_count, len(image_files), img_path)
+                record_areas(img_path, roi_areas)
+
+            return ProcessFolderParallel(
+                image_files,
+                self.output_folder,
+                self.viz_folder,
+                save_viz=self.save_viz,
+                save_enhanced=self.save_enhanced,
+                roi_data=self.roi_layout,
+                processes=processes,
+                model_path=trained_model_path,
+                consume=consume_areas,
+                batch_size=max(2, settings['batch_size'] // processes),
+                max_latency=self.inference_max_latency,
+                should_stop=self.should_stop,
+                jit_compile=self.jit_compile,
+                renderer=self.viz_renderer,
+                writer_workers=self.writer_workers,
+                png_compression=self.png_compression,
+                tile_size=settings['tile_size'],
+                overlap=settings['overlap']
+            )
+
+        binarizer = self.get_binarizer(trained_model_path)
+        # The registry shares the binarizer with other runs, so this run's renderer and writer are passed to ProcessImage
+        writer = OutputWriter(self.writer_workers, png_compression=self.png_compression)
+
+        def postprocess(img_path, request, future):
+            return ProcessImage(
+                img_path,
+                self.output_folder,
+                self.viz_folder,
+                save_viz=self.save_viz,
+                save_enhanced=self.save_enhanced,
+                binarizer=binarizer,
+                request=request,
+                future=future,
+                renderer=self.viz_renderer,
+                writer=writer
+            )
+
+        def consume(index, img_path, binary_result):
+            self.progress(index + 1, len(image_files), img_path)
+
+            roi_areas = None
+            if binary_result is not None:
+                try:
+                    roi_areas = count_roi_areas(binary_result, self.roi_layout)
+                except (ValueError, IndexError) as e:
+                    print(f"Warning: Could not process {os.path.basename(img_path)}. Error: {str(e)}")
+            record_areas(img_path, roi_areas)
+
+        # Decoding, batched inference, post-processing and result writing overlap in a staged pipeline
+        pipeline = AnalysisPipeline(
+            binarizer,
+            decode_workers=self.decode_workers,
+            postprocess_workers=self.postprocess_workers,
+            queue_size=self.pipeline_queue_size,
+            batch_size=settings['batch_size'],
+            max_latency=self.inference_max_latency,
+            tile_size=settings['tile_size'],
+            overlap=settings['overlap'],
+            should_stop=self.should_stop
+        )
+        try:
+            completed = pipeline.run(image_files, postprocess, consume)
+        finally:
+            # Finish the queued writes, also when the run was stopped
+            writer.close()
+        if self.viz_renderer.backend == 'matplotlib':
+            with plot_lock:
+                plt.close('all')
+
+        print(f"Inference batches: {pipeline.scheduler.batches_run} ({pipeline.scheduler.rows_run} inputs)")
+        return completed
+
+    def analyze_remote(self, image_files, record_areas):
+        """Thin-client analysis: the inference server predicts, results are recorded here in order."""
+        if self.save_viz or self.save_enhanced:
+            print("Visualizations are not available with an inference server; only masks and areas are saved")
+        # Without saved masks only the ROI counts need to come back
+        writer = OutputWriter(self.writer_workers, png_compression=self.png_compression) if self.output_folder else None
+
+        def analyze(img_path):
+            name = os.path.basename(img_path)
+            try:
+                with open(img_path, 'rb') as f:
+                    data = f.read()
+                if writer is None:
+                    return self.client.count_areas(data, name, self.roi_layout)
+                mask = self.client.predict_mask(data, name)
+                writer.write_image(os.path.join(self.output_folder, os.path.splitext(name)[0] + '.png'), mask)
+                return count_roi_areas(mask, self.roi_layout)
+            except (OSError, ValueError, IndexError) as e:
+                print(f"Error processing image {img_path}: {e}")
+                return None
+
+        # Several requests in flight, so the server can batch them with the other stations' images
+        pending = deque()
+        next_index = 0
+        done = 0
+        try:
+            with ThreadPoolExecutor(max(1, self.remote_requests)) as executor:
+                while next_index < len(image_files) or pending:
+                    while (next_index < len(image_files) and len(pending) < 2 * self.remote_requests
+                           and not self.should_stop()):
+                        pending.append((image_files[next_index], executor.submit(analyze, image_files[next_index])))
+                        next_index += 1
+                    if not pending:
+                        break
+                    img_path, future = pending.popleft()
+                    roi_areas = future.result()
+                    done += 1
+                    self.progress(done, len(image_files), img_path)
+                    record_areas(img_path, roi_areas)
+        finally:
+            if writer is not None:
+                writer.close()
+        return next_index == len(image_files)
+
+
+def list_image_files(folder):
+    return sorted(path for path in glob.glob(os.path.join(folder, "*.*")) if path.lower().endswith(IMAGE_EXTENSIONS))
+
+def iter_calibration_inputs(image_dir, tile_size=512, overlap=64, max_samples=100):
+    """Yield float32 model inputs of shape (1, tile, tile, 3) cut from the images in image_dir."""
+    image_paths = list_image_files(image_dir)
+    if not image_paths:
+        raise ValueError(f"No calibration images found in {image_dir}")
+
+    # Spread the samples over all images rather than taking every tile of the first few
+    samples_per_image = max(1, math.ceil(max_samples / len(image_paths)))
+    binarizer = DuckweedBinarizer(img_height=tile_size, img_width=tile_size)
+    count = 0
+    for image_path in image_paths:
+        request = binarizer.prepare_prediction(image_path, tile_size, overlap)
+        indices = np.linspace(0, len(request.inputs) - 1, min(samples_per_image, len(request.inputs))).astype(int)
+        for index in np.unique(indices):
+            yield request.inputs[index:index + 1].astype(np.float32) / 255.0
+            count += 1
+            if count >= max_samples:
+                return
+
+def ExportModel(model_path='trained_Model.keras', output_path=None, model_format='tflite', quantize=False,
+                calibration_dir=os.path.join('training', 'original'), calibration_samples=100):
+    """Convert a trained Keras model to a TFLite or ONNX model for the lightweight inference backends.
+
+    With quantize=True the weights and activations are quantized to int8 (post-training),
+    calibrated on tiles of the images in calibration_dir. Model input and output stay float32.
+    """
+    if model_format not in ('tflite', 'onnx'):
+        raise ValueError(f"Unknown export format: {model_format}")
+    if not os.path.exists(model_path):
+        raise ValueError(f"Error: '{model_path}' file not found")
+    if output_path is None:
+        output_path = os.path.splitext(model_path)[0] + '.' + model_format
+
+    with tf.device('/CPU:0'):
+        model = tf.keras.models.load_model(model_path)
+    tile_size = model.input_shape[1]
+
+    if model_format == 'tflite':
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = lambda: ([batch] for batch in iter_calibration_inputs(
+                calibration_dir, tile_size, max_samples=calibration_samples))
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        with open(output_path, 'wb') as f:
+            f.write(converter.convert())
+    else:
+        try:
+            import tf2onnx
+        except ImportError:
+            raise ValueError("tf2onnx is required for ONNX export (pip install tf2onnx onnxruntime)")
+
+        input_signature = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name='input'),)
+        forward = tf.function(lambda x: model(x, training=False))
+        float_path = output_path if not quantize else os.path.splitext(output_path)[0] + '_float.onnx'
+        tf2onnx.convert.from_function(forward, input_signature=input_signature, opset=13, output_path=float_path)
+
+        if quantize:
+            try:
+                from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+            except ImportError:
+                raise ValueError("onnxruntime is required for ONNX int8 quantization (pip install onnxruntime)")
+
+            class TileDataReader(CalibrationDataReader):
+                def __init__(self):
+                    self.inputs = iter_calibration_inputs(calibration_dir, tile_size, max_samples=calibration_samples)
+
+                def get_next(self):
+                    batch = next(self.inputs, None)
+                    return None if batch is None else {'input': batch}
+
+            quantize_static(float_path, output_path, TileDataReader(), quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+            os.remove(float_path)
+
+    print(f"Model exported to {output_path} ({model_format}{', int8' if quantize else ''}, "
+          f"{os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return output_path
+
+def CompareBackends(reference_model_path, candidate_model_path, image_paths, report_path=None,
+                    tile_size=512, overlap=64, tile_batch_size=16):
+    """Predict every image with both models and report the IoU of the candidate mask against the reference.
+
+    Returns the mean IoU. The per-image IoU and prediction times are written to report_path (CSV).
+    """
+    reference = DuckweedBinarizer(img_height=tile_size, img_width=tile_size)
+    reference.load_model(reference_model_path)
+    candidate = DuckweedBinarizer(img_height=tile_size, img_width=tile_size)
+    candidate.load_model(candidate_model_path)
+    if not reference.is_loaded() or not candidate.is_loaded():
+        raise ValueError("Both models must exist to compare backends")
+
+    rows = []
+    for image_path in image_paths:
+        masks = []
+        times = []
+        for binarizer in (reference, candidate):
+            start_time = time.time()
+            masks.append(binarizer.predict(image_path, tile_size, overlap, save_viz=False, save_enhanced=False,
+                                           tile_batch_size=tile_batch_size) > 0)
+            times.append(time.time() - start_time)
+
+        intersection = np.count_nonzero(masks[0] & masks[1])
+        union = np.count_nonzero(masks[0] | masks[1])
+        iou = intersection / union if union else 1.0
+        rows.append({
+            'File name': os.path.basename(image_path),
+            'IoU': iou,
+            'Reference time(s)': times[0],
+            'Candidate time(s)': times[1],
+        })
+        print(f"{os.path.basename(image_path)}: IoU {iou:.4f}, "
+              f"{reference.backend} {times[0]:.2f}s / {candidate.backend} {times[1]:.2f}s")
+
+    if not rows:
+        raise ValueError("No images to compare")
+
+    report = pd.DataFrame(rows)
+    mean_iou = report['IoU'].mean()
+    speedup = report['Reference time(s)'].sum() / max(report['Candidate time(s)'].sum(), 1e-9)
+    print(f"Backend agreement: mean IoU {mean_iou:.4f}, min IoU {report['IoU'].min():.4f}, "
+          f"speedup {speedup:.2f}x over {len(rows)} images")
+    if report_path is not None:
+        report.to_csv(report_path, index=False)
+        print(f"Agreement report saved to {report_path}")
+    return mean_iou
+
+def _benchmark_inference(model_path, image_paths, tile_configs, batch_sizes, threads, repeat, return_masks):
+    """Worker side of AutotuneInference for one thread count.
+
+    Returns the images/s of every (tile_size, overlap, batch_size) and, with return_masks,
+    the bit-packed masks of every (tile_size, overlap).
+    """
+    binarizer = DuckweedBinarizer(img_height=512, img_width=512)
+    binarizer.load_model(model_path, num_threads=threads)
+    if not binarizer.is_loaded():
+        raise ValueError(f"Error: '{model_path}' file not found")
+    contexts = [ImageContext.load(image_path) for image_path in image_paths]
+
+    def predict_all(tile_size, overlap, batch_size):
+        # Tiles of all frames share batches, as in the analysis pipeline
+        requests = [binarizer.prepare_prediction(context, tile_size, overlap) for context in contexts]
+        rows = np.concatenate([request.inputs for request in requests])
+        outputs = np.concatenate([binarizer.run_model(rows[i:i + batch_size]) for i in range(0, len(rows), batch_size)])
+        masks = []
+        offset = 0
+        for request in requests:
+            count = len(request.inputs)
+            masks.append(binarizer.complete_prediction(request, outputs[offset:offset + count],
+                                                       save_viz=False, save_enhanced=False))
+            offset += count
+        return masks
+
+    rows = []
+    masks = {}
+    for tile_size, overlap in tile_configs:
+        try:
+            binarizer.set_tile_size(tile_size)
+        except ValueError as e:
+            print(f"Tile size {tile_size} skipped: {e}")
+            continue
+        for batch_size in batch_sizes:
+            predict_all(tile_size, overlap, batch_size)  # warm-up
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                config_masks = predict_all(tile_size, overlap, batch_size)
+            images_per_second = len(contexts) * repeat / (time.perf_counter() - start_time)
+            print(f"threads {threads}, tile {tile_size}, overlap {overlap}, batch {batch_size}: "
+                  f"{images_per_second:.2f} images/s")
+            rows.append({'threads': threads, 'tile_size': tile_size, 'overlap': overlap,
+                         'batch_size': batch_size, 'images_per_second': images_per_second})
+        if return_masks:
+            masks[(tile_size, overlap)] = [(mask.shape, np.packbits(mask > 0)) for mask in config_masks]
+    return rows, masks
+
+def AutotuneInference(model_path, image_dir, sample_count=4, tile_sizes=(256, 384, 512, 768), overlaps=(32, 64),
+                      batch_sizes=(1, 4, 8, 16), thread_counts=None, min_iou=0.99, repeat=2, report_path=None,
+                      profiles=None):
+    """Benchmark tile size, overlap, batch size and thread count on sample frames and save the fastest profile.
+
+    Every combination predicts sample_count frames of image_dir; its masks are compared
+    with the masks of the default settings (512 tiles, overlap 64) and combinations below
+    min_iou are rejected. Each thread count runs in a fresh process, because TensorFlow
+    fixes its thread pools when it starts. The fastest accepted combination is saved in
+    the InferenceProfiles of this machine, where analysis runs pick it up. Returns it.
+    """
+    if not os.path.exists(model_path):
+        raise ValueError(f"Error: '{model_path}' file not found")
+    image_paths = list_image_files(image_dir)
+    if not image_paths:
+        raise ValueError(f"No images found in {image_dir}")
+    # Frames spread over the whole time-lapse
+    sample_count = max(1, min(int(sample_count), len(image_paths)))
+    image_paths = [image_paths[round(i * (len(image_paths) - 1) / max(1, sample_count - 1))] for i in range(sample_count)]
+
+    reference_config = (512, 64)
+    tile_configs = sorted({(tile_size, overlap) for tile_size in tile_sizes for overlap in overlaps
+                           if 2 * overlap < tile_size} | {reference_config})
+    if thread_counts is None:
+        cpu_count = os.cpu_count() or 1
+        thread_counts = sorted({max(1, cpu_count // divisor) for divisor in (1, 2, 4)}, reverse=True)
+
+    print(f"Autotuning '{model_path}' on {len(image_paths)} frames: {len(tile_configs)} tile settings, "
+          f"batch sizes {list(batch_sizes)}, threads {list(thread_counts)}")
+
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    masks = None
+    for threads in thread_counts:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                 initializer=limit_cpu_threads, initargs=(threads,)) as executor:
+            thread_rows, thread_masks = executor.submit(
+                _benchmark_inference, model_path, image_paths, tile_configs, batch_sizes,
+                threads, repeat, masks is None).result()
+        rows += thread_rows
+        if masks is None:
+            masks = thread_masks
+
+    if reference_config not in masks:
+        raise ValueError("The reference setting (512 tiles, overlap 64) could not be run")
+
+    # Masks do not depend on the batch size or thread count
+    def mask_iou(config):
+        intersection = union = 0
+        for (_, reference), (_, candidate) in zip(masks[reference_config], masks[config]):
+            reference = np.unpackbits(reference)
+            candidate = np.unpackbits(candidate)
+            intersection += np.count_nonzero(reference & candidate)
+            union += np.count_nonzero(reference | candidate)
+        return intersection / union if union else 1.0
+
+    ious = {config: mask_iou(config) for config in masks}
+    for row in rows:
+        row['iou'] = ious[(row['tile_size'], row['overlap'])]
+
+    report = pd.DataFrame(rows).sort_values('images_per_second', ascending=False)
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    if report_path is not None:
+        report.to_csv(report_path, index=False)
+        print(f"Autotune report saved to {report_path}")
+
+    accepted = report[report['iou'] >= min_iou]
+    if accepted.empty:
+        raise ValueError(f"No setting reached IoU {min_iou} against the reference masks")
+    best = accepted.iloc[0]
+    default = report[(report['tile_size'] == reference_config[0]) & (report['overlap'] == reference_config[1])]
+    profile = {
+        'tile_size': int(best['tile_size']),
+        'overlap': int(best['overlap']),
+        'batch_size': int(best['batch_size']),
+        'threads': int(best['threads']),
+        'images_per_second': float(best['images_per_second']),
+        'iou': float(best['iou']),
+        'tuned': datetime.now().isoformat(timespec='seconds'),
+    }
+    print(f"Best: tile {profile['tile_size']}, overlap {profile['overlap']}, batch {profile['batch_size']}, "
+          f"{profile['threads']} threads: {profile['images_per_second']:.2f} images/s (IoU {profile['iou']:.4f}); "
+          f"default settings up to {default['images_per_second'].max():.2f} images/s")
+    (profiles if profiles is not None else InferenceProfiles()).save(model_path, profile)
+    return profile
+
+
+def StopTrainingCallback(should_stop_func):
+    """Keras callback that stops training once should_stop_func() returns True."""
+    from tensorflow.keras.callbacks import Callback  # type: ignore
+
+    class _StopTrainingCallback(Callback):
+        def __init__(self, should_stop_func):
+            super().__init__()
+            self.should_stop = should_stop_func
+
+        def on_epoch_begin(self, epoch, logs=None):
+            if self.should_stop():
+                print(f"\nProcessing paused by user (Epoch {epoch + 1})")
+                self.model.stop_training = True
+
+        def on_batch_begin(self, batch, logs=None):
+            if self.should_stop():
+                print(f"\nProcessing paused by user")
+                self.model.stop_training = True
+
+    return _StopTrainingCallback(should_stop_func)
+
+def report_progress(event, **fields):
+    """Machine-readable progress of the command line: one JSON object per line on stderr."""
+    print(json.dumps(dict(event=event, **fields)), file=sys.stderr, flush=True)
+
+def run_analyze_command(parser, args):
+    global isStop
+    import signal
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"input folder not found: {args.folder}")
+    if args.server is None and not os.path.exists(args.model):
+        parser.error(f"model file not found: {args.model}")
+    if args.roi is not None and not os.path.exists(args.roi):
+        parser.error(f"ROI file not found: {args.roi}")
+    if args.workers < 1 or (args.batch_size is not None and args.batch_size < 1):
+        parser.error("--workers and --batch-size must be at least 1")
+
+    # Ctrl+C / SIGTERM stop the analysis the same way as the Stop button
+    def request_stop(signum, frame):
+        global isStop
+        isStop = True
+    isStop = False
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    analysis = FolderAnalysis(
+        model_path=args.model,
+        processes=args.workers,
+        progress=lambda done, total, image_path: report_progress(
+            'progress', done=done, total=total, file=os.path.basename(image_path)),
+        status=lambda message: report_progress('status', message=message))
+    analysis.roi_path = args.roi
+    analysis.output_folder = os.path.join(args.folder, "Output") if args.save_binary else None
+    analysis.viz_folder = os.path.join(args.folder, "Visualization") if (args.save_combined or args.save_enhanced) else None
+    analysis.save_viz = args.save_combined
+    analysis.save_enhanced = args.save_enhanced
+    analysis.live = args.live
+    analysis.inference_batch_size = args.batch_size
+    analysis.use_inference_profile = not args.no_profile
+    analysis.manifest_hash_content = args.hash_content
+    analysis.server_url = args.server
+    analysis.result_format = args.format
+    analysis.time_window = (args.start, args.end)
+
+    start_time = time.time()
+    try:
+        completed = analysis.run(args.folder)
+    except Exception as e:
+        report_progress('finished', status='error', message=str(e))
+        return 1
+
+    summary = dict(analyzed=analysis.analyzed, failed=analysis.failed, seconds=round(time.time() - start_time, 1))
+    if not completed:
+        report_progress('finished', status='stopped', **summary)
+        return 130
+    if analysis.failed:
+        report_progress('finished', status='partial', **summary)
+        return 3
+    report_progress('finished', status='completed', **summary)
+    return 0
+
+def run_serve_command(parser, args):
+    if not os.path.exists(args.model):
+        parser.error(f"model file not found: {args.model}")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    service = InferenceService(args.model, max_batch_size=args.batch_size, max_latency=args.max_latency,
+                               jit_compile=args.jit)
+    server = InferenceServer(service, args.host, args.port)
+    print(f"Inference server listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        service.close()
+        info = service.model_info()
+        print(f"Served {info['images_served']} images in {info['batches_run']} batches ({info['rows_run']} inputs)")
+    return 0
+
+def check_dependencies(install=False):
+    """Report missing third-party packages and optionally install them. Returns the exit code."""
+    missing = find_missing_packages(_required_packages)
+    if not missing:
+        print("All dependencies are installed.")
+        return 0
+    if install:
+        ensure_packages(_required_packages)
+        return 0
+    print("Missing packages: " + ", ".join(missing))
+    print(f"Install them with: python {os.path.basename(__file__)} check-deps --install")
+    return 1
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SIPEREA image analyzer (starts the GUI without a command)")
+    subparsers = parser.add_subparsers(dest='command')
+
+    export_parser = subparsers.add_parser('export', help="Convert a trained Keras model to TFLite or ONNX")
+    export_parser.add_argument('--model', default='trained_Model.keras', help="Keras model to convert")
+    export_parser.add_argument('--output', default=None, help="Output file (default: model name with the format extension)")
+    export_parser.add_argument('--format', choices=['tflite', 'onnx'], default='tflite')
+    export_parser.add_argument('--int8', action='store_true', help="Post-training int8 quantization")
+    export_parser.add_argument('--calibration-dir', default=os.path.join('training', 'original'),
+                               help="Images used to calibrate the int8 quantization")
+    export_parser.add_argument('--calibration-samples', type=int, default=100)
+    export_parser.add_argument('--validate-dir', default=None,
+                               help="Images for the IoU agreement report (default: calibration dir)")
+    export_parser.add_argument('--validate-count', type=int, default=10,
+                               help="Number of images in the agreement report (0 skips it)")
+
+    analyze_parser = subparsers.add_parser(
+        'analyze', help="Analyze an image folder into resultArea.csv without the GUI",
+        description="Exit codes: 0 done, 1 error, 2 invalid arguments, 3 some images failed, 130 stopped. "
+                    "Progress is written to stderr as one JSON object per line.")
+    analyze_parser.add_argument('folder', help="Folder with the time-lapse images")
+    analyze_parser.add_argument('--roi', default=None, help="ROI file (default: ROI.csv in the folder)")
+    analyze_parser.add_argument('--model', default='trained_Model.keras', help="Keras, .tflite or .onnx model")
+    analyze_parser.add_argument('--workers', type=int, default=1, help="Analysis processes")
+    analyze_parser.add_argument('--save-binary', action='store_true', help="Save masks to <folder>/Output")
+    analyze_parser.add_argument('--save-combined', action='store_true', help="Save combined visualizations")
+    analyze_parser.add_argument('--save-enhanced', action='store_true', help="Save enhanced visualizations")
+    analyze_parser.add_argument('--live', action='store_true', help="Keep analyzing new images until interrupted")
+    analyze_parser.add_argument('--batch-size', type=int, default=None,
+                                help="Inference batch size (default: tuned profile or 16)")
+    analyze_parser.add_argument('--no-profile', action='store_true',
+                                help="Ignore the tuned inference profile of this machine (see autotune)")
+    analyze_parser.add_argument('--hash-content', action='store_true',
+                                help="Detect changed images by content hash instead of size and mtime")
+    analyze_parser.add_argument('--start', type=datetime.fromisoformat, default=None,
+                                help="Only images captured at or after this time (e.g. 2023-10-21T06:00)")
+    analyze_parser.add_argument('--end', type=datetime.fromisoformat, default=None,
+                                help="Only images captured at or before this time")
+    analyze_parser.add_argument('--format', choices=ResultsSink.formats, default='csv',
+                                help="Result file: resultArea.csv, resultArea.parquet or both")
+    analyze_parser.add_argument('--server', default=None,
+                                help="Use an inference server (e.g. http://10.0.0.5:8765) instead of a local model")
+
+    serve_parser = subparsers.add_parser('serve', help="Serve the model to analyzers on other PCs (see analyze --server)")
+    serve_parser.add_argument('--model', default='trained_Model.keras', help="Keras, .tflite or .onnx model")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (0.0.0.0 for the LAN)")
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--batch-size', type=int, default=16, help="Inference batch size across clients")
+    serve_parser.add_argument('--max-latency', type=float, default=0.05,
+                              help="Seconds a batch waits for more requests before it runs")
+    serve_parser.add_argument('--jit', action='store_true', help="XLA-compile the Keras predictor")
+
+    autotune_parser = subparsers.add_parser(
+        'autotune', help="Find the fastest tile size, overlap, batch size and thread count for this PC and model")
+    autotune_parser.add_argument('folder', help="Folder with sample frames")
+    autotune_parser.add_argument('--model', default='trained_Model.keras', help="Keras, .tflite or .onnx model")
+    autotune_parser.add_argument('--samples', type=int, default=4, help="Frames to benchmark")
+    autotune_parser.add_argument('--tile-sizes', type=int, nargs='+', default=[256, 384, 512, 768])
+    autotune_parser.add_argument('--overlaps', type=int, nargs='+', default=[32, 64])
+    autotune_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    autotune_parser.add_argument('--threads', type=int, nargs='+', default=None,
+                                 help="Thread counts to try (default: all, half and a quarter of the cores)")
+    autotune_parser.add_argument('--min-iou', type=float, default=0.99,
+                                 help="Required mask agreement with the default settings")
+    autotune_parser.add_argument('--repeat', type=int, default=2, help="Timed passes per setting")
+    autotune_parser.add_argument('--report', default=None, help="Save all measurements to this CSV file")
+
+    deps_parser = subparsers.add_parser('check-deps', help="Check that the third-party packages are installed")
+    deps_parser.add_argument('--install', action='store_true', help="Install missing packages with pip")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'check-deps':
+        return check_dependencies(args.install)
+
+    if args.command == 'analyze':
+        return run_analyze_command(parser, args)
+
+    if args.command == 'serve':
+        return run_serve_command(parser, args)
+
+    if args.command == 'autotune':
+        if not os.path.isdir(args.folder):
+            parser.error(f"input folder not found: {args.folder}")
+        if min(args.batch_sizes + (args.threads or [1])) < 1 or args.repeat < 1:
+            parser.error("--batch-sizes, --threads and --repeat must be at least 1")
+        AutotuneInference(args.model, args.folder, args.samples, args.tile_sizes, args.overlaps, args.batch_sizes,
+                          args.threads, args.min_iou, args.repeat, args.report)
+        return 0
+
+    if args.command is None:
+        app = SIPEREAImageAnalyzer()
+        app.mainloop()
+        return 0
+
+    if args.command == 'export':
+        output_path = ExportModel(args.model, args.output, args.format, args.int8,
+                                  args.calibration_dir, args.calibration_samples)
+        if args.validate_count > 0:
+            validate_dir = args.validate_dir or args.calibration_dir
+            image_paths = list_image_files(validate_dir)[:args.validate_count]
+            report_path = os.path.splitext(output_path)[0] + '_agreement.csv'
+            CompareBackends(args.model, output_path, image_paths, report_path)
+    return 0
 
 if __name__ == "__main__":
-    app = SIPEREAImageAnalyzer()
-    app.mainloop()
\ No newline at end of file
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,24 @@
+import importlib.util
+import os
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SIPEREAImageAnalyzer.py')
+
+
+@pytest.fixture
+def analyzer():
+    spec = importlib.util.spec_from_file_location('SIPEREAImageAnalyzer', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def model_path(analyzer, tmp_path):
+    """A small untrained U-Net saved as model.keras."""
+    path = str(tmp_path / 'model.keras')
+    trainer = analyzer.DuckweedBinarizer(img_height=64, img_width=64)
+    trainer.build_model()
+    trainer.save_model(path)
+    return path
@@ -0,0 +1,140 @@
+import csv
+
+import cv2
+import numpy as np
+import pytest
+
+
+def frame_name(day, hour=6):
+    return f'2023-10-{day:02d} ({hour:02d}-09-04-385)-({hour:02d}-09-05-074).png'
+
+
+def write_frame(folder, day, value=None):
+    value = 20 * day % 255 if value is None else value
+    cv2.imwrite(str(folder / frame_name(day)), np.full((80, 96, 3), value, np.uint8))
+
+
+def write_roi(folder, x2=40):
+    (folder / 'ROI.csv').write_text('Shape,X1,Y1,X2,Y2,Condition1,Condition2,Plate#\n'
+                                    f'rectangle,0,0,{x2},40,A,,1\n'
+                                    'circle,30,30,70,70,B,x,2\n')
+
+
+def result_names(folder):
+    with open(folder / 'resultArea.csv', newline='', encoding='utf-8') as f:
+        return [row[0] for row in list(csv.reader(f))[1:]]
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path / 'home'))
+    # Without an output folder the time report is written to the working directory
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / 'frames'
+    folder.mkdir()
+    for day in (10, 12, 14):
+        write_frame(folder, day)
+    write_roi(folder)
+    return folder
+
+
+@pytest.fixture
+def run_analysis(analyzer, model_path, monkeypatch):
+    """run_analysis(folder, stop_after=None) -> (completed, images inferred by the run)."""
+    analyzer.model_registry.img_size = 64
+    rewrites = []
+    rewrite = analyzer.ResultsSink.rewrite
+
+    def counting_rewrite(sink, rows):
+        rewrites.append(len(rows))
+        return rewrite(sink, rows)
+
+    monkeypatch.setattr(analyzer.ResultsSink, 'rewrite', counting_rewrite)
+
+    def run(folder, stop_after=None):
+        done = []
+        analysis = analyzer.FolderAnalysis(model_path=model_path,
+                                           progress=lambda count, total, image_path: done.append(image_path),
+                                           should_stop=lambda: stop_after is not None and len(done) >= stop_after)
+        analysis.use_inference_profile = False
+        analysis.tile_size, analysis.overlap, analysis.inference_batch_size = 64, 8, 1
+        analysis.pipeline_queue_size = 1
+        inferred = []
+        analyze_pending = analysis.analyze_pending
+
+        def counting_analyze_pending(image_files, record_areas, processes):
+            inferred.extend(image_files)
+            return analyze_pending(image_files, record_areas, processes)
+
+        analysis.analyze_pending = counting_analyze_pending
+        del rewrites[:]
+        completed = analysis.run(str(folder))
+        return completed, inferred
+
+    run.rewrites = rewrites
+    return run
+
+
+def test_second_run_infers_nothing_and_keeps_the_results(folder, run_analysis):
+    assert len(run_analysis(folder)[1]) == 3
+    before = (folder / 'resultArea.csv').read_bytes()
+
+    completed, inferred = run_analysis(folder)
+    assert completed and inferred == []
+    assert run_analysis.rewrites == []
+    assert (folder / 'resultArea.csv').read_bytes() == before
+
+
+def test_new_frames_are_appended_or_inserted_in_capture_order(folder, run_analysis):
+    run_analysis(folder)
+    before = (folder / 'resultArea.csv').read_bytes()
+
+    # A later frame is appended to the file as it is
+    write_frame(folder, 16)
+    completed, inferred = run_analysis(folder)
+    assert [path.endswith(frame_name(16)) for path in inferred] == [True]
+    assert run_analysis.rewrites == []
+    assert (folder / 'resultArea.csv').read_bytes().startswith(before)
+
+    # An older frame arriving late is put in its place
+    write_frame(folder, 11)
+    completed, inferred = run_analysis(folder)
+    assert [path.endswith(frame_name(11)) for path in inferred] == [True]
+    assert run_analysis.rewrites
+    assert result_names(folder) == [frame_name(day) for day in (10, 11, 12, 14, 16)]
+
+
+def test_changed_frame_is_inferred_again(folder, run_analysis):
+    run_analysis(folder)
+    write_frame(folder, 12, value=200)
+    completed, inferred = run_analysis(folder)
+    assert [path.endswith(frame_name(12)) for path in inferred] == [True]
+    assert result_names(folder) == [frame_name(day) for day in (10, 12, 14)]
+
+
+def test_roi_or_model_change_invalidates_every_entry(analyzer, folder, model_path, run_analysis):
+    run_analysis(folder)
+    write_roi(folder, x2=50)
+    assert len(run_analysis(folder)[1]) == 3
+
+    retrained = analyzer.DuckweedBinarizer(img_height=64, img_width=64)
+    retrained.build_model()
+    retrained.save_model(model_path)
+    assert len(run_analysis(folder)[1]) == 3
+    assert result_names(folder) == [frame_name(day) for day in (10, 12, 14)]
+
+
+def test_stopped_run_resumes(folder, run_analysis):
+    for day in range(15, 25):
+        write_frame(folder, day)
+    completed, first = run_analysis(folder, stop_after=2)
+    assert not completed
+    done = len(result_names(folder))
+    assert 2 <= done < 13
+
+    # The next run infers only the images the stopped one did not finish
+    completed, second = run_analysis(folder)
+    assert completed and len(second) == 13 - done
+    assert result_names(folder) == sorted(result_names(folder))
+    assert len(result_names(folder)) == 13
@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+NAMES = ['2023-10-21 (06-09-04-385)-(06-09-05-074).jpg',
+         '2023-10-20 (18-00-00-000)-(18-00-01-000).png',
+         '2023-10-22 (06-09-04-385)-(06-09-05-074).gif',
+         'overview.tif']
+
+
+def touch(folder, name):
+    (folder / name).write_bytes(b'frame')
+
+
+def set_folder_mtime(folder, mtime_ns):
+    os.utime(folder, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / 'camera1'
+    folder.mkdir()
+    for name in NAMES:
+        touch(folder, name)
+    touch(folder, 'notes.txt')
+    return folder
+
+
+def catalog_names(catalog, *args, **kwargs):
+    return [os.path.basename(path) for path in catalog.image_paths(*args, **kwargs)]
+
+
+def test_catalog_and_analysis_list_the_same_files(analyzer, folder, tmp_path):
+    catalog = analyzer.ImageCatalog(str(folder), catalog_dir=str(tmp_path / 'catalogs'))
+    assert catalog.refresh() == (4, 0)
+    assert sorted(catalog_names(catalog)) == sorted(os.path.basename(path)
+                                                   for path in analyzer.list_image_files(str(folder)))
+    # Capture-time order, names without a capture time last
+    assert catalog_names(catalog) == [NAMES[1], NAMES[0], NAMES[2], NAMES[3]]
+    # The catalog is kept out of the image folder
+    assert sorted(os.listdir(folder)) == sorted(NAMES + ['notes.txt'])
+    assert os.listdir(tmp_path / 'catalogs')[0].startswith('camera1_')
+    catalog.close()
+
+
+def test_time_window_queries(analyzer, folder, tmp_path):
+    catalog = analyzer.ImageCatalog(str(folder), catalog_dir=str(tmp_path / 'catalogs'))
+    catalog.refresh()
+    assert catalog_names(catalog, datetime(2023, 10, 21)) == [NAMES[0], NAMES[2]]
+    assert catalog_names(catalog, end=datetime(2023, 10, 21, 6, 9, 4, 385000)) == [NAMES[1], NAMES[0]]
+    assert catalog_names(catalog, datetime(2023, 10, 20, 12), datetime(2023, 10, 21, 12)) == [NAMES[1], NAMES[0]]
+    assert catalog_names(catalog, datetime(2023, 10, 23)) == []
+
+    catalog.set_status([str(folder / NAMES[0])], 'analyzed')
+    assert catalog_names(catalog, status='analyzed') == [NAMES[0]]
+    assert catalog_names(catalog, datetime(2023, 10, 21), status='new') == [NAMES[2]]
+    catalog.close()
+
+
+def test_unchanged_folder_mtime_skips_the_walk(analyzer, folder, tmp_path):
+    old_mtime = time.time_ns() - 60 * 10 ** 9
+    set_folder_mtime(folder, old_mtime)
+    catalog = analyzer.ImageCatalog(str(folder), catalog_dir=str(tmp_path / 'catalogs'), rescan_interval=0.5)
+    assert catalog.refresh() == (4, 0)
+
+    # A file the folder mtime does not show is missed until the rescan interval has passed
+    touch(folder, 'late.png')
+    set_folder_mtime(folder, old_mtime)
+    assert catalog.refresh() == (0, 0)
+    time.sleep(0.6)
+    assert catalog.refresh() == (1, 0)
+
+    # A changed folder mtime is always walked
+    os.remove(folder / 'late.png')
+    assert catalog.refresh() == (0, 1)
+    catalog.close()
+
+
+def test_recent_folder_mtime_is_not_trusted(analyzer, folder, tmp_path):
+    catalog = analyzer.ImageCatalog(str(folder), catalog_dir=str(tmp_path / 'catalogs'))
+    mtime = time.time_ns()
+    set_folder_mtime(folder, mtime)
+    assert catalog.refresh() == (4, 0)
+
+    # Added in the same mtime tick as the last walk: the mtime is unchanged but the folder is walked again
+    touch(folder, 'same_tick.png')
+    set_folder_mtime(folder, mtime)
+    assert catalog.refresh() == (1, 0)
+    catalog.close()
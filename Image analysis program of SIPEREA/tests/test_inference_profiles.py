@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import SCRIPT
+
+# Runs in a fresh interpreter: TensorFlow's thread pools are fixed once it has started
+APPLY_PROFILE_CODE = """
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location('SIPEREAImageAnalyzer', sys.argv[1])
+analyzer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analyzer)
+analyzer.model_registry.img_size = 64
+if sys.argv[3] == 'tf-running':
+    analyzer.tf.constant(1.0) + 1.0
+analysis = analyzer.FolderAnalysis(model_path=sys.argv[2])
+for _ in range(2):
+    analysis.inference_settings = None
+    analysis.get_binarizer(sys.argv[2])
+print(json.dumps({'settings': analysis.inference_settings,
+                  'intra_op_threads': analyzer.tf.config.threading.get_intra_op_parallelism_threads()}))
+"""
+
+
+def apply_profile(analyzer, model_path, tmp_path, state):
+    home = tmp_path / 'home'
+    profiles = analyzer.InferenceProfiles(str(home / '.siperea' / analyzer.InferenceProfiles.filename))
+    profiles.save(model_path, {'tile_size': 64, 'overlap': 8, 'batch_size': 4, 'threads': 2,
+                               'tuned': '2026-01-01 00:00'})
+    env = dict(os.environ, HOME=str(home), USERPROFILE=str(home))
+    result = subprocess.run([sys.executable, '-c', APPLY_PROFILE_CODE, SCRIPT, model_path, state],
+                            capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stdout
+
+
+def test_profile_threads_applied_before_tensorflow_starts(analyzer, model_path, tmp_path):
+    applied, output = apply_profile(analyzer, model_path, tmp_path, 'fresh')
+    assert applied['settings'] == {'tile_size': 64, 'overlap': 8, 'batch_size': 4, 'threads': 2}
+    assert applied['intra_op_threads'] == 2
+    assert 'keeps its default thread count' not in output
+
+
+def test_profile_threads_reported_when_tensorflow_runs(analyzer, model_path, tmp_path):
+    applied, output = apply_profile(analyzer, model_path, tmp_path, 'tf-running')
+    # The tiling of the profile still applies; the thread count is dropped and reported once
+    assert applied['settings'] == {'tile_size': 64, 'overlap': 8, 'batch_size': 4, 'threads': None}
+    assert applied['intra_op_threads'] == 0
+    assert output.count('keeps its default thread count') == 1
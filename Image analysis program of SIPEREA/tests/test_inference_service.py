@@ -0,0 +1,27 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def test_service_keeps_model_while_idle(analyzer, model_path):
+    analyzer.model_registry.idle_timeout = 1
+    analyzer.model_registry.img_size = 64
+    service = analyzer.InferenceService(model_path, max_batch_size=4, max_latency=0.01)
+    try:
+        time.sleep(2.5)
+        assert len(analyzer.model_registry.entries) == 1
+
+        data = cv2.imencode('.png', np.zeros((48, 48, 3), np.uint8))[1].tobytes()
+        roi_json = '[{"Shape": "rectangle", "X1": 0, "Y1": 0, "X2": 20, "Y2": 20, "Condition1": "A", "Condition2": "", "Plate#": 1}]'
+        with ThreadPoolExecutor(4) as executor:
+            masks = list(executor.map(lambda _: service.predict_mask(data), range(8)))
+            layouts = list(executor.map(lambda _: service.roi_layout(roi_json), range(8)))
+        assert all(mask.shape == (48, 48) for mask in masks)
+        assert service.model_info()['images_served'] == 8
+        assert all(layout is layouts[0] for layout in layouts)
+        assert list(service.count_areas(data, roi_data=layouts[0])) == layouts[0].columns
+    finally:
+        service.close()
+    assert not analyzer.model_registry.pinned
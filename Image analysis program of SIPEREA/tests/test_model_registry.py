@@ -0,0 +1,93 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def test_predictions_continue_past_idle_timeout(analyzer, model_path):
+    registry = analyzer.ModelRegistry(idle_timeout=1)
+    binarizer = registry.get(model_path)
+    batch = np.zeros((1, 64, 64, 3), np.uint8)
+
+    # Keep predicting for longer than the idle timeout, across several reaper passes
+    end_time = time.time() + 3.5
+    while time.time() < end_time:
+        assert binarizer.run_model(batch).shape == (1, 64, 64, 1)
+        time.sleep(0.2)
+    assert len(registry.entries) == 1
+
+    # Once idle, the registry drops its reference but the held binarizer still works
+    time.sleep(2.5)
+    assert len(registry.entries) == 0
+    assert binarizer.run_model(batch).shape == (1, 64, 64, 1)
+
+
+def test_runs_leave_the_shared_binarizer_unchanged(analyzer, model_path, tmp_path):
+    analyzer.model_registry.img_size = 64
+    input_folder = tmp_path / 'images'
+    input_folder.mkdir()
+    for index in range(2):
+        cv2.imwrite(str(input_folder / f'frame{index}.png'), np.full((80, 96, 3), 40 * index, np.uint8))
+
+    shared = analyzer.model_registry.get(model_path)
+    default_renderer = shared.renderer
+    jpg_renderer = analyzer.VisualizationRenderer(image_format='jpg')
+    results = analyzer.ProcessFolder(str(input_folder), str(tmp_path / 'masks'), str(tmp_path / 'viz'),
+                                     save_viz=True, save_enhanced=False, model_path=model_path,
+                                     renderer=jpg_renderer)
+    assert len(results) == 2
+    assert sorted(os.listdir(tmp_path / 'viz')) == ['visualization_frame0.jpg', 'visualization_frame1.jpg']
+
+    # The run's renderer and writer stay with the run
+    assert analyzer.model_registry.get(model_path) is shared
+    assert shared.renderer is default_renderer
+    assert not hasattr(shared, 'writer')
+
+    analyzer.ProcessImage(str(input_folder / 'frame0.png'), str(tmp_path / 'masks'), str(tmp_path / 'viz'),
+                          save_viz=True, save_enhanced=False, model_path=model_path)
+    assert (tmp_path / 'viz' / 'visualization_frame0.png').exists()
+
+
+def test_loads_run_outside_the_registry_lock(analyzer, model_path, tmp_path):
+    registry = analyzer.ModelRegistry(max_models=4, img_size=64)
+    other_path = str(tmp_path / 'other.keras')
+    shutil.copy(model_path, other_path)
+    warm = registry.get(model_path)
+
+    release = threading.Event()
+    load = registry.load
+
+    def slow_load(path, *args):
+        if path == os.path.abspath(other_path):
+            release.wait(10)
+        return load(path, *args)
+
+    registry.load = slow_load
+    with ThreadPoolExecutor(2) as executor:
+        loading = [executor.submit(registry.get, other_path) for _ in range(2)]
+        time.sleep(0.5)
+        # A warm model is served while another one is loading
+        assert registry.get(model_path) is warm
+        assert not any(future.done() for future in loading)
+        release.set()
+        # Both callers get the one binarizer that was loaded
+        assert loading[0].result() is loading[1].result()
+    assert registry.loads == 2
+
+
+def test_other_load_options_of_a_file_stay_loaded(analyzer, model_path):
+    registry = analyzer.ModelRegistry(max_models=4, img_size=64)
+    plain = registry.get(model_path)
+    tiled = registry.get(model_path, tile_size=64)
+    assert registry.get(model_path) is plain
+    assert len(registry.entries) == 2
+
+    # A retrained model file replaces every entry of the old version
+    mtime = os.path.getmtime(model_path)
+    os.utime(model_path, (mtime + 10, mtime + 10))
+    assert registry.get(model_path, tile_size=64) is not tiled
+    assert len(registry.entries) == 1
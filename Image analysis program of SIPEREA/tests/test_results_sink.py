@@ -0,0 +1,89 @@
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+COLUMNS = ['A||P1', 'B||x||P2', 'Total, all']
+FIRST_TIME = datetime(2023, 10, 20, 6, 9, 4, 385000)
+
+
+def result_rows(count):
+    return [(f'frame {index}.jpg', FIRST_TIME + timedelta(hours=7 * index, milliseconds=index),
+             dict(zip(COLUMNS, (100 * index, 7 * index + 1, 0))))
+            for index in range(count)]
+
+
+def reference_csv(path, rows):
+    """resultArea.csv as the per-image DataFrame.to_csv appends wrote it."""
+    for index, (filename, capture_time, roi_areas) in enumerate(rows):
+        row = {'File name': filename,
+               'Time(day)': f"{(capture_time - FIRST_TIME).total_seconds() / (24 * 3600):.3f}"}
+        row.update(roi_areas)
+        pd.DataFrame([row]).to_csv(path, mode='w' if index == 0 else 'a', index=False, header=index == 0)
+    return path.read_bytes()
+
+
+def csv_lines(path):
+    return path.read_bytes().splitlines() if path.exists() else []
+
+
+def test_csv_is_written_in_batches_in_the_previous_layout(analyzer, tmp_path):
+    rows = result_rows(7)
+    sink = analyzer.ResultsSink(str(tmp_path), 'csv', FIRST_TIME, flush_rows=3, flush_interval=3600)
+    result_path = tmp_path / 'resultArea.csv'
+
+    written = []
+    for filename, capture_time, roi_areas in rows:
+        sink.append(filename, capture_time, roi_areas)
+        written.append(len(csv_lines(result_path)))
+    # Header and rows appear only when a batch of three is full
+    assert written == [0, 0, 4, 4, 4, 7, 7]
+    sink.close()
+
+    assert result_path.read_bytes() == reference_csv(tmp_path / 'reference.csv', rows)
+    assert not (tmp_path / 'resultArea.parquet').exists()
+
+
+def test_rows_are_written_once_the_flush_interval_has_passed(analyzer, tmp_path):
+    sink = analyzer.ResultsSink(str(tmp_path), 'csv', FIRST_TIME, flush_rows=100, flush_interval=0)
+    filename, capture_time, roi_areas = result_rows(1)[0]
+    sink.append(filename, capture_time, roi_areas)
+    assert len(csv_lines(tmp_path / 'resultArea.csv')) == 2
+    sink.close()
+
+
+def test_parquet_columns_and_types(analyzer, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    rows = result_rows(5)
+    sink = analyzer.ResultsSink(str(tmp_path), 'both', FIRST_TIME, flush_rows=2, flush_interval=3600)
+    for row in rows:
+        sink.append(*row)
+    # The Parquet file is published on close
+    assert not (tmp_path / 'resultArea.parquet').exists()
+    sink.close()
+
+    table = pq.read_table(tmp_path / 'resultArea.parquet')
+    assert table.schema.names == ['File name', 'Capture time', 'Time(day)'] + COLUMNS
+    assert table.schema.field('File name').type == pa.string()
+    assert table.schema.field('Capture time').type == pa.timestamp('ms')
+    assert table.schema.field('Time(day)').type == pa.float64()
+    assert all(table.schema.field(column).type == pa.int64() for column in COLUMNS)
+    assert table.column('File name').to_pylist() == [row[0] for row in rows]
+    assert table.column('Capture time').to_pylist() == [row[1] for row in rows]
+    assert table.column('B||x||P2').to_pylist() == [row[2]['B||x||P2'] for row in rows]
+    assert (tmp_path / 'resultArea.csv').read_bytes() == reference_csv(tmp_path / 'reference.csv', rows)
+
+
+def test_parquet_without_pyarrow_is_a_value_error(analyzer, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ValueError, match='pyarrow'):
+        analyzer.ResultsSink(str(tmp_path), 'parquet')
+    # CSV results do not need it
+    analyzer.ResultsSink(str(tmp_path), 'csv').close()
+
+
+def test_unknown_format_is_a_value_error(analyzer, tmp_path):
+    with pytest.raises(ValueError, match='Unknown result format'):
+        analyzer.ResultsSink(str(tmp_path), 'xlsx')
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+
+def reference_areas(analyzer, mask, roi_data):
+    """The per-ROI loop that RoiLayout replaces."""
+    areas = {}
+    for _, roi in roi_data.iterrows():
+        areas[analyzer.create_column_name(roi)] = int(analyzer.count_white_pixels(mask, roi))
+    return areas
+
+
+def test_counts_match_the_per_roi_loop(analyzer):
+    roi_data = pd.DataFrame([
+        # Overlapping rectangle and circles
+        ['rectangle', 10, 10, 120, 90, 'A', None, 1],
+        ['circle', 50, 40, 150, 140, 'B', 'x', 1],
+        ['circle', 60, 50, 101, 90, 'C', None, 2],
+        # Clipped at the right and bottom edges of the 200x240 masks
+        ['circle', 180, 150, 260, 230, 'D', 'y', 2],
+        ['rectangle', 200, 0, 300, 50, 'E', None, 3],
+        # Non-square circle region and a one-pixel ROI
+        ['circle', 0, 120, 59, 199, 'F', None, 3],
+        ['rectangle', 5, 5, 5, 5, 'G', None, 4],
+        # Same column name as an earlier ROI: the last one wins
+        ['rectangle', 0, 0, 30, 30, 'A', None, 1],
+    ], columns=['Shape', 'X1', 'Y1', 'X2', 'Y2', 'Condition1', 'Condition2', 'Plate#'])
+    layout = analyzer.RoiLayout(roi_data)
+
+    rng = np.random.default_rng(0)
+    for density in (0.1, 0.5, 0.9):
+        mask = (rng.random((200, 240)) < density).astype(np.uint8) * 255
+        assert analyzer.count_roi_areas(mask, layout) == reference_areas(analyzer, mask, roi_data)
+
+    # Another frame size compiles its own slices and circle masks
+    mask = (rng.random((150, 170)) < 0.5).astype(np.uint8) * 255
+    assert analyzer.count_roi_areas(mask, layout) == reference_areas(analyzer, mask, roi_data)
+    assert len(layout.compiled) == 2
+
+
+def test_without_roi_file_counts_the_whole_image(analyzer):
+    mask = np.zeros((40, 50), np.uint8)
+    mask[5:15, 10:30] = 255
+    assert analyzer.count_roi_areas(mask, None) == {'Total': 200}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn import metrics as skmetrics
+
+
+def synthetic_batches(quantized, count=5):
+    """(masks, probability maps) batches whose scores correlate with the labels."""
+    rng = np.random.default_rng(1 if quantized else 2)
+    for _ in range(count):
+        masks = (rng.random((4, 32, 32, 1)) < 0.3).astype(np.float32)
+        scores = np.clip(0.35 * masks + rng.normal(0.35, 0.2, masks.shape), 0, 1).astype(np.float32)
+        if quantized:
+            # Scores on the bin edges: the histogram then holds the exact ROC curve
+            scores = np.floor(scores * 1024) / 1024
+        yield masks, scores
+
+
+def accumulate(analyzer, batches):
+    metrics = analyzer.SegmentationMetrics()
+    y_true, y_pred = [], []
+    for masks, scores in batches:
+        metrics.update(masks, scores)
+        y_true.append(masks.ravel())
+        y_pred.append(scores.ravel())
+    return metrics, np.concatenate(y_true).astype(np.uint8), np.concatenate(y_pred)
+
+
+@pytest.mark.parametrize('quantized, auc_tolerance', [(True, 1e-12), (False, 1e-4)])
+def test_metrics_agree_with_sklearn(analyzer, quantized, auc_tolerance):
+    metrics, y_true, y_pred = accumulate(analyzer, synthetic_batches(quantized))
+    y_pred_bin = (y_pred > 0.5).astype(np.uint8)
+
+    assert np.array_equal(metrics.confusion_matrix(), skmetrics.confusion_matrix(y_true, y_pred_bin))
+    scores = metrics.summary()
+    assert scores['Pixel Accuracy'] == pytest.approx(skmetrics.accuracy_score(y_true, y_pred_bin), abs=1e-12)
+    assert scores['IoU'] == pytest.approx(skmetrics.jaccard_score(y_true, y_pred_bin), abs=1e-12)
+    assert scores['Dice'] == pytest.approx(skmetrics.f1_score(y_true, y_pred_bin), abs=1e-12)
+    assert scores['Precision'] == pytest.approx(skmetrics.precision_score(y_true, y_pred_bin), abs=1e-12)
+    assert scores['Recall'] == pytest.approx(skmetrics.recall_score(y_true, y_pred_bin), abs=1e-12)
+    assert metrics.roc_auc() == pytest.approx(skmetrics.roc_auc_score(y_true, y_pred), abs=auc_tolerance)
+
+    fpr, tpr, thresholds = metrics.roc_curve()
+    assert thresholds[0] == np.inf and np.all(np.diff(thresholds[1:]) < 0)
+    if quantized:
+        # With scores on the bin edges the histogram curve is sklearn's curve
+        sk_fpr, sk_tpr, _ = skmetrics.roc_curve(y_true, y_pred, drop_intermediate=False)
+        assert np.allclose(fpr, sk_fpr) and np.allclose(tpr, sk_tpr)
+
+
+def test_report_files_keep_their_layout(analyzer, tmp_path):
+    metrics, y_true, y_pred = accumulate(analyzer, synthetic_batches(False))
+    analyzer.write_segmentation_reports(metrics, str(tmp_path))
+
+    roc = pd.read_csv(tmp_path / 'roc_auc_data_sampled.csv')
+    assert list(roc.columns) == ['False positive rate', 'True positive rate', 'Thresholds']
+    assert len(roc) == 1000
+    assert roc.iloc[0].tolist() == [0.0, 0.0, np.inf]
+    assert roc.iloc[-1, :2].tolist() == [1.0, 1.0]
+    assert roc['False positive rate'].is_monotonic_increasing and roc['True positive rate'].is_monotonic_increasing
+    assert (tmp_path / 'roc_auc_plot.png').stat().st_size > 0
+
+    scores = pd.read_csv(tmp_path / 'segmentation_metrics.csv')
+    assert list(scores.columns) == ['Pixel Accuracy', 'IoU', 'Dice', 'Precision', 'Recall', 'ROC-AUC']
+    assert scores['ROC-AUC'][0] == pytest.approx(skmetrics.roc_auc_score(y_true, y_pred), abs=1e-4)
+
+    # The confusion matrix file is written exactly as from sklearn's matrix
+    reference = pd.DataFrame(skmetrics.confusion_matrix(y_true, (y_pred > 0.5).astype(np.uint8)),
+                             index=["True Negative", "True Positive"],
+                             columns=["Predicted Negative", "Predicted Positive"])
+    reference.to_csv(tmp_path / 'reference_confusion_matrix.csv')
+    assert ((tmp_path / 'confusion_matrix.csv').read_bytes()
+            == (tmp_path / 'reference_confusion_matrix.csv').read_bytes())
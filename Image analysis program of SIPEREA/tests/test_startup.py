@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+import time
+
+from conftest import SCRIPT
+
+# Imported on first use only, so the GUI and the command line start quickly
+HEAVY_MODULES = ('tensorflow', 'sklearn', 'matplotlib', 'pandas')
+
+# Seconds a fresh interpreter may take; a launch that imports the heavy modules takes several
+STARTUP_BUDGET = 1.0
+
+IMPORT_CODE = (
+    "import importlib.util, json, sys\n"
+    f"spec = importlib.util.spec_from_file_location('SIPEREAImageAnalyzer', {SCRIPT!r})\n"
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+    f"print(json.dumps(sorted(name for name in {HEAVY_MODULES!r} if name in sys.modules)))\n"
+)
+
+
+def run_timed(args):
+    """Run a fresh interpreter and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, capture_output=True, text=True)
+    return result, time.perf_counter() - start
+
+
+def test_import_does_not_load_heavy_modules():
+    result, elapsed = run_timed(['-c', IMPORT_CODE])
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+    assert elapsed < STARTUP_BUDGET, f"importing the analyzer took {elapsed:.2f} s"
+
+
+def test_help_within_budget():
+    result, elapsed = run_timed([SCRIPT, '--help'])
+    assert result.returncode == 0, result.stderr
+    assert 'analyze' in result.stdout
+    assert elapsed < STARTUP_BUDGET, f"--help took {elapsed:.2f} s"
@@ -0,0 +1,75 @@
+import importlib.util
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import SCRIPT
+
+
+def reference_prediction_map(binarizer, image, tile_size, overlap):
+    """Probability map of the original per-tile loop: one forward pass and one weight window per tile."""
+    height, width = image.shape[:2]
+    prediction_map = np.zeros((height, width), dtype=np.float32)
+    weight_map = np.zeros((height, width), dtype=np.float32)
+    effective_tile_size = tile_size - 2 * overlap
+    n_tiles_x = max(1, int(np.ceil((width - tile_size) / effective_tile_size)) + 1)
+    n_tiles_y = max(1, int(np.ceil((height - tile_size) / effective_tile_size)) + 1)
+
+    for i in range(n_tiles_y):
+        for j in range(n_tiles_x):
+            y_start = min(i * effective_tile_size, max(0, height - tile_size))
+            x_start = min(j * effective_tile_size, max(0, width - tile_size))
+            tile = image[y_start:y_start + tile_size, x_start:x_start + tile_size]
+            h, w = tile.shape[:2]
+            padded_tile = np.zeros((tile_size, tile_size, 3), dtype=np.float32)
+            padded_tile[:h, :w] = tile / 255.0
+            tile_prediction = binarizer.model(padded_tile[np.newaxis], training=False).numpy()[0, :, :, 0]
+
+            weight = np.ones((tile_size, tile_size), dtype=np.float32)
+            for k in range(overlap):
+                weight[k, :] *= (k + 1) / (overlap + 1)
+                weight[tile_size - 1 - k, :] *= (k + 1) / (overlap + 1)
+                weight[:, k] *= (k + 1) / (overlap + 1)
+                weight[:, tile_size - 1 - k] *= (k + 1) / (overlap + 1)
+
+            prediction_map[y_start:y_start + h, x_start:x_start + w] += tile_prediction[:h, :w] * weight[:h, :w]
+            weight_map[y_start:y_start + h, x_start:x_start + w] += weight[:h, :w]
+    return prediction_map / np.maximum(weight_map, 1e-10)
+
+
+@pytest.fixture(scope='module')
+def tiling():
+    """(analyzer module, untrained 512x512 binarizer), built once for all image sizes."""
+    spec = importlib.util.spec_from_file_location('SIPEREAImageAnalyzer', SCRIPT)
+    analyzer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(analyzer)
+    binarizer = analyzer.DuckweedBinarizer(img_height=512, img_width=512)
+    binarizer.build_model()
+    return analyzer, binarizer
+
+
+# 1300x1100 needs 4x3 tiles with clamped last rows and columns; 400 rows are cut off in every tile
+@pytest.mark.parametrize('height, width', [(1100, 1300), (400, 1300)])
+def test_stitched_map_matches_the_per_tile_loop(tiling, height, width):
+    analyzer, binarizer = tiling
+    rng = np.random.default_rng(height)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (31, 31), 0)
+    context = analyzer.ImageContext('frame.png', image)
+
+    stitched = {}
+
+    def capture(image_path, original_img, prediction_raw, *args, **kwargs):
+        stitched['map'] = prediction_raw
+
+    binarizer._visualize_enhanced_prediction = capture
+    # Tiles are inferred in batches of 5, so the last batch is a partial one
+    mask = binarizer.predict(context, tile_size=512, overlap=64, save_viz=False, tile_batch_size=5)
+
+    plan = analyzer.TilePlan.get(height, width, 512, 64)
+    assert any(h < 512 or w < 512 for _, _, h, w in plan.origins) == (height < 512)
+    expected = reference_prediction_map(binarizer, image, 512, 64)
+    np.testing.assert_allclose(stitched['map'], expected, rtol=0, atol=1e-5)
+    # The untrained model gives values near 0.5, so pixels within float error of the threshold may differ
+    decided = np.abs(expected - 0.5) > 1e-5
+    assert np.array_equal(mask[decided], (expected[decided] > 0.5).astype(np.uint8) * 255)
@@ -0,0 +1,33 @@
+import cv2
+import numpy as np
+
+
+def write_pairs(tmp_path, count=6):
+    rng = np.random.default_rng(0)
+    image_paths, mask_paths = [], []
+    for index in range(count):
+        mask = np.zeros((80, 96), np.uint8)
+        cv2.circle(mask, (int(rng.integers(20, 76)), int(rng.integers(20, 60))), 15, 255, -1)
+        image = np.dstack([mask // 2, mask, rng.integers(0, 60, mask.shape, dtype=np.uint8)])
+        image_paths.append(str(tmp_path / f'image_{index}.png'))
+        mask_paths.append(str(tmp_path / f'mask_{index}.png'))
+        cv2.imwrite(image_paths[-1], image)
+        cv2.imwrite(mask_paths[-1], mask)
+    return image_paths, mask_paths
+
+
+def test_augmented_batches_are_reproducible(analyzer, tmp_path):
+    binarizer = analyzer.DuckweedBinarizer(img_height=64, img_width=64)
+    image_paths, mask_paths = write_pairs(tmp_path)
+
+    def two_epochs(seed):
+        dataset = binarizer.training_dataset(image_paths, mask_paths, batch_size=2, shuffle=True,
+                                             augment=True, seed=seed)
+        return [[(images.numpy(), masks.numpy()) for images, masks in dataset] for _ in range(2)]
+
+    first, again, other = two_epochs(42), two_epochs(42), two_epochs(43)
+    for epoch, epoch_again in zip(first, again):
+        for (images, masks), (images_again, masks_again) in zip(epoch, epoch_again):
+            assert np.array_equal(images, images_again) and np.array_equal(masks, masks_again)
+    assert not np.array_equal(first[0][0][0], first[1][0][0])
+    assert not np.array_equal(first[0][0][0], other[0][0][0])
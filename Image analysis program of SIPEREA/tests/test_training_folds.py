@@ -0,0 +1,44 @@
+import importlib
+import os
+
+import pandas as pd
+
+from conftest import SCRIPT
+from test_training_dataset import write_pairs
+
+
+def train_two_folds(tmp_path, monkeypatch, fold_processes):
+    # The spawned fold workers import the script by name
+    monkeypatch.syspath_prepend(os.path.dirname(SCRIPT))
+    analyzer = importlib.import_module('SIPEREAImageAnalyzer')
+    image_paths, mask_paths = write_pairs(tmp_path, count=4)
+    run_folder = tmp_path / f'run_{fold_processes}'
+    run_folder.mkdir()
+    monkeypatch.chdir(run_folder)
+
+    binarizer = analyzer.DuckweedBinarizer(img_height=64, img_width=64)
+    histories = binarizer.train(image_paths, mask_paths, epochs=1, batch_size=2, use_kfold=True, k_folds=2,
+                                fold_processes=fold_processes)
+    assert len(histories) == 2
+    assert binarizer.model is not None
+    return run_folder
+
+
+def test_parallel_folds_write_the_sequential_outputs(tmp_path, monkeypatch, capsys):
+    sequential = train_two_folds(tmp_path, monkeypatch, 1)
+    capsys.readouterr()
+    parallel = train_two_folds(tmp_path, monkeypatch, 2)
+    log = capsys.readouterr().out
+
+    assert sorted(os.listdir(parallel)) == sorted(os.listdir(sequential))
+    assert {'model_fold_1.keras', 'model_fold_2.keras'} <= set(os.listdir(parallel))
+    for filename in ('cross_validation_fold_metrics.csv', 'cross_validation_all_folds_history.csv'):
+        parallel_table = pd.read_csv(parallel / filename)
+        sequential_table = pd.read_csv(sequential / filename)
+        assert list(parallel_table.columns) == list(sequential_table.columns)
+        assert len(parallel_table) == len(sequential_table)
+    assert list(pd.read_csv(parallel / 'cross_validation_fold_metrics.csv')['fold']) == [1, 2]
+
+    # The workers' progress reaches the parent's stdout, labelled by fold
+    assert '[Fold 1] Epoch 1/1' in log and '[Fold 2] Epoch 1/1' in log
+    assert 'Model for fold 2 saved' in log